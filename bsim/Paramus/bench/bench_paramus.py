@@ -0,0 +1,136 @@
+"""
+bench_paramus.py
+----------------
+
+パイプラインのベンチマーク（プロセス内）。
+
+    python bench/bench_paramus.py                          # 既定: 1 / 1k / 100k デバイス
+    python bench/bench_paramus.py --sizes 1,1000 --save base.json
+    python bench/bench_paramus.py --baseline base.json --max-ratio 1.3
+        # どこかの段が基準より 1.3 倍以上遅くなっていれば終了コード 1
+    python bench/bench_paramus.py --extraction direct     # 擬似カーブを作らない抽出
+
+計測項目:
+    single : 1 枚生成（generate_card）のレイテンシ [µs]。scalar / numpy 両バックエンド
+    batch  : N デバイスを run_paramus_batch → render_table → write_modelcards した時の
+             段ごとの時間 [ms] とスループット [devices/s]
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PARAMUS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PARAMUS_DIR))
+
+import numpy as np  # noqa: E402
+
+from paramus import load_preset, generate_card  # noqa: E402
+from physical.poisson import PhysBatch  # noqa: E402
+from physical.batch import run_paramus_batch  # noqa: E402
+from modelcard.build import render_table  # noqa: E402
+from modelcard.library import write_modelcards  # noqa: E402
+from common import compare_to_baseline, save  # noqa: E402
+
+
+DEFAULT_SIZES = "1,1000,100000"
+
+
+def bench_single(repeats: int) -> dict:
+    phys = load_preset("130nm", "nmos")
+    out = {}
+    for backend in ("scalar", "numpy"):
+        generate_card(phys, backend=backend)  # 初回の import / テンプレート解析を除く
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            generate_card(phys, backend=backend)
+            times.append(time.perf_counter() - t0)
+        out[backend] = {
+            "median_us": statistics.median(times) * 1e6,
+            "min_us": min(times) * 1e6,
+        }
+    return out
+
+
+def make_batch(n: int, seed: int = 0) -> PhysBatch:
+    """130nm NMOS の周りに散らばった N デバイス。"""
+    rng = np.random.default_rng(seed)
+    p = load_preset("130nm", "nmos")
+    return PhysBatch.from_arrays(
+        tox_m=p["tox_m"] * rng.uniform(0.9, 1.1, n),
+        na_m3=p["na_m3"] * rng.uniform(0.5, 2.0, n),
+        vfb=p["vfb"] + rng.uniform(-0.05, 0.05, n),
+        mu0=p["mu0"],
+        L_m=p["L_m"],
+        W_m=p["W_m"],
+    )
+
+
+def bench_batch(n: int, repeats: int, extraction: str = "curves") -> dict:
+    phys = make_batch(n)
+    best = None
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = Path(tmp) / "bench.lib"
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            table = run_paramus_batch(phys, extraction=extraction)
+            t1 = time.perf_counter()
+            texts = render_table(table)
+            t2 = time.perf_counter()
+            write_modelcards(texts, out_path)
+            t3 = time.perf_counter()
+            run = (t1 - t0, t2 - t1, t3 - t2)
+            if best is None or sum(run) < sum(best):
+                best = run
+    compute, render, write = best
+    total = compute + render + write
+    return {
+        "compute_ms": compute * 1e3,
+        "render_ms": render * 1e3,
+        "write_ms": write * 1e3,
+        "total_ms": total * 1e3,
+        "devices_per_s": n / total,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Paramus pipeline benchmark")
+    ap.add_argument("--sizes", type=str, default=DEFAULT_SIZES, help="batch sizes (comma separated)")
+    ap.add_argument("--repeats", type=int, default=3, help="batch repeats (best is reported)")
+    ap.add_argument("--single-repeats", type=int, default=2000)
+    ap.add_argument("--extraction", type=str, default="curves", choices=["curves", "direct"],
+                    help="batch extraction mode")
+    ap.add_argument("--save", type=str, help="write the result JSON to this file")
+    ap.add_argument("--baseline", type=str, help="compare against a saved result JSON")
+    ap.add_argument("--max-ratio", type=float, default=1.3,
+                    help="fail if any timing exceeds the baseline by this factor")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    result = {
+        "single": bench_single(args.single_repeats),
+        "batch": {str(n): bench_batch(n, args.repeats, args.extraction) for n in sizes},
+    }
+
+    status = 0
+    if args.baseline:
+        ratios, failed = compare_to_baseline(
+            result, args.baseline, ["median_us", "_ms"], args.max_ratio
+        )
+        result["ratio"] = ratios
+        result["regressions"] = failed
+        if failed:
+            status = 1
+
+    print(json.dumps(result, indent=2))
+    if args.save:
+        save(result, args.save)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+bench_startup.py
+----------------
+
+paramus.py 1 回実行（コールドスタート）の所要時間を測る。
+
+    python bench/bench_startup.py                       # 20 回計測して JSON 出力
+    python bench/bench_startup.py --save baseline.json  # 結果を保存
+    python bench/bench_startup.py --baseline baseline.json --max-ratio 1.2
+        # 基準より中央値が 1.2 倍以上遅ければ終了コード 1（退行検出用）
+
+各回は新しいインタプリタで実行し、同時に -X importtime で NumPy が
+読み込まれていないこと（スカラー経路が使われていること）も確認する。
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import compare_to_baseline, save
+
+
+PARAMUS_DIR = Path(__file__).resolve().parent.parent
+
+
+def paramus_cmd(out_path: str, extra=()) -> list:
+    return [sys.executable, "paramus.py", "--node", "130nm", "--type", "nmos",
+            "--out", out_path, *extra]
+
+
+def time_runs(runs: int, extra=()) -> list:
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = str(Path(tmp) / "model.sp")
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            subprocess.run(paramus_cmd(out_path, extra), cwd=PARAMUS_DIR, check=True,
+                           stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - t0)
+    return times
+
+
+def imported_modules(extra=()) -> set:
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = paramus_cmd(str(Path(tmp) / "model.sp"), extra)
+        cmd.insert(1, "-Ximporttime")
+        res = subprocess.run(cmd, cwd=PARAMUS_DIR, check=True, capture_output=True, text=True)
+    mods = set()
+    for line in res.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            mods.add(line.rsplit("|", 1)[1].strip())
+    return mods
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Paramus cold-start benchmark")
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--backend", type=str, default="scalar", choices=["scalar", "numpy"])
+    ap.add_argument("--save", type=str, help="write the result JSON to this file")
+    ap.add_argument("--baseline", type=str, help="compare against a saved result JSON")
+    ap.add_argument("--max-ratio", type=float, default=1.2,
+                    help="fail if median exceeds baseline median by this factor")
+    args = ap.parse_args()
+
+    extra = ("--backend", args.backend)
+    times = time_runs(args.runs, extra)
+    numpy_loaded = "numpy" in imported_modules(extra)
+
+    result = {
+        "backend": args.backend,
+        "runs": args.runs,
+        "min_ms": min(times) * 1e3,
+        "median_ms": statistics.median(times) * 1e3,
+        "max_ms": max(times) * 1e3,
+        "numpy_loaded": numpy_loaded,
+    }
+
+    status = 0
+    if args.baseline:
+        ratios, failed = compare_to_baseline(result, args.baseline, ["median_ms"], args.max_ratio)
+        result["ratio"] = ratios.get("median_ms")
+        if failed:
+            status = 1
+    if args.backend == "scalar" and numpy_loaded:
+        status = 1  # 高速起動経路に NumPy が紛れ込んだ
+
+    print(json.dumps(result, indent=2))
+    if args.save:
+        save(result, args.save)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
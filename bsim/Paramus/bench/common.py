@@ -0,0 +1,38 @@
+"""ベンチマークスクリプト共通: 結果 JSON の保存と基準値との比較。"""
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+
+def flatten(result: Dict, prefix: str = "") -> Dict[str, float]:
+    """入れ子の dict を "a.b.c" キーの数値 dict にする。"""
+    out: Dict[str, float] = {}
+    for k, v in result.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def compare_to_baseline(
+    result: Dict, baseline_path: str, keys: Iterable[str], max_ratio: float
+) -> Tuple[Dict[str, float], List[str]]:
+    """
+    keys（flatten 後の名前、末尾一致）について result / baseline の比を求める。
+    比が max_ratio を超えた項目名のリストも返す（時間系の指標を渡すこと）。
+    """
+    base = flatten(json.loads(Path(baseline_path).read_text(encoding="utf-8")))
+    cur = flatten(result)
+    keys = tuple(keys)
+    ratios: Dict[str, float] = {}
+    for name, value in cur.items():
+        if name.endswith(keys) and base.get(name):
+            ratios[name] = value / base[name]
+    failed = [name for name, r in ratios.items() if r > max_ratio]
+    return ratios, failed
+
+
+def save(result: Dict, path: str) -> None:
+    Path(path).write_text(json.dumps(result, indent=2), encoding="utf-8")
@@ -0,0 +1,124 @@
+"""
+fit.py
+------
+
+実測（アナライザの .dat）に BSIM4 カードを合わせる差分進化フィッティング。
+
+    python fit.py --card ../bsim4_analyzer_dim/models/130nm_nmos_l013.sp \\
+        --idvg results/130nm/l_vg/130nm_nmos_L013_vg.dat:0.05 \\
+        --idvd results/130nm/l_vd/130nm_nmos_L013_vd.dat:1.2 \\
+        --L 0.13e-6 --W 1e-6 --out fitted.sp
+    python fit.py ... --backend ngspice --jobs 16       # 候補を ngspice ワーカーで並列評価
+
+--idvg FILE:VDS / --idvd FILE:VGS は何本でも指定できる（同じ L / W・温度のカーブとして扱う）。
+結果のカードを --out に、コスト履歴などを同名の .json に書き出す。
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))   # bsim/（共通の ngspice_tools）
+from modelcard.parse import parse_file, format_card
+from physical.fitting import (
+    DEFAULT_FIT_PARAMS, DcModelEvaluator, NgspiceEvaluator, fit_card, load_measurement, cost_decades,
+)
+
+
+def _curve(spec: str):
+    path, _, bias = spec.rpartition(":")
+    if not path:
+        raise argparse.ArgumentTypeError(f"expected FILE:BIAS, got {spec!r}")
+    return path, float(bias)
+
+
+def build_argparser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Fit BSIM4 card parameters to measured Id-Vg / Id-Vd curves")
+    p.add_argument("--card", type=str, required=True, help="SPICE file with the starting .model card")
+    p.add_argument("--model", type=str, help="model name in --card (default: first card)")
+    p.add_argument("--idvg", type=_curve, action="append", default=[], metavar="FILE:VDS",
+                   help="Id-Vg .dat (col 1 = Vgs, last col = Id) measured at VDS")
+    p.add_argument("--idvd", type=_curve, action="append", default=[], metavar="FILE:VGS",
+                   help="Id-Vd .dat (col 1 = Vds, last col = Id) measured at VGS")
+    p.add_argument("--L", type=float, required=True, help="channel length [m]")
+    p.add_argument("--W", type=float, required=True, help="channel width [m]")
+    p.add_argument("--vbs", type=float, default=0.0, help="body bias [V]")
+    p.add_argument("--temp", type=float, default=25.0, help="measurement temperature [degC]")
+    p.add_argument("--params", type=str, default=",".join(DEFAULT_FIT_PARAMS),
+                   help="comma separated BSIM4 parameters to fit")
+    p.add_argument("--backend", type=str, default="dc", choices=["dc", "ngspice"],
+                   help="dc: vectorized BSIM4 DC core (no ngspice); ngspice: parallel ngspice workers")
+    p.add_argument("--jobs", type=int, default=None, help="ngspice worker threads (default: CPU count)")
+    p.add_argument("--pop", type=int, default=32, help="population size")
+    p.add_argument("--gens", type=int, default=60, help="maximum generations")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=str, default="fitted.sp", help="output card")
+    return p
+
+
+def main() -> None:
+    args = build_argparser().parse_args()
+    if not args.idvg and not args.idvd:
+        raise SystemExit("give at least one --idvg or --idvd curve")
+
+    cards = parse_file(args.card)
+    if args.model:
+        cards = [c for c in cards if c.name == args.model]
+    if not cards:
+        raise SystemExit(f"no .model card {args.model or ''} in {args.card}")
+    card = cards[0]
+
+    meas = [
+        load_measurement(path, "idvg", bias, args.L, args.W, args.vbs, args.temp) for path, bias in args.idvg
+    ] + [
+        load_measurement(path, "idvd", bias, args.L, args.W, args.vbs, args.temp) for path, bias in args.idvd
+    ]
+
+    if args.backend == "ngspice":
+        kwargs = {"jobs": args.jobs} if args.jobs else {}
+        evaluator = NgspiceEvaluator(card, meas, **kwargs)
+    else:
+        evaluator = DcModelEvaluator(card, meas)
+
+    names = [n.strip().upper() for n in args.params.split(",") if n.strip()]
+    t0 = time.perf_counter()
+    try:
+        result = fit_card(card, meas, names, evaluator, args.pop, args.gens, args.seed)
+    finally:
+        if hasattr(evaluator, "close"):
+            evaluator.close()
+    elapsed = time.perf_counter() - t0
+
+    out_path = Path(args.out)
+    out_path.write_text(
+        f"* fitted by Paramus fit.py ({args.backend}) to {len(meas)} curves\n" + format_card(card, result.params),
+        encoding="utf-8",
+    )
+    report = {
+        "card": args.card,
+        "model": card.name,
+        "backend": args.backend,
+        "curves": [m.name for m in meas],
+        "start": {n: card.params.get(n.lower()) for n in names},
+        "params": result.params,
+        "start_cost": result.start_cost,
+        "cost": result.cost,
+        "generations": result.generations,
+        "evaluations": result.evaluations,
+        "at_bounds": result.at_bounds,
+        "history": result.history,
+        "seconds": elapsed,
+    }
+    report_path = out_path.with_suffix(".json")
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"[fit] cost {cost_decades(result.start_cost)} -> {cost_decades(result.cost)} "
+          f"({result.generations} generations, {result.evaluations} candidates, {elapsed:.2f} s)")
+    if result.at_bounds:
+        print(f"[fit] at search bounds: {', '.join(result.at_bounds)}")
+    print(f"[fit] card -> {out_path}, report -> {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,111 @@
 from pathlib import Path
-from typing import Dict
+from string import Formatter
+from typing import Dict, List, Optional, Sequence, Tuple
 
 
-def build_modelcard(params: Dict[str, float], out_path: Path) -> None:
+TEMPLATE_PATH = Path(__file__).parent / "template_bsim4.tpl"
+
+
+class CompiledTemplate:
     """
-    template_bsim4.tpl を読み込み、params を埋め込んで .sp を出力する。
+    str.format 形式のテンプレートを 1 回だけ解析して保持する。
+    render のたびにテンプレート文字列を再パースしない。
     """
-    here = Path(__file__).parent
-    tpl_path = here / "template_bsim4.tpl"
-    tpl = tpl_path.read_text(encoding="utf-8")
 
+    def __init__(self, text: str):
+        self.text = text
+        # (リテラル, フィールド名, 書式指定) の列。末尾のリテラルはフィールド名 None
+        self.parts: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conv in Formatter().parse(text):
+            if conv:
+                raise ValueError(f"conversion '!{conv}' is not supported in modelcard templates")
+            self.parts.append((literal, field, spec or ""))
+        self.fields = [f for _, f, _ in self.parts if f is not None]
+
+    def render(self, values: Dict) -> str:
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(format(values[field], spec))
+        return "".join(out)
+
+    def render_columns(self, columns: Dict[str, Sequence], n: int) -> List[str]:
+        """
+        列指向データ（名前 → 長さ n の列）から n 個のテキストをまとめて生成する。
+        フィールドごとに文字列化を先に済ませ、行ごとの dict を作らずに
+        %% 形式の 1 本のフォーマットで埋め込む。
+        """
+        pct = "".join(
+            literal.replace("%", "%%") + ("%s" if field is not None else "")
+            for literal, field, _ in self.parts
+        )
+        cols = [
+            [format(v, spec) for v in columns[field]]
+            for _, field, spec in self.parts
+            if field is not None
+        ]
+        if not cols:
+            return [pct % ()] * n
+        return [pct % row for row in zip(*cols)]
+
+
+# テンプレートのキャッシュ: パス → (mtime_ns, CompiledTemplate)
+_TEMPLATE_CACHE: Dict[Path, Tuple[int, CompiledTemplate]] = {}
+
+
+def load_template(tpl_path: Path = TEMPLATE_PATH) -> CompiledTemplate:
+    """
+    テンプレートを解析済みの形で返す。ファイルの mtime が変わったときだけ読み直す。
+    """
+    mtime = tpl_path.stat().st_mtime_ns
+    cached = _TEMPLATE_CACHE.get(tpl_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    tpl = CompiledTemplate(tpl_path.read_text(encoding="utf-8"))
+    _TEMPLATE_CACHE[tpl_path] = (mtime, tpl)
+    return tpl
+
+
+def _format_params(params: Dict) -> Dict:
     # テンプレートで使う追加パラメータ
     dev_type = params.get("DEVICE_TYPE", "nmos")
     model_name = params.get("MODEL_NAME", "paramus_nmos")
 
-    fmt_params = {
+    return {
         "MODEL_NAME": model_name,
         "DEVICE_TYPE": dev_type,
         **params,
     }
 
-    text = tpl.format(**fmt_params)
+
+def render_modelcard(params: Dict[str, float]) -> str:
+    """
+    template_bsim4.tpl に params を埋め込んだ .model テキストを返す。
+    """
+    return load_template().render(_format_params(params))
+
+
+def render_table(table, model_names: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    BsimTable（列指向）を行ごとの dict を経由せずにテキスト化する。
+    model_names を省略すると paramus_nmos / paramus_pmos を使う。
+    """
+    n = len(table)
+    dev_types = ["nmos" if f else "pmos" for f in table.is_nmos.tolist()]
+    if model_names is None:
+        model_names = [f"paramus_{t}" for t in dev_types]
+
+    columns: Dict[str, Sequence] = {k: v.tolist() for k, v in table.columns.items()}
+    columns["DEVICE_TYPE"] = dev_types
+    columns["MODEL_NAME"] = list(model_names)
+    return load_template().render_columns(columns, n)
+
+
+def build_modelcard(params: Dict[str, float], out_path: Path) -> None:
+    """
+    template_bsim4.tpl を読み込み、params を埋め込んで .sp を出力する。
+    """
+    text = render_modelcard(params)
     out_path.write_text(text, encoding="utf-8")
@@ -0,0 +1,168 @@
+"""
+Paramus 結果のコンテンツアドレス型ディスクキャッシュ。
+
+キー = sha256( 正規化済み物理入力（_ensure_si_units 後） + 温度 + パイプラインのコード版 )
+値   = BSIM4 パラメータ dict と modelcard テキスト（JSON 1 ファイル）
+
+コード版は physical/*.py・modelcard/build.py・テンプレートのソースのハッシュなので、
+モデル式を変更すると古いエントリは自然に参照されなくなる（やがて LRU で消える）。
+ヒット時はファイルの mtime を更新し、容量上限を超えたら mtime の古い順に削除する。
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from physical.poisson import _ensure_si_units
+
+
+PARAMUS_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("PARAMUS_CACHE_DIR", Path.home() / ".cache" / "paramus")
+)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# パイプラインの結果に効く入力（これ以外のプリセット項目はキーに含めない）
+KEY_FIELDS = ("device_type", "tox_m", "na_m3", "vfb", "mu0", "L_m", "W_m")
+
+# コード版の計算対象
+CODE_FILES = (
+    "physical/constants.py",
+    "physical/poisson.py",
+    "physical/poisson_fd.py",
+    "physical/scalar.py",
+    "physical/iv.py",
+    "physical/extract.py",
+    "physical/mapping.py",
+    "modelcard/build.py",
+    "modelcard/template_bsim4.tpl",
+)
+
+# 既定値と違うときだけキーに含めるパイプラインの選択肢（既定の設定ではキーが変わらない）
+PIPELINE_DEFAULTS = {"poisson": "analytic", "extraction": "curves"}
+
+
+@lru_cache(maxsize=1)
+def pipeline_code_version() -> str:
+    """パイプラインを構成するソースファイルの内容ハッシュ。"""
+    h = hashlib.sha256()
+    for rel in CODE_FILES:
+        h.update(rel.encode())
+        h.update((PARAMUS_ROOT / rel).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def cache_key(phys: Dict, temperature: float = 300.0, extra: Optional[Dict] = None) -> str:
+    """物理入力・温度・コード版からキャッシュキーを作る。"""
+    p = _ensure_si_units(phys)
+    norm = {k: p.get(k, "nmos" if k == "device_type" else None) for k in KEY_FIELDS}
+    for k in KEY_FIELDS[1:]:
+        norm[k] = repr(float(norm[k]))
+    payload = {
+        "phys": norm,
+        "temperature": repr(float(temperature)),
+        "code": pipeline_code_version(),
+        "extra": extra or {},
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def pipeline_extra(**options) -> Optional[Dict]:
+    """既定値と異なるパイプラインの選択肢だけを cache_key の extra 用に返す。"""
+    extra = {k: v for k, v in options.items() if v != PIPELINE_DEFAULTS.get(k)}
+    return extra or None
+
+
+class ParamusCache:
+    """容量上限付き LRU のディスクキャッシュ。"""
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[Dict, str]]:
+        """(params, modelcard テキスト) を返す。無ければ None。"""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU 用に最終利用時刻を更新
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["params"], entry["text"]
+
+    def put(self, key: str, params: Dict, text: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        tmp.write_text(json.dumps({"params": params, "text": text}), encoding="utf-8")
+        os.replace(tmp, path)  # 途中で落ちても壊れたエントリを残さない
+        self._evict()
+
+    def _entries(self):
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if e.name.endswith(".json"):
+                    st = e.stat()
+                    yield st.st_mtime_ns, st.st_size, e.path
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def record_stats(self) -> Dict:
+        """このインスタンスのヒット/ミス数を root/stats.json の累計に加算して返す。"""
+        path = self.root / "stats.json"
+        try:
+            total = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            total = {"hits": 0, "misses": 0, "evictions": 0}
+        total["hits"] += self.hits
+        total["misses"] += self.misses
+        total["evictions"] += self.evictions
+        path.write_text(json.dumps(total), encoding="utf-8")
+        self.hits = self.misses = self.evictions = 0
+        return total
+
+    def clear(self) -> None:
+        for _, _, path in list(self._entries()):
+            os.remove(path)
+
+    def stats(self) -> Dict:
+        entries = list(self._entries())
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
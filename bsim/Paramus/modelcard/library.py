@@ -0,0 +1,54 @@
+from pathlib import Path
+from typing import Iterable, Tuple
+
+
+LIBRARY_HEADER = "* Paramus Physical Edition generated BSIM4 model library\n"
+
+
+def _block(text: str) -> str:
+    # ブロック間に空行を 1 行入れる
+    return "\n" + (text if text.endswith("\n") else text + "\n")
+
+
+def write_library(out_path: Path, blocks: Iterable[str], header: str = LIBRARY_HEADER) -> int:
+    """
+    複数の .model ブロック（文字列）を 1 つのライブラリファイルへ順に書き出す。
+    blocks はジェネレータでもよく、届いた順にストリーム書き込みする。
+    戻り値は書き込んだブロック数。
+    """
+    count = 0
+    with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(header)
+        for text in blocks:
+            f.write(_block(text))
+            count += 1
+    return count
+
+
+def write_modelcards(texts: Iterable[str], out_path: Path, header: str = LIBRARY_HEADER) -> int:
+    """
+    全カードを 1 つのバッファに連結し、1 回の write でライブラリを出力する。
+    カード数が分かっていてメモリに載る場合（render_table の戻り値など）はこちらの方が速い。
+    """
+    blocks = [_block(t) for t in texts]
+    with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(header + "".join(blocks))
+    return len(blocks)
+
+
+def write_sectioned_library(
+    out_path: Path, sections: Iterable[Tuple[str, str]], header: str = LIBRARY_HEADER
+) -> int:
+    """
+    (セクション名, .model テキスト) の列を .lib NAME 〜 .endl NAME で区切って書き出す。
+    ネットリストからは .lib "file" NAME で 1 セクションだけ読み込める。
+    """
+    count = 0
+    with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(header)
+        for name, body in sections:
+            f.write(f"\n.lib {name}\n")
+            f.write(body if body.endswith("\n") else body + "\n")
+            f.write(f".endl {name}\n")
+            count += 1
+    return count
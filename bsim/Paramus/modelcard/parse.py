@@ -0,0 +1,249 @@
+"""
+SPICE .model カードの読み込み（Paramus 生成カード・手書きカード・dim の L/W カード共通）。
+
+    cards = parse_file("nmos.sp")          # -> (ModelCard, ...)
+    cards[0].params["vth0"]                # 0.487...
+    table = cards_to_table(load_cards(paths))   # 列指向の BsimTable（無い値は NaN）
+    diff_cards(a, b)                       # {"vth0": (0.40, 0.43), ...}
+    format_card(card, {"vth0": 0.43})      # 値を差し替えた .model テキスト
+
+対応する書式:
+    - "+" で始まる継続行、"*" コメント行、行内コメント（";" / " $"）
+    - "name = value" / "name=value"、括弧付き .model name nmos (level=54 ...)
+    - 数値の接尾辞 T G MEG K MIL M U N P F A（大文字小文字を区別しない。後ろの単位文字は無視）
+    - .lib NAME 〜 .endl のセクション（ModelCard.section に入る）
+数値にならない値（{式} など）は raw に文字列で残す。
+
+カードは論理行を 1 本ずつ処理して組み立てる（parse_lines は任意の行イテラブルを受け付ける）。
+解析結果は内容の sha256 でキャッシュし、同じ中身なら別パスでも解析し直さない。
+パスごとに (mtime, size) も覚えておき、変わっていなければハッシュ計算も省く。
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+SUFFIXES = {
+    "t": 1e12, "g": 1e9, "meg": 1e6, "k": 1e3, "mil": 25.4e-6,
+    "m": 1e-3, "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15, "a": 1e-18,
+}
+
+_NUMBER = re.compile(r"([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(meg|mil|[tgkmunpfa])?[a-z]*$", re.I)
+_ASSIGN = re.compile(r"([A-Za-z_]\w*)\s*=\s*(\{[^}]*\}|'[^']*'|[^\s(),=]+)")
+
+PARSE_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class ModelCard:
+    name: str
+    device_type: str                 # nmos / pmos（.model 行の型を小文字で）
+    params: Dict[str, float]         # 小文字のパラメータ名 → 値（level も含む）
+    raw: Dict[str, str] = field(default_factory=dict)  # 数値にならなかった値
+    section: Optional[str] = None    # .lib セクション名
+    source: str = ""
+
+
+def parse_value(token: str) -> Optional[float]:
+    """SPICE の数値表記（1.5e6, 10n, 2.2meg, 0.13u, 1.2V）を float にする。数値でなければ None。"""
+    m = _NUMBER.match(token.strip())
+    if m is None:
+        return None
+    value = float(m.group(1))
+    suffix = m.group(2)
+    return value * SUFFIXES[suffix.lower()] if suffix else value
+
+
+def _strip_comment(line: str) -> str:
+    for mark in (";", " $", "\t$"):
+        pos = line.find(mark)
+        if pos >= 0:
+            line = line[:pos]
+    return line
+
+
+def _logical_lines(lines: Iterable[str]) -> Iterator[str]:
+    """継続行（+）を連結した論理行を 1 本ずつ返す。コメント行は読み飛ばす。"""
+    current: Optional[str] = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("*"):
+            continue
+        stripped = _strip_comment(stripped).strip()
+        if not stripped:
+            continue
+        if stripped.startswith("+"):
+            if current is not None:
+                current += " " + stripped[1:]
+            continue
+        if current is not None:
+            yield current
+        current = stripped
+    if current is not None:
+        yield current
+
+
+def _card_from_line(line: str, section: Optional[str], source: str) -> Optional[ModelCard]:
+    head = line.replace("(", " ").replace(")", " ").split(None, 3)
+    if len(head) < 3:
+        return None
+    name, dev_type = head[1], head[2].lower()
+    params: Dict[str, float] = {}
+    raw: Dict[str, str] = {}
+    for key, value in _ASSIGN.findall(head[3] if len(head) > 3 else ""):
+        key = key.lower()
+        num = parse_value(value)
+        if num is None:
+            raw[key] = value
+        else:
+            params[key] = num
+    return ModelCard(name=name, device_type=dev_type, params=params, raw=raw, section=section, source=source)
+
+
+def parse_lines(lines: Iterable[str], source: str = "") -> Tuple[ModelCard, ...]:
+    """行のイテラブル（ファイルオブジェクトでよい）から .model カードを順に取り出す。"""
+    cards: List[ModelCard] = []
+    section: Optional[str] = None
+    for line in _logical_lines(lines):
+        word = line.split(None, 1)[0].lower()
+        if word == ".model":
+            card = _card_from_line(line, section, source)
+            if card is not None:
+                cards.append(card)
+        elif word == ".lib":
+            # ".lib NAME" はセクション開始、".lib "file" NAME" は参照なので無視
+            rest = line.split()[1:]
+            if len(rest) == 1 and not rest[0].startswith(("'", '"')):
+                section = rest[0]
+        elif word == ".endl":
+            section = None
+    return tuple(cards)
+
+
+class _ParseCache:
+    """sha256(内容) → カード列の LRU と、パス → (mtime_ns, size, sha256) の対応表。"""
+
+    def __init__(self, max_entries: int = PARSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.by_digest: "OrderedDict[str, Tuple[ModelCard, ...]]" = OrderedDict()
+        self.by_path: Dict[Path, Tuple[int, int, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, path: Path) -> Tuple[ModelCard, ...]:
+        st = path.stat()
+        known = self.by_path.get(path)
+        data = None
+        if known is not None and known[:2] == (st.st_mtime_ns, st.st_size):
+            digest = known[2]
+        else:
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            self.by_path[path] = (st.st_mtime_ns, st.st_size, digest)
+
+        cards = self.by_digest.get(digest)
+        if cards is not None:
+            self.by_digest.move_to_end(digest)
+            self.hits += 1
+            return cards
+
+        self.misses += 1
+        if data is None:
+            data = path.read_bytes()
+        cards = parse_lines(data.decode("utf-8", errors="replace").splitlines(), source=str(path))
+        self.by_digest[digest] = cards
+        if len(self.by_digest) > self.max_entries:
+            self.by_digest.popitem(last=False)
+        return cards
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.by_digest)}
+
+
+_CACHE = _ParseCache()
+
+
+def parse_file(path) -> Tuple[ModelCard, ...]:
+    """
+    1 ファイル中の .model カードを返す（内容ハッシュでキャッシュ）。
+    返すカードはキャッシュと共有なので変更しないこと。
+    同じ内容を別パスから読んだ場合、source は最初に解析したパスになる。
+    """
+    return _CACHE.lookup(Path(path).resolve())
+
+
+def load_cards(paths: Iterable) -> List[ModelCard]:
+    """複数ファイルのカードを順に連結して返す。"""
+    cards: List[ModelCard] = []
+    for p in paths:
+        cards.extend(parse_file(p))
+    return cards
+
+
+def parse_cache_stats() -> Dict:
+    return _CACHE.stats()
+
+
+def cards_to_table(cards: List[ModelCard], names: Optional[Iterable[str]] = None):
+    """
+    カード列を列指向の BsimTable にする（列名は大文字、カードに無い値は NaN）。
+    names を指定するとその列だけ、省略時は全カードに現れたパラメータの和集合。
+    """
+    import numpy as np
+    from physical.mapping import BsimTable
+
+    if names is None:
+        seen: Dict[str, None] = {}
+        for card in cards:
+            seen.update(dict.fromkeys(card.params))
+        names = list(seen)
+    columns = {
+        key.upper(): np.array([c.params.get(key, np.nan) for c in cards], dtype=float)
+        for key in (n.lower() for n in names)
+    }
+    is_nmos = np.array([c.device_type == "nmos" for c in cards], dtype=bool)
+    return BsimTable(columns=columns, is_nmos=is_nmos)
+
+
+def diff_cards(a: ModelCard, b: ModelCard, rtol: float = 1e-9, atol: float = 0.0) -> Dict[str, Tuple]:
+    """
+    2 枚のカードで値の違うパラメータを {名前: (a の値, b の値)} で返す。
+    片方にしか無いパラメータは相手側を None にする。
+    """
+    out: Dict[str, Tuple] = {}
+    for key in list(a.params) + [k for k in b.params if k not in a.params]:
+        va, vb = a.params.get(key), b.params.get(key)
+        if va is None or vb is None:
+            out[key] = (va, vb)
+        elif abs(va - vb) > atol + rtol * max(abs(va), abs(vb)):
+            out[key] = (va, vb)
+    return out
+
+
+def format_card(card: ModelCard, params: Optional[Dict[str, float]] = None, name: Optional[str] = None) -> str:
+    """
+    ModelCard を .model テキストに戻す（params で値を上書き、name でモデル名を変更できる）。
+    数値は repr で書くので parse_file で読み直すと同じ値になる。raw の値はそのまま出す。
+    """
+    values: Dict[str, object] = dict(card.params)
+    if params:
+        values.update({k.lower(): float(v) for k, v in params.items()})
+    values.update(card.raw)
+    level = values.pop("level", None)
+    head = f".model {name or card.name} {card.device_type}"
+    if level is not None:
+        head += f" level={level:g}"
+    width = max((len(k) for k in values), default=0)
+    lines = [head] + [f"+ {k:<{width}} = {_format_value(v)}" for k, v in values.items()]
+    return "\n".join(lines) + "\n"
+
+
+def _format_value(v) -> str:
+    if not isinstance(v, float):
+        return str(v)
+    if v.is_integer() and abs(v) < 1e15:
+        return str(int(v))  # capmod = 2 など整数のパラメータ
+    return repr(v)
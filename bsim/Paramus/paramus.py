@@ -2,23 +2,25 @@ import argparse
 import json
 from pathlib import Path
 
-from physical.poisson import run_poisson
-from physical.iv import generate_iv_data
-from physical.extract import extract_core_params
-from physical.mapping import map_to_bsim_params
-from modelcard.build import build_modelcard
-
-
-PRESET_DIR = Path(__file__).parent / "presets"
+from physical.presets import get_registry
+from physical.poisson import run_poisson, _ensure_si_units
+from physical.scalar import (
+    generate_iv_scalar, extract_core_scalar, extract_core_direct_scalar, map_to_bsim_scalar,
+)
+from modelcard.build import render_modelcard
+from modelcard.library import write_library, write_modelcards
+from profiler import stage_of
 
 
 def load_preset(node: str, dev_type: str) -> dict:
-    """プリセット JSON を読み込む。例: node="130nm", dev_type="nmos"."""
-    fname = f"{dev_type}_{node}.json"
-    path = PRESET_DIR / fname
-    if not path.exists():
-        raise FileNotFoundError(f"Preset not found: {path}")
-    return json.loads(path.read_text(encoding="utf-8"))
+    """
+    プリセットを返す。例: node="130nm", dev_type="nmos"。
+    presets/ はプロセス内で 1 回だけ読み込み、中間ノード（例: 110nm）は補間する。
+    """
+    try:
+        return get_registry().get(node, dev_type)
+    except KeyError as e:
+        raise FileNotFoundError(f"Preset not found: {dev_type}_{node} ({e.args[0]})") from None
 
 
 def override_physical_params(base: dict, args: argparse.Namespace) -> dict:
@@ -54,38 +56,521 @@ def build_argparser() -> argparse.ArgumentParser:
     p.add_argument("--u0", type=float, help="mobility [m^2/Vs]")
     p.add_argument("--L", type=float, help="channel length [m]")
     p.add_argument("--W", type=float, help="channel width [m]")
+    p.add_argument("--backend", type=str, default="scalar", choices=["scalar", "numpy"],
+                   help="single-card pipeline (scalar: fast start without NumPy)")
+    p.add_argument("--poisson", type=str, default="analytic", choices=["analytic", "numerical"],
+                   help="Vth from the closed-form model or a numerical 1-D Poisson solve")
+    p.add_argument("--extraction", type=str, choices=["curves", "direct"],
+                   help="extract from synthetic I-V curves, or directly in closed form "
+                        "(default: curves, direct in inverse mode)")
+
+    # 結果キャッシュ
+    p.add_argument("--cache", action="store_true", help="reuse cached results for identical inputs")
+    p.add_argument("--cache-dir", type=str, help="cache directory (default: ~/.cache/paramus)")
+    p.add_argument("--cache-max-mb", type=float, default=64.0, help="cache size limit [MB]")
+    p.add_argument("--cache-stats", action="store_true", help="print cache hit/miss statistics")
+
+    # Monte Carlo（統計モデルライブラリ）
+    p.add_argument("--mc", type=int, help="generate N statistical cards into one library (--out)")
+    p.add_argument("--mc-spec", type=str, help="JSON file with distributions / correlations")
+    p.add_argument("--seed", type=int, default=0, help="Monte Carlo random seed")
+    p.add_argument("--jobs", type=int, default=1, help="worker processes for Monte Carlo")
+
+    # 逆 Paramus（目標 Vth / Idsat → 物理パラメータ）
+    p.add_argument("--target-vth", type=float, help="target threshold voltage [V] (inverse mode)")
+    p.add_argument("--target-idsat", type=float, help="target drive current [A] (inverse mode)")
+    p.add_argument("--targets", type=str, help="CSV (vth,idsat) or JSON list of targets (inverse mode)")
+    p.add_argument("--solve-for", type=str, default="na", choices=["na", "vfb"],
+                   help="parameter solved for the Vth target (tox is solved from Idsat)")
+
+    # 温度・プロセスコーナー
+    p.add_argument("--corners", action="store_true",
+                   help="write NMOS/PMOS cards for all corners into one sectioned .lib (--out)")
+    p.add_argument("--temps", type=str, default="LT,RT,HT",
+                   help="temperature corners: LT/RT/HT tags or values in degC (e.g. -40,25,125)")
+    p.add_argument("--process", type=str,
+                   help="process corners to combine with temperatures (e.g. TT,FF,SS,FS,SF)")
+    p.add_argument("--model-name", type=str, default="paramus_{type}",
+                   help="model name format for corner sections / geometry bins ({type} = nmos/pmos)")
+
+    # ジオメトリビン
+    p.add_argument("--bin-l", type=str,
+                   help="channel lengths [m] of the L bins (e.g. 0.1e-6,0.13e-6,1e-6) -> binned library")
+    p.add_argument("--bin-w", type=str,
+                   help="channel widths [m] of the W bins (e.g. 0.5e-6,1e-6,10e-6) -> binned library")
+
+    # ストリーミングバッチ
+    p.add_argument("--batch", type=str, metavar="SPECS",
+                   help="JSONL/CSV of device specs (node, type, tox, na, vfb, u0, L, W, temperature, name); "
+                        "'-' reads JSONL from stdin. Writes a library, or parameters if --out is .jsonl")
+    p.add_argument("--batch-chunk", type=int, default=BATCH_CHUNK, help="specs evaluated per chunk")
+
+    # 計測
+    p.add_argument("--profile", nargs="?", const="-", metavar="JSON",
+                   help="record wall time / peak memory per stage (JSON to stdout or to the given file)")
+
+    # 感度解析
+    p.add_argument("--sensitivity", action="store_true",
+                   help="also write d(VTH0,U0,PCLM,TOXM)/d(tox,Na,Vfb,u0,L,W) to <out>.sens.json")
 
     return p
 
 
+def run_pipeline(
+    phys: dict,
+    temperature: float = 300.0,
+    backend: str = "scalar",
+    profiler=None,
+    poisson: str = "analytic",
+    extraction: str = "curves",
+) -> dict:
+    """
+    物理パラメータ 1 組から BSIM4 パラメータ dict を求める（手順 2〜5）。
+    backend="scalar" は math のみの高速起動版（NumPy を import しない）、
+    backend="numpy" は iv.py / extract.py / mapping.py の配列版で同じ結果を返す。
+    poisson="numerical" は Vth を数値 1 次元 Poisson（poisson_fd.py）で求める。
+    extraction="direct" は擬似 IV を作らず、VTH0 / U0 / PCLM を閉形式で求める。
+    profiler（StageProfiler）を渡すと各段の時間・メモリを記録する。
+    """
+    if backend == "scalar":
+        generate_iv = generate_iv_scalar
+        extract = extract_core_scalar
+        extract_direct = extract_core_direct_scalar
+        map_params = map_to_bsim_scalar
+    elif backend == "numpy":
+        from physical.iv import generate_iv_data as generate_iv
+        from physical.extract import extract_core_params as extract
+        from physical.extract import extract_core_direct as extract_direct
+        from physical.mapping import map_to_bsim_params as map_params
+    else:
+        raise ValueError(f"unknown backend: {backend}")
+    if extraction not in ("curves", "direct"):
+        raise ValueError(f"unknown extraction mode: {extraction}")
+
+    if poisson == "analytic":
+        solve_poisson = run_poisson
+    elif poisson == "numerical":
+        from physical.poisson_fd import run_poisson_fd as solve_poisson
+    else:
+        raise ValueError(f"unknown poisson model: {poisson}")
+
+    stage = stage_of(profiler)
+
+    # 2) Poisson 近似
+    with stage("run_poisson"):
+        pois = solve_poisson(phys, temperature)
+
+    if extraction == "direct":
+        # 3+4) 擬似カーブを経由せず閉形式で抽出
+        with stage("extract_core_params"):
+            core_params = extract_direct(phys, pois)
+    else:
+        # 3) 擬似 IV データ生成
+        with stage("generate_iv_data"):
+            iv_data = generate_iv(phys, pois)
+
+        # 4) VTH0 / U0 / PCLM など抽出
+        with stage("extract_core_params"):
+            core_params = extract(phys, pois, iv_data)
+
+    # 5) BSIM4 パラメータセットへ変換
+    with stage("map_to_bsim_params"):
+        bsim_params = map_params(phys, pois, core_params)
+
+    dev_type = phys.get("device_type", "nmos")
+    bsim_params["DEVICE_TYPE"] = dev_type
+    bsim_params["MODEL_NAME"] = f"paramus_{dev_type}"
+    return bsim_params
+
+
+def generate_card(
+    phys: dict,
+    temperature: float = 300.0,
+    cache=None,
+    backend: str = "scalar",
+    profiler=None,
+    poisson: str = "analytic",
+    extraction: str = "curves",
+):
+    """
+    (BSIM4 パラメータ, modelcard テキスト) を返す。
+    cache（ParamusCache）があれば同一入力の結果を再利用する。
+    """
+    key = None
+    if cache is not None:
+        from modelcard.cache import cache_key, pipeline_extra
+
+        key = cache_key(phys, temperature, pipeline_extra(poisson=poisson, extraction=extraction))
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+
+    bsim_params = run_pipeline(phys, temperature, backend, profiler, poisson, extraction)
+    with stage_of(profiler)("build_modelcard"):
+        text = render_modelcard(bsim_params)
+    if cache is not None:
+        cache.put(key, bsim_params, text)
+    return bsim_params, text
+
+
+def open_cache(args: argparse.Namespace):
+    """--cache 指定時に ParamusCache を開く。"""
+    if not args.cache:
+        return None
+    from modelcard.cache import ParamusCache, DEFAULT_CACHE_DIR
+
+    root = Path(args.cache_dir) if args.cache_dir else DEFAULT_CACHE_DIR
+    return ParamusCache(root, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+
+def run_monte_carlo(phys: dict, args: argparse.Namespace) -> None:
+    """--mc 指定時: N 個の統計カードを 1 つの .lib にストリーム出力する。"""
+    from physical.montecarlo import generate_mc_blocks
+
+    spec = None
+    if args.mc_spec:
+        spec = json.loads(Path(args.mc_spec).read_text(encoding="utf-8"))
+
+    blocks = generate_mc_blocks(
+        phys, args.mc, spec=spec, seed=args.seed, jobs=args.jobs,
+        poisson=args.poisson, extraction=args.extraction,
+    )
+    out_path = Path(args.out)
+    write_library(out_path, blocks)
+    print(f"[Paramus] generated {args.mc} Monte Carlo BSIM4 models -> {out_path}")
+
+
+BATCH_CHUNK = 4096
+SPEC_OVERRIDE_KEYS = ("tox", "na", "vfb", "u0", "L", "W")
+
+
+def read_specs(path: str):
+    """
+    --batch の入力を 1 行ずつ dict で返す（全体を読み込まない）。
+    .csv はヘッダ行の列名がキー（空欄は未指定）、それ以外は JSON lines。"-" は stdin の JSON lines。
+    """
+    import sys
+
+    if path == "-":
+        f = sys.stdin
+    else:
+        f = open(path, encoding="utf-8", newline="")
+    try:
+        if path.endswith(".csv"):
+            import csv
+
+            for row in csv.DictReader(f):
+                yield {k: v for k, v in row.items() if v not in (None, "")}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def spec_to_phys(spec: dict, args: argparse.Namespace, presets: dict = None) -> dict:
+    """
+    1 行分の spec を物理パラメータ dict にする。行の値 > CLI の値 > プリセットの順に効く。
+    presets に dict を渡すと (node, type) ごとのプリセットをそこに覚えて使い回す。
+    """
+    dev_type = spec.get("type", args.type)
+    key = (spec.get("node", args.node), dev_type)
+    if presets is None:
+        preset = load_preset(*key)
+    else:
+        if key not in presets:
+            presets[key] = load_preset(*key)
+        preset = presets[key]
+    merged = argparse.Namespace(**{
+        k: spec[k] if spec.get(k) is not None else getattr(args, k) for k in SPEC_OVERRIDE_KEYS
+    })
+    phys = override_physical_params(preset, merged)
+    phys["device_type"] = dev_type
+    return phys
+
+
+def batch_chunks(specs, args: argparse.Namespace, chunk_size: int = BATCH_CHUNK):
+    """
+    spec の列を chunk_size 行ずつ run_paramus_batch に通し、(名前, BsimTable) を順に返す。
+    同時に持つのは 1 チャンク分だけなので、入力が何行でもメモリは一定。
+    """
+    from itertools import islice
+
+    from physical.poisson import PhysBatch
+    from physical.batch import run_paramus_batch
+
+    it = iter(specs)
+    index = 0
+    presets: dict = {}
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        rows, temps, names = [], [], []
+        for spec in chunk:
+            try:
+                phys = spec_to_phys(spec, args, presets)
+            except (KeyError, ValueError, FileNotFoundError) as e:
+                raise ValueError(f"batch spec #{index}: {e}") from None
+            rows.append(phys)
+            temps.append(float(spec.get("temperature", 300.0)))
+            base = args.model_name.format(type=phys["device_type"])
+            names.append(spec.get("name") or f"{base}_{index:06d}")
+            index += 1
+        table = run_paramus_batch(
+            PhysBatch.from_dicts(rows), temps, poisson=args.poisson, extraction=args.extraction
+        )
+        yield names, table
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """
+    --batch 指定時: spec をチャンクごとに処理して --out に逐次書き出す。
+    --out が .jsonl ならパラメータを 1 行 1 JSON で、それ以外は複数モデルのライブラリにする。
+    """
+    from modelcard.build import render_table
+
+    out_path = Path(args.out)
+    chunks = batch_chunks(read_specs(args.batch), args, args.batch_chunk)
+    count = 0
+    if out_path.suffix == ".jsonl":
+        with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+            for names, table in chunks:
+                cols = {k: v.tolist() for k, v in table.columns.items()}
+                types = ["nmos" if x else "pmos" for x in table.is_nmos.tolist()]
+                for i, name in enumerate(names):
+                    rec = {"name": name, "type": types[i]}
+                    rec.update((k, col[i]) for k, col in cols.items())
+                    f.write(json.dumps(rec) + "\n")
+                count += len(names)
+    else:
+        def blocks():
+            nonlocal count
+            for names, table in chunks:
+                count += len(names)
+                yield "\n".join(render_table(table, names))
+
+        write_library(out_path, blocks())
+    print(f"[Paramus] processed {count} batch specs -> {out_path}")
+
+
+def load_targets(path: str):
+    """--targets のファイル（CSV: vth,idsat 列 / JSON: [{"vth":..,"idsat":..}, ...]）を読む。"""
+    text = Path(path).read_text(encoding="utf-8")
+    if path.endswith(".json"):
+        rows = json.loads(text)
+    else:
+        import csv
+
+        rows = list(csv.DictReader(text.splitlines()))
+    return [float(r["vth"]) for r in rows], [float(r["idsat"]) for r in rows]
+
+
+def run_inverse(phys: dict, args: argparse.Namespace) -> None:
+    """
+    --target-vth/--target-idsat または --targets 指定時: 目標から tox と Na（または Vfb）を解き、
+    カードを --out に、解いた物理パラメータを同名の .json に書き出す。
+    """
+    from physical.inverse import solve_targets
+    from modelcard.build import render_table
+
+    if args.targets:
+        vth, idsat = load_targets(args.targets)
+    else:
+        if args.target_vth is None or args.target_idsat is None:
+            raise SystemExit("inverse mode needs both --target-vth and --target-idsat (or --targets)")
+        vth, idsat = [args.target_vth], [args.target_idsat]
+
+    res = solve_targets(phys, vth, idsat, solve_for=args.solve_for, extraction=args.extraction)
+    n = len(res.phys)
+    names = None
+    if args.targets:
+        names = [f"paramus_{args.type}_t{i:04d}" for i in range(n)]
+    texts = render_table(res.table, names)
+
+    out_path = Path(args.out)
+    if n == 1:
+        out_path.write_text(texts[0], encoding="utf-8")
+    else:
+        write_modelcards(texts, out_path)
+
+    solved = []
+    for i in range(n):
+        row = res.phys.row(i)
+        row.update(
+            target_vth=vth[i],
+            target_idsat=idsat[i],
+            vth=float(res.pois.vth[i]),
+            idsat=float(res.idsat[i]),
+            converged=bool(res.converged[i]),
+        )
+        solved.append(row)
+    json_path = out_path.with_suffix(".json")
+    json_path.write_text(json.dumps(solved, indent=2), encoding="utf-8")
+
+    failed = n - int(res.converged.sum())
+    print(f"[Paramus] solved {n} target(s) ({failed} out of range) -> {out_path}, {json_path}")
+
+
+def both_devices(phys: dict, args: argparse.Namespace) -> dict:
+    """--type 側は上書き済みの phys、もう片方は同じノードのプリセットにした {nmos, pmos}。"""
+    devices = {}
+    for dev_type in ("nmos", "pmos"):
+        if dev_type == args.type:
+            devices[dev_type] = phys
+        else:
+            devices[dev_type] = load_preset(args.node, dev_type)
+    return devices
+
+
+def run_corners(phys: dict, args: argparse.Namespace) -> None:
+    """
+    --corners 指定時: NMOS / PMOS × 温度 ×（プロセス）を 1 回のバッチで評価し、
+    セクション付き .lib に書き出す。--tox などの上書きは --type 側のデバイスにだけ効く。
+    """
+    from physical.corners import generate_corner_sections, parse_temps
+    from modelcard.library import write_sectioned_library
+
+    devices = both_devices(phys, args)
+    processes = [c.strip().upper() for c in args.process.split(",")] if args.process else None
+    sections = generate_corner_sections(
+        devices, parse_temps(args.temps), processes, name_fmt=args.model_name,
+        poisson=args.poisson, extraction=args.extraction,
+    )
+    out_path = Path(args.out)
+    write_sectioned_library(out_path, sections)
+    names = ", ".join(name for name, _ in sections)
+    print(f"[Paramus] generated {len(sections)} corner sections ({names}) -> {out_path}")
+
+
+def run_binning(phys: dict, args: argparse.Namespace) -> None:
+    """
+    --bin-l / --bin-w 指定時: L × W グリッドの全ジオメトリを NMOS / PMOS とも 1 回のバッチで評価し、
+    lmin/lmax/wmin/wmax 付きのビンモデルを 1 つのライブラリに書き出す。
+    片方のグリッドを省略したらプリセットの L / W 1 点とする。
+    """
+    from physical.binning import generate_binned_cards, parse_lengths
+
+    p = _ensure_si_units(phys)
+    l_grid = parse_lengths(args.bin_l) if args.bin_l else [float(p["L_m"])]
+    w_grid = parse_lengths(args.bin_w) if args.bin_w else [float(p["W_m"])]
+    cards = generate_binned_cards(
+        both_devices(phys, args), l_grid, w_grid, name_fmt=args.model_name,
+        poisson=args.poisson, extraction=args.extraction,
+    )
+    out_path = Path(args.out)
+    write_modelcards(cards, out_path)
+    print(f"[Paramus] generated {len(cards)} binned models "
+          f"({len(l_grid)} L x {len(w_grid)} W x 2 devices) -> {out_path}")
+
+
+def write_profile(profiler, args: argparse.Namespace) -> None:
+    """--profile の結果を JSON で出す（"-" なら標準出力）。"""
+    report = profiler.report()
+    report["backend"] = args.backend
+    report["cache"] = bool(args.cache)
+    profiler.stop()
+    text = json.dumps(report, indent=2)
+    if args.profile == "-":
+        print(text)
+    else:
+        Path(args.profile).write_text(text, encoding="utf-8")
+        print(f"[Paramus] profile -> {args.profile}")
+
+
+def write_sensitivity(phys: dict, out_path: Path, extraction: str = "curves") -> Path:
+    """--sensitivity 指定時: 前進モードのヤコビアンを JSON に書き出す。"""
+    from physical.poisson import PhysBatch
+    from physical.sensitivity import run_sensitivity_batch, INPUTS
+
+    sens = run_sensitivity_batch(PhysBatch.from_dicts([phys]), extraction=extraction)
+    log_sens = sens.normalized()
+    data = {
+        "inputs": list(INPUTS),
+        "jacobian": {k: v[0].tolist() for k, v in sens.jacobian.items()},
+        "normalized": {k: v[0].tolist() for k, v in log_sens.items()},
+    }
+    sens_path = out_path.with_suffix(".sens.json")
+    sens_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return sens_path
+
+
 def main() -> None:
     parser = build_argparser()
     args = parser.parse_args()
 
+    profiler = None
+    if args.profile:
+        from profiler import StageProfiler
+
+        profiler = StageProfiler()
+    stage = stage_of(profiler)
+
     # 1) プリセット読み込み
-    preset = load_preset(args.node, args.type)
+    with stage("preset_load"):
+        preset = load_preset(args.node, args.type)
+
+    # 逆解き・感度は解析的な Poisson モデルを手で逆に解いて／微分しているので数値解は使えない
+    inverse = args.targets or args.target_vth is not None or args.target_idsat is not None
+    if args.poisson != "analytic" and (inverse or args.sensitivity):
+        parser.error("--poisson numerical is not supported in inverse mode or with --sensitivity")
+    if args.extraction is None:
+        # 逆解きはカードの VTH0 = 解いた Vth になるよう閉形式で作る
+        args.extraction = "direct" if inverse else "curves"
 
     # JSON では nm, cm^-3 等なので SI 単位に変換したフィールドを追加済み想定
     # （ファイル側で tox_m, na_m3 などを持たせている）
     phys = override_physical_params(preset, args)
 
-    # 2) Poisson 近似
-    pois = run_poisson(phys)
+    if args.mc:
+        run_monte_carlo(phys, args)
+        return
 
-    # 3) 擬似 IV データ生成
-    iv_data = generate_iv_data(phys, pois)
+    if args.batch:
+        run_batch(args)
+        return
 
-    # 4) VTH0 / U0 / PCLM など抽出
-    core_params = extract_core_params(phys, pois, iv_data)
+    if args.corners:
+        run_corners(phys, args)
+        return
 
-    # 5) BSIM4 パラメータセットへ変換
-    bsim_params = map_to_bsim_params(phys, pois, core_params)
+    if args.bin_l or args.bin_w:
+        run_binning(phys, args)
+        return
+
+    if inverse:
+        run_inverse(phys, args)
+        return
+
+    phys.setdefault("device_type", args.type)
+    cache = open_cache(args)
+
+    # 2)〜5) Poisson → IV → 抽出 → BSIM4 マッピング（キャッシュがあれば再利用）
+    _, text = generate_card(
+        phys, cache=cache, backend=args.backend, profiler=profiler,
+        poisson=args.poisson, extraction=args.extraction,
+    )
 
     # 6) テンプレートに流し込み modelcard 出力
     out_path = Path(args.out)
-    build_modelcard(bsim_params, out_path)
+    with stage("write_output"):
+        out_path.write_text(text, encoding="utf-8")
     print(f"[Paramus] generated BSIM4 modelcard -> {out_path}")
 
+    if profiler is not None:
+        write_profile(profiler, args)
+
+    if args.sensitivity:
+        sens_path = write_sensitivity(phys, out_path, args.extraction)
+        print(f"[Paramus] sensitivity -> {sens_path}")
+
+    if cache is not None and args.cache_stats:
+        print(f"[Paramus] cache: {json.dumps(cache.stats())}")
+    if cache is not None:
+        cache.record_stats()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,60 @@
+"""
+Paramus バッチエンジン。
+
+paramus.py の単体パイプライン
+    run_poisson → generate_iv_data → extract_core_params → map_to_bsim_params
+を struct-of-arrays（PhysBatch）に対して NumPy 演算で一括実行し、
+結果を N 個の dict ではなく列指向の BsimTable で返す。
+
+例:
+    phys = PhysBatch.from_arrays(tox_m=tox, na_m3=na, vfb=-0.9, mu0=0.03,
+                                 L_m=130e-9, W_m=1e-6, device_type="nmos")
+    table = run_paramus_batch(phys)
+    table.columns["VTH0"]   # -> (N,) ndarray
+"""
+from typing import Dict, Iterable
+
+from .poisson import PhysBatch, run_poisson_batch
+from .iv import generate_iv_batch
+from .extract import extract_core_params_batch, extract_core_direct_batch
+from .mapping import BsimTable, map_to_bsim_batch
+
+
+def run_paramus_batch(
+    phys: PhysBatch,
+    temperature=300.0,
+    poisson: str = "analytic",
+    extraction: str = "curves",
+) -> BsimTable:
+    """
+    PhysBatch 全体に Poisson → IV → 抽出 → マッピングを一括適用する。
+    poisson="numerical" なら Vth を数値 1 次元 Poisson（poisson_fd.py）で求める。
+    extraction="direct" なら擬似カーブを作らず閉形式で VTH0 / U0 / PCLM を求める。
+    """
+    if poisson == "numerical":
+        from .poisson_fd import run_poisson_fd_batch
+
+        pois = run_poisson_fd_batch(phys, temperature)
+    elif poisson == "analytic":
+        pois = run_poisson_batch(phys, temperature)
+    else:
+        raise ValueError(f"unknown poisson model: {poisson}")
+
+    if extraction == "direct":
+        core = extract_core_direct_batch(phys, pois)
+    elif extraction == "curves":
+        iv = generate_iv_batch(phys, pois)
+        core = extract_core_params_batch(phys, pois, iv)
+    else:
+        raise ValueError(f"unknown extraction mode: {extraction}")
+    return map_to_bsim_batch(phys, pois, core)
+
+
+def run_paramus_dicts(
+    items: Iterable[Dict],
+    temperature=300.0,
+    poisson: str = "analytic",
+    extraction: str = "curves",
+) -> BsimTable:
+    """プリセット形式の dict 列をまとめてバッチ処理する。"""
+    return run_paramus_batch(PhysBatch.from_dicts(items), temperature, poisson, extraction)
@@ -0,0 +1,94 @@
+"""
+L × W ジオメトリビンの BSIM4 ライブラリ生成。
+
+L グリッド × W グリッドの全ジオメトリ（× NMOS / PMOS）を 1 つの PhysBatch にまとめて
+run_paramus_batch で 1 回だけ評価し、BSIM4 のビン付きモデルとして 1 ファイルに書き出す:
+
+    .model paramus_nmos.1 nmos level=54
+    ...
+    + lmin    = 1.14018e-07
+    + lmax    = 1.44222e-07
+    + wmin    = 7.07107e-07
+    + wmax    = 3.16228e-06
+
+ngspice はインスタンスの L / W が [lmin, lmax) × [wmin, wmax) に入る "<名前>.N" を
+自動で選ぶので、ネットリストは
+    .include "paramus_bins.lib"
+    M1 d g s b paramus_nmos L=0.13u W=1u
+のようにジオメトリごとにモデルファイルを切り替えずに済む。
+
+ビン境界は隣り合うグリッド点の幾何平均。両端のビンはグリッドの端点を
+BIN_MARGIN だけ外側に広げる（端点ちょうどの L / W が lmax の開区間から外れないように）。
+各ビンのパラメータはそのグリッド点（ビンの代表ジオメトリ）で評価する。
+"""
+from typing import Dict, List, Sequence, Tuple
+import math
+
+from modelcard.build import render_table
+
+from .poisson import PhysBatch, _ensure_si_units
+from .batch import run_paramus_batch
+
+
+BIN_MARGIN = 0.01  # 両端のビンを広げる割合
+
+
+def parse_lengths(spec: str) -> List[float]:
+    """'0.1e-6,0.13e-6,1e-6' を昇順・重複なしの長さのリスト [m] にする。"""
+    values = sorted({float(s) for s in spec.split(",") if s.strip()})
+    if not values or values[0] <= 0:
+        raise ValueError(f"invalid geometry grid: {spec!r}")
+    return values
+
+
+def bin_edges(grid: Sequence[float]) -> List[Tuple[float, float]]:
+    """昇順のグリッド点ごとに (min, max) のビン境界を返す。"""
+    edges = [grid[0] * (1.0 - BIN_MARGIN)]
+    edges += [math.sqrt(a * b) for a, b in zip(grid[:-1], grid[1:])]
+    edges.append(grid[-1] * (1.0 + BIN_MARGIN))
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def generate_binned_cards(
+    devices: Dict[str, Dict],
+    l_grid: Sequence[float],
+    w_grid: Sequence[float],
+    temperature: float = 300.0,
+    name_fmt: str = "paramus_{type}",
+    poisson: str = "analytic",
+    extraction: str = "curves",
+) -> List[str]:
+    """
+    devices: {"nmos": プリセット, "pmos": プリセット}（片方だけでもよい）
+    l_grid / w_grid: ビンの代表ジオメトリ [m]（昇順）
+    poisson / extraction: run_paramus_batch に渡す Poisson モデル・抽出方法
+    戻り値: ビン番号付きの .model テキストのリスト（デバイスごとに .1, .2, ...）
+    """
+    l_bins = bin_edges(l_grid)
+    w_bins = bin_edges(w_grid)
+
+    rows: List[Dict] = []
+    keys: List[Tuple[str, int, Tuple[float, float], Tuple[float, float]]] = []
+    for dev_type, preset in devices.items():
+        base = _ensure_si_units(preset)
+        base["device_type"] = dev_type
+        index = 0
+        for L, l_bin in zip(l_grid, l_bins):
+            for W, w_bin in zip(w_grid, w_bins):
+                index += 1
+                rows.append({**base, "L_m": L, "W_m": W})
+                keys.append((dev_type, index, l_bin, w_bin))
+
+    # 全ジオメトリを 1 回のバッチ評価で
+    table = run_paramus_batch(PhysBatch.from_dicts(rows), temperature, poisson=poisson, extraction=extraction)
+    names = [f"{name_fmt.format(type=dev_type)}.{index}" for dev_type, index, _, _ in keys]
+    texts = render_table(table, names)
+
+    cards = []
+    for (_, _, (lmin, lmax), (wmin, wmax)), text in zip(keys, texts):
+        cards.append(
+            text.rstrip("\n")
+            + f"\n+ lmin    = {lmin:.6g}\n+ lmax    = {lmax:.6g}"
+            + f"\n+ wmin    = {wmin:.6g}\n+ wmax    = {wmax:.6g}\n"
+        )
+    return cards
@@ -0,0 +1,219 @@
+"""
+BSIM4 DC コア式の NumPy 評価器（ngspice を起動しないスクリーニング用）。
+
+カード N 枚（BsimTable の列）× バイアス格子を 1 回のブロードキャストで評価する:
+
+    table = cards_to_table(load_cards(paths))          # または run_paramus_batch(...)
+    vg = np.linspace(0, 1.2, 121)
+    ids = bsim4_ids(table, vgs=vg, vds=0.05, L=0.13e-6, W=1e-6)   # -> (N, 121)
+    ids = bsim4_ids(table, vgs=vg[:, None], vds=vd[None, :], ...)  # -> (N, 121, len(vd))
+    ids = bsim4_ids(table, vg, 1.2, magnitude=True, ...)          # NMOS / PMOS 混在でも同じ格子
+
+対象は template_bsim4.tpl と dim アナライザのカードに出てくるパラメータ:
+    Vth   : VTH0, K1, K2, K3/K3B/W0（狭チャネル）, DVT0/DVT1/DVT2（SCE）,
+            DVT0W/DVT1W/DVT2W, ETA0/ETAB/DSUB（DIBL）, NDEP（NCH）, NSD, XJ
+    サブスレッショルド: VOFF, NFACTOR, MINV
+    移動度: U0, UA, UB, UC（MOBMOD=0）
+    飽和  : VSAT, DELTA, A0（Abulk）
+    出力コンダクタンス: PCLM, PDIBLC1/PDIBLC2/PDIBLCB, DROUT
+    直列抵抗: RDSW, WR（RDSMOD=0 の内部抵抗）
+カードに無いパラメータは BSIM4 の既定値（BSIM4_DEFAULTS）を使う。
+LINT/WINT・温度係数（KT1, UTE など）・ゲートリーク・GIDL・ポリ空乏・量子補正・
+VASCBE などは扱わない。サインオフは従来どおり ngspice で行う。
+
+電流の符号: PMOS はバイアスを反転して NMOS と同じ式で評価し、導通方向を正とした
+大きさを返す（アナライザの IY と同じ向き）。Vds < 0 は 0 に丸める（S/D 入れ替えはしない）。
+"""
+from typing import Dict
+import numpy as np
+
+from .constants import Q, K_B, EPS_SI, EPS_OX, NI_M3
+from .mapping import BsimTable
+
+
+# BSIM4 の既定値（NMOS）。単位はカードの表記どおり（NDEP / NSD は cm^-3）
+BSIM4_DEFAULTS: Dict[str, float] = {
+    "VTH0": 0.7,
+    "K1": 0.5,
+    "K2": 0.0,
+    "K3": 80.0,
+    "K3B": 0.0,
+    "W0": 2.5e-6,
+    "DVT0": 2.2,
+    "DVT1": 0.53,
+    "DVT2": -0.032,
+    "DVT0W": 0.0,
+    "DVT1W": 5.3e6,
+    "DVT2W": -0.032,
+    "ETA0": 0.08,
+    "ETAB": -0.07,
+    "DSUB": 0.56,
+    "NDEP": 1.7e17,
+    "NSD": 1.0e20,
+    "XJ": 1.5e-7,
+    "VOFF": -0.08,
+    "NFACTOR": 1.0,
+    "MINV": 0.0,
+    "U0": 0.067,
+    "UA": 1.0e-9,
+    "UB": 1.0e-19,
+    "UC": -0.0465e-9,     # MOBMOD=0 の単位 [m/V²]（MOBMOD=1 の -0.0465 [1/V] ではない）
+    "VSAT": 8.0e4,
+    "DELTA": 0.01,
+    "A0": 1.0,
+    "PCLM": 1.3,
+    "PDIBLC1": 0.39,
+    "PDIBLC2": 0.0086,
+    "PDIBLCB": 0.0,
+    "DROUT": 0.56,
+    "RDSW": 200.0,
+    "WR": 1.0,
+    "TOXE": 3.0e-9,
+}
+
+# 別名（BSIM3 由来の名前や Paramus カードの TOXM）。左が無ければ右を見る
+ALIASES = {"NDEP": ("NCH",), "TOXE": ("TOXM",)}
+
+_EXP_MAX = 80.0  # exp のオーバーフロー防止
+
+
+def _column(table: BsimTable, name: str, shape) -> np.ndarray:
+    """列を取り出し、NaN（カードに無い値）は別名 → 既定値の順に埋めて (N, 1, ...) にする。"""
+    n = len(table)
+    col = np.full(n, np.nan)
+    for key in (name,) + ALIASES.get(name, ()):
+        if key in table.columns:
+            col = np.where(np.isnan(col), np.asarray(table.columns[key], dtype=float), col)
+    col = np.where(np.isnan(col), BSIM4_DEFAULTS[name], col)
+    return col.reshape((n,) + (1,) * len(shape))
+
+
+def _per_card(value, n: int, shape) -> np.ndarray:
+    """スカラーまたは (N,) の幾何寸法を (N, 1, ...) にする。"""
+    return np.broadcast_to(np.asarray(value, dtype=float), (n,)).reshape((n,) + (1,) * len(shape))
+
+
+def bsim4_ids(
+    table: BsimTable,
+    vgs,
+    vds,
+    vbs=0.0,
+    L=1e-6,
+    W=1e-6,
+    temperature: float = 300.15,
+    magnitude: bool = False,
+) -> np.ndarray:
+    """
+    BsimTable の N 枚 × バイアス（vgs, vds, vbs をブロードキャストした形 S）のドレイン電流 [A]。
+    L / W はスカラーかカードごとの (N,) [m]。戻り値の形は (N,) + S。
+    バイアスは SPICE と同じ符号（PMOS は負）で与える。magnitude=True なら NMOS / PMOS とも
+    導通方向の大きさとして扱うので、混在したテーブルに同じバイアス格子を使える。
+    """
+    vgs, vds, vbs = (np.asarray(v, dtype=float) for v in (vgs, vds, vbs))
+    shape = np.broadcast_shapes(vgs.shape, vds.shape, vbs.shape)
+    # 各バイアスは自分の形のまま先頭にカード軸を足す（スカラーの Vbs などを格子全体に広げない）
+    vgs, vds, vbs = (v.reshape((1,) * (1 + len(shape) - v.ndim) + v.shape) for v in (vgs, vds, vbs))
+    n = len(table)
+    p = {name: _column(table, name, shape) for name in BSIM4_DEFAULTS}
+    leff = _per_card(L, n, shape)
+    weff = _per_card(W, n, shape)
+
+    # PMOS はバイアスと VTH0 の向きを反転して NMOS の式で評価
+    if magnitude:
+        sign = np.ones((n,) + (1,) * len(shape))
+    else:
+        sign = np.where(table.is_nmos, 1.0, -1.0).reshape((n,) + (1,) * len(shape))
+    vgs = sign * vgs
+    vds = np.maximum(sign * vds, 0.0)
+    vbs = np.minimum(sign * vbs, 0.0)
+    vth0 = np.abs(p["VTH0"])
+
+    # 単位: U0 > 1 は cm^2/Vs、NDEP / NSD は cm^-3（1e20 超は m^-3 とみなす）
+    u0 = np.where(p["U0"] > 1.0, p["U0"] * 1e-4, p["U0"])
+    ndep = np.where(p["NDEP"] > 1e20, p["NDEP"] * 1e-6, p["NDEP"]) * 1e6   # [m^-3]
+    nsd = np.where(p["NSD"] > 1e23, p["NSD"] * 1e-6, p["NSD"]) * 1e6
+
+    vt = K_B * temperature / Q
+    tox = p["TOXE"]
+    cox = EPS_OX / tox
+
+    # ---- しきい値電圧 ----
+    phis = 0.4 + vt * np.log(ndep / NI_M3)
+    sqrt_phis = np.sqrt(phis)
+    phis_vbs = np.maximum(phis - vbs, 1e-3)
+    xdep = np.sqrt(2.0 * EPS_SI * phis_vbs / (Q * ndep))
+    xdep0 = np.sqrt(2.0 * EPS_SI * phis / (Q * ndep))
+    lt = np.sqrt(EPS_SI * xdep / cox) * (1.0 + p["DVT2"] * vbs)
+    lt0 = np.sqrt(EPS_SI * xdep0 / cox)
+    ltw = np.sqrt(EPS_SI * xdep / cox) * (1.0 + p["DVT2W"] * vbs)
+    vbi = vt * np.log(nsd * ndep / NI_M3 ** 2)
+
+    def _theta(coef, length, scale):
+        arg = np.minimum(coef * length / scale, _EXP_MAX)
+        return 0.5 / (np.cosh(arg) - 1.0 + 1e-30)
+
+    d_sce = p["DVT0"] * _theta(p["DVT1"], leff, lt) * (vbi - phis)
+    d_nw = p["DVT0W"] * _theta(p["DVT1W"], leff * weff, ltw) * (vbi - phis)
+    d_dibl = (p["ETA0"] + p["ETAB"] * vbs) * _theta(p["DSUB"], leff, lt0) * vds
+    vth = (
+        vth0
+        + p["K1"] * (np.sqrt(phis_vbs) - sqrt_phis)
+        - p["K2"] * vbs
+        + (p["K3"] + p["K3B"] * vbs) * tox * phis / (weff + p["W0"])
+        - d_sce
+        - d_nw
+        - d_dibl
+    )
+
+    # ---- 実効ゲート電圧（サブスレッショルド〜強反転を連続に）----
+    cdep = EPS_SI / xdep
+    nfac = 1.0 + p["NFACTOR"] * cdep / cox
+    nvt = nfac * vt
+    m = 0.5 + np.arctan(p["MINV"]) / np.pi
+    vgst = vgs - vth
+    num = nvt * np.logaddexp(0.0, np.minimum(m * vgst / nvt, _EXP_MAX))
+    den = m + nfac * cox * np.sqrt(2.0 * phis / (Q * EPS_SI * ndep)) * np.exp(
+        np.minimum(-((1.0 - m) * vgst - p["VOFF"]) / nvt, _EXP_MAX)
+    )
+    vgsteff = num / den
+
+    # ---- 移動度・速度飽和 ----
+    eeff = (vgsteff + 2.0 * vth) / tox
+    ueff = u0 / (1.0 + (p["UA"] + p["UC"] * vbs) * eeff + p["UB"] * eeff ** 2)
+    esat = 2.0 * p["VSAT"] / ueff
+    esat_l = esat * leff
+    abulk = 1.0 + p["K1"] / (2.0 * np.sqrt(phis_vbs)) * (
+        p["A0"] * leff / (leff + 2.0 * np.sqrt(p["XJ"] * xdep))
+    )
+
+    vgst2vt = vgsteff + 2.0 * vt
+    vdsat = esat_l * vgst2vt / (abulk * esat_l + vgst2vt)
+    delta = p["DELTA"]
+    t1 = vdsat - vds - delta
+    vdseff = vdsat - 0.5 * (t1 + np.sqrt(t1 * t1 + 4.0 * delta * vdsat))
+    vdseff = np.clip(vdseff, 0.0, vds)
+
+    # ---- 線形〜飽和の本体電流と直列抵抗 ----
+    ids0 = (
+        weff * ueff * cox * vgsteff * (1.0 - abulk * vdseff / (2.0 * vgst2vt)) * vdseff
+        / (leff * (1.0 + vdseff / esat_l))
+    )
+    rds = p["RDSW"] / (weff * 1e6) ** p["WR"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rfac = np.where(vdseff > 0, 1.0 + rds * ids0 / vdseff, 1.0)
+    ids = ids0 / rfac
+
+    # ---- 出力コンダクタンス（CLM・DIBL）----
+    dv = vds - vdseff
+    litl = np.sqrt(EPS_SI * p["XJ"] * tox / EPS_OX)
+    cclm = (esat_l + vdsat) / (p["PCLM"] * esat * litl) * rfac
+    vasat = esat_l + vdsat
+    f_clm = 1.0 + np.log1p(cclm * dv / vasat) / cclm
+
+    theta_rout = p["PDIBLC1"] * _theta(p["DROUT"], leff, lt0) + p["PDIBLC2"]
+    vadibl = vgst2vt / (theta_rout * (1.0 + p["PDIBLCB"] * vbs)) * (
+        1.0 - abulk * vdsat / (abulk * vdsat + vgst2vt)
+    )
+    f_dibl = 1.0 + dv / vadibl
+
+    return ids * f_clm * f_dibl
@@ -0,0 +1,43 @@
+"""
+Paramus 全体で使う定数（NumPy 非依存）。
+スカラー版パイプライン（physical/scalar.py）がこれだけで動くように分けてある。
+"""
+
+# 物理定数
+Q = 1.602176634e-19  # [C]
+K_B = 1.380649e-23   # [J/K]
+EPS0 = 8.8541878128e-12  # [F/m]
+EPS_SI = 11.7 * EPS0
+EPS_OX = 3.9 * EPS0
+
+# シリコンの固有キャリア密度（約 300 K）
+NI_M3 = 1.0e16  # [1/m^3] ≒ 1e10 [1/cm^3]
+
+# 擬似 IV 生成の掃引条件（iv.py / scalar.py で共通）
+VG_POINTS = 81         # Id–Vg の点数
+VG_SPAN = 0.8          # Vg_max = Vth + VG_SPAN
+VD_POINTS = 40         # Id–Vd の点数
+VD_START = 0.05
+VD_LIN = 0.05          # 線形領域 Vd
+VD_MAX = 1.2           # 飽和領域 Vd
+VG_HIGH_OVERDRIVE = 0.6
+LAMBDA0 = 0.1          # 仮のチャネル長変調係数
+GM_PLATEAU_RTOL = 1e-6  # gmmax 法: gm がこの相対差以内なら最大値と同点（平坦部）とみなす
+
+# 物理量から決めない BSIM4 パラメータの固定値／ヒューリスティク（mapping.py / scalar.py で共通）
+FIXED_PARAMS = {
+    # 表面制御係数など（簡易な固定値／ヒューリスティク）
+    "NFACTOR": 1.5,
+    "ETA0": 0.05,      # DIBL の初期値
+    "DVT0": 1.0,
+    "DVT1": 0.5,
+    # ソース/ドレイン
+    "RDSW": 200.0,     # [ohm*µm] 的なニュアンスの固定値
+    "VSAT": 1.0e5,     # [m/s] オーダーの値
+    # 本来はドーピング・Vth ロールオフから決めるが、ここでは固定 or 緩い依存に留める
+    "K1": 0.6,
+    "K2": -0.02,
+    # 端子容量（かなりラフな固定値）
+    "CGSO": 1.0e-10,
+    "CGDO": 1.0e-10,
+}
@@ -0,0 +1,158 @@
+"""
+温度・プロセスコーナーの一括生成。
+
+温度（LT/RT/HT = -40/25/125 °C）× プロセスコーナー（TT/FF/SS/FS/SF）× (NMOS, PMOS) の
+全組み合わせを 1 つの PhysBatch にまとめ、温度も配列として run_paramus_batch に渡して
+1 回で評価する。結果はセクション付きの .lib に書き出す:
+
+    .lib TT_HT
+    .model paramus_nmos nmos level=54
+    ...
+    .endl TT_HT
+
+セクション内のモデル名は全コーナー共通なので、解析側のネットリストは
+    .lib "paramus_corners.lib" TT_HT
+の 1 行を差し替えるだけでコーナーを切り替えられる。
+各カードには生成温度を tnom として入れる（シミュレータ側で温度補正が二重に掛からないように）。
+
+プロセスコーナーは Monte Carlo の既定ばらつき（DEFAULT_MC_SPEC）の ±CORNER_SIGMA σ で作る。
+"fast" 側は tox・Na・L を小さく、μ0 を大きく、|Vth| を下げる向きに Vfb を動かす
+（NMOS は Vfb を下げ、PMOS は |Vfb| を小さくする）。
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from modelcard.build import render_table
+
+from .poisson import PhysBatch, _ensure_si_units
+from .batch import run_paramus_batch
+from .montecarlo import DEFAULT_MC_SPEC
+
+
+# 温度コーナー [°C]
+TEMP_CORNERS: Dict[str, float] = {"LT": -40.0, "RT": 25.0, "HT": 125.0}
+
+# プロセスコーナー: (NMOS の向き, PMOS の向き)。+1 = fast, -1 = slow
+PROCESS_CORNERS: Dict[str, Tuple[int, int]] = {
+    "TT": (0, 0),
+    "FF": (1, 1),
+    "SS": (-1, -1),
+    "FS": (1, -1),
+    "SF": (-1, 1),
+}
+
+CORNER_SIGMA = 3.0
+
+# fast 方向に動かしたときの符号（+1 なら値を大きく、-1 なら小さく。vfb は NMOS は値、PMOS は絶対値）
+FAST_DIRECTION = {"tox_m": -1, "na_m3": -1, "vfb": -1, "mu0": 1, "L_m": -1}
+
+CELSIUS_TO_K = 273.15
+
+
+def section_name(process: Optional[str], temp_tag: str) -> str:
+    return f"{process}_{temp_tag}" if process else temp_tag
+
+
+def parse_temps(spec: str) -> Dict[str, float]:
+    """'LT,RT,HT' や '-40,27,150' を {タグ: °C} にする。数値は Tm40 / T27 のようなタグにする。"""
+    temps: Dict[str, float] = {}
+    for item in (s.strip() for s in spec.split(",")):
+        if not item:
+            continue
+        if item.upper() in TEMP_CORNERS:
+            temps[item.upper()] = TEMP_CORNERS[item.upper()]
+        else:
+            value = float(item)
+            temps[f"T{value:g}".replace("-", "m")] = value
+    return temps
+
+
+def shift_corner(
+    base: Dict,
+    direction: int,
+    sigma: float = CORNER_SIGMA,
+    spec: Dict = DEFAULT_MC_SPEC,
+    device_type: Optional[str] = None,
+) -> Dict:
+    """
+    プリセットを fast(+1) / slow(-1) 方向に sigma σ ずらした dict を返す。
+    device_type を省略したらプリセットの device_type（無ければ nmos）を使う。
+    """
+    p = _ensure_si_units(base)
+    is_nmos = (device_type or p.get("device_type", "nmos")) == "nmos"
+    if direction == 0:
+        return p
+    dists = spec.get("params", {})
+    for name, sign in FAST_DIRECTION.items():
+        d = dists.get(name)
+        if d is None:
+            continue
+        value = float(p[name])
+        step = direction * sign * sigma
+        if name == "vfb":
+            sd = float(d["abs"]) if "abs" in d else abs(value) * float(d.get("rel", 0.0))
+            if is_nmos:
+                # NMOS: Vth = Vfb + ...（Vfb < 0 でも値を下げると Vth が下がる）
+                p[name] = value + step * sd
+            else:
+                # PMOS: |Vth| = |Vfb| + ...（Vfb の符号によらず |Vfb| を動かす）
+                mag = max(abs(value) + step * sd, 0.0)
+                p[name] = mag if value >= 0 else -mag
+        elif d.get("dist") == "lognormal":
+            sd = float(d["abs"]) / abs(value) if "abs" in d else float(d.get("rel", 0.0))
+            p[name] = value * float(np.exp(step * sd))
+        else:
+            sd = float(d["abs"]) if "abs" in d else abs(value) * float(d.get("rel", 0.0))
+            p[name] = value + step * sd
+    return p
+
+
+def generate_corner_sections(
+    devices: Dict[str, Dict],
+    temps: Dict[str, float],
+    processes: Optional[Iterable[str]] = None,
+    sigma: float = CORNER_SIGMA,
+    name_fmt: str = "paramus_{type}",
+    poisson: str = "analytic",
+    extraction: str = "curves",
+) -> List[Tuple[str, str]]:
+    """
+    devices: {"nmos": プリセット, "pmos": プリセット}（片方だけでもよい）
+    temps  : {タグ: °C}
+    processes: ["TT", "FF", ...]。None なら温度コーナーのみ（セクション名 = 温度タグ）
+    poisson / extraction: run_paramus_batch に渡す Poisson モデル・抽出方法
+    戻り値: [(セクション名, .model テキスト群), ...]
+    """
+    procs: List[Optional[str]] = list(processes) if processes else [None]
+    for proc in procs:
+        if proc is not None and proc not in PROCESS_CORNERS:
+            raise ValueError(f"unknown process corner: {proc} (choose from {list(PROCESS_CORNERS)})")
+
+    rows: List[Dict] = []
+    temps_k: List[float] = []
+    keys: List[Tuple[str, str, str]] = []
+    for proc in procs:
+        dirs = PROCESS_CORNERS[proc] if proc else (0, 0)
+        for dev_type, preset in devices.items():
+            shifted = shift_corner(
+                preset, dirs[0] if dev_type == "nmos" else dirs[1], sigma, device_type=dev_type
+            )
+            shifted["device_type"] = dev_type
+            for tag, t_c in temps.items():
+                rows.append(shifted)
+                temps_k.append(t_c + CELSIUS_TO_K)
+                keys.append((section_name(proc, tag), dev_type, tag))
+
+    # 全コーナーを 1 回のバッチ評価で
+    table = run_paramus_batch(PhysBatch.from_dicts(rows), np.asarray(temps_k), poisson=poisson, extraction=extraction)
+    names = [name_fmt.format(type=dev_type) for _, dev_type, _ in keys]
+    texts = render_table(table, names)
+
+    sections: Dict[str, List[str]] = {}
+    for (section, _, tag), text in zip(keys, texts):
+        card = text.rstrip("\n") + f"\n+ tnom    = {temps[tag]:g}\n"
+        sections.setdefault(section, []).append(card)
+
+    order = [section_name(proc, tag) for proc in procs for tag in temps]
+    return [(s, "\n".join(sections[s])) for s in order]
+
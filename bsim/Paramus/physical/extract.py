@@ -2,8 +2,9 @@ from dataclasses import dataclass
 from typing import Dict
 import numpy as np
 
-from .poisson import PoissonResult
-from .iv import IVData
+from .poisson import PoissonResult, PhysBatch, PoissonBatch
+from .iv import IVData, IVBatch
+from .constants import LAMBDA0, GM_PLATEAU_RTOL
 
 
 @dataclass
@@ -13,16 +14,17 @@ class CoreParams:
     pclm: float
 
 
-def _estimate_vth0_from_gmmax(iv: IVData) -> float:
-    """gmmax 法で VTH0 を推定。"""
-    vg = iv.vg
-    id_lin = iv.id_lin
+@dataclass
+class CoreParamsBatch:
+    vth0: np.ndarray
+    u0: np.ndarray
+    pclm: np.ndarray
 
-    dvg = np.gradient(vg)
-    did = np.gradient(id_lin)
-    gm = did / np.where(dvg == 0, np.nan, dvg)
-    idx = np.nanargmax(gm)
-    return float(vg[idx])
+
+def _estimate_vth0_from_gmmax(iv: IVData) -> float:
+    """gmmax 法で VTH0 を推定（gmmax_vth_rows の 1 行版）。"""
+    vth, _, _ = gmmax_vth_rows(iv.vg[None, :], iv.id_lin[None, :])
+    return float(vth[0])
 
 
 def _estimate_u0(iv: IVData, pois: PoissonResult, phys: Dict, vth0: float) -> float:
@@ -74,3 +76,151 @@ def extract_core_params(phys: Dict, pois: PoissonResult, iv: IVData) -> CorePara
     pclm = _estimate_pclm(iv)
 
     return CoreParams(vth0=vth0, u0=u0, pclm=pclm)
+
+
+def extract_core_direct(phys: Dict, pois: PoissonResult) -> CoreParams:
+    """
+    擬似カーブを作らずに VTH0 / U0 / PCLM を閉形式で求める。
+    generate_iv_data のモデルでは Vth = pois.vth、線形領域の傾きから戻る μ は mu0、
+    Id–Vd の傾き/切片は LAMBDA0 そのものなので、カーブ生成とフィットは要らない。
+    実測・シミュレーションのカーブから抽出する場合は extract_core_params を使う。
+    """
+    return CoreParams(
+        vth0=float(pois.vth),
+        u0=float(phys["mu0"]),
+        pclm=max(LAMBDA0, 0.01),  # _estimate_pclm と同じ下限
+    )
+
+
+# ------------------------------------------------------------
+# バッチ版カーネル（(デバイス数 N × 点数) の 2 次元配列を行ごとに一括処理）
+#   行ごとに長さの違う実測カーブは stack_curves で NaN 埋めして渡す。
+#   NaN の点はフィット・argmax から除外される。
+# ------------------------------------------------------------
+
+def stack_curves(curves) -> np.ndarray:
+    """長さの異なる 1 次元配列の列を、NaN 埋めした (N × 最大点数) 配列にする。"""
+    curves = [np.asarray(c, dtype=float) for c in curves]
+    width = max((c.shape[0] for c in curves), default=0)
+    out = np.full((len(curves), width), np.nan)
+    for i, c in enumerate(curves):
+        out[i, : c.shape[0]] = c
+    return out
+
+
+def fit_line_rows(x: np.ndarray, y: np.ndarray, mask=None):
+    """
+    行ごとの 1 次フィット y ≒ k*x + b を閉形式の最小二乗で解く。
+    mask（bool, 省略時は全点）と有限値の点だけを使う。
+    np.polyfit(x[m], y[m], 1) を全行まとめて行うのと同じ。
+    戻り値: (k, b, 使用点数)
+    """
+    x, y = np.broadcast_arrays(x, y)
+    w = np.isfinite(x) & np.isfinite(y)
+    if mask is not None:
+        w &= mask
+    xz = np.where(w, x, 0.0)
+    yz = np.where(w, y, 0.0)
+
+    n = w.sum(axis=1)
+    n_safe = np.where(n == 0, 1, n)
+    xm = xz.sum(axis=1) / n_safe
+    ym = yz.sum(axis=1) / n_safe
+    dx = np.where(w, x - xm[:, None], 0.0)
+    sxx = (dx * dx).sum(axis=1)
+    sxy = (dx * (yz - ym[:, None])).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = sxy / sxx
+    b = ym - k * xm
+    return k, b, n
+
+
+def _diff_rows(a: np.ndarray) -> np.ndarray:
+    """
+    行方向の差分（np.gradient(a, axis=1) と同じ中心差分・端は片側差分）。
+    NaN 埋めされた末尾の手前でも片側差分に切り替えるので、短い行の端点も使える。
+    """
+    fwd = a[:, 1:] - a[:, :-1]
+    pad = np.full((a.shape[0], 1), np.nan)
+    left = np.concatenate([pad, fwd], axis=1)
+    right = np.concatenate([fwd, pad], axis=1)
+    central = 0.5 * (left + right)
+    return np.where(
+        np.isfinite(central), central, np.where(np.isfinite(left), left, right)
+    )
+
+
+def gmmax_vth_rows(vg: np.ndarray, id_: np.ndarray, absolute: bool = False, rtol: float = GM_PLATEAU_RTOL):
+    """
+    gmmax 法を全行一括で行う。gm = dId/dVg（np.gradient 同様の中心差分）。
+    擬似カーブのような直線の Id–Vg では gm が丸め誤差の範囲で平坦になるので、
+    gmmax から rtol 以内の点は同点とみなしてその最初の点を使う（argmax が丸め誤差で
+    平坦部を飛び回らない）。
+    absolute=True なら |gm| の最大点を使う（実測・PMOS カーブ向け）。
+    戻り値: (Vth = gm 最大点の Vg, gmmax, インデックス)
+    """
+    dvg = _diff_rows(vg)
+    did = _diff_rows(id_)
+    gm = did / np.where(dvg == 0, np.nan, dvg)
+    score = np.abs(gm) if absolute else gm
+    peak = np.nanmax(score, axis=1)
+    idx = np.argmax(score >= (peak - rtol * np.abs(peak))[:, None], axis=1)
+    take = idx[:, None]
+    vth = np.take_along_axis(vg, take, axis=1)[:, 0]
+    gmmax = np.take_along_axis(score, take, axis=1)[:, 0]
+    return vth, gmmax, idx
+
+
+def mobility_rows(
+    vg: np.ndarray,
+    id_lin: np.ndarray,
+    vth0: np.ndarray,
+    cox: np.ndarray,
+    ratio: np.ndarray,
+    vd_lin,
+    fallback: np.ndarray,
+    window: float = 0.1,
+    min_points: int = 3,
+) -> np.ndarray:
+    """
+    線形領域 Id ≈ μ Cox (W/L) (Vg − Vth) Vd の傾きから μ0 を全行一括で求める。
+    Vg > Vth + window の点が min_points 未満の行は fallback を返す。
+    """
+    x = vg - vth0[:, None]
+    k, _, n = fit_line_rows(x, id_lin, x > window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = k / (cox * ratio * vd_lin)
+    return np.where(n < min_points, fallback, mu)
+
+
+def pclm_rows(vd: np.ndarray, id_vd: np.ndarray, floor: float = 0.01, default: float = 0.1) -> np.ndarray:
+    """Id ≒ Id0 (1 + λ Vd) の直線フィットから λ → PCLM を全行一括で求める。"""
+    k, id0, _ = fit_line_rows(vd, id_vd)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lam = k / id0
+    return np.where(id0 <= 0, default, np.maximum(lam, floor))
+
+
+def extract_core_params_batch(
+    phys: PhysBatch, pois: PoissonBatch, iv: IVBatch
+) -> CoreParamsBatch:
+    """extract_core_params の配列版。gmmax / μ0 / PCLM を全デバイス一括で求める。"""
+    vth0, _, _ = gmmax_vth_rows(iv.vg, iv.id_lin)
+    u0 = mobility_rows(
+        iv.vg, iv.id_lin, vth0,
+        cox=pois.cox,
+        ratio=phys.W_m / phys.L_m,
+        vd_lin=iv.vd_lin,
+        fallback=phys.mu0,  # うまく取れなければプリセット値
+    )
+    pclm = pclm_rows(iv.vd, iv.id_vd)
+    return CoreParamsBatch(vth0=vth0, u0=u0, pclm=pclm)
+
+
+def extract_core_direct_batch(phys: PhysBatch, pois: PoissonBatch) -> CoreParamsBatch:
+    """extract_core_direct の配列版（(N × 点数) の中間配列を作らない）。"""
+    return CoreParamsBatch(
+        vth0=pois.vth,
+        u0=phys.mu0,
+        pclm=np.full(len(phys), max(LAMBDA0, 0.01)),
+    )
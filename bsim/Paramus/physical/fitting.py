@@ -0,0 +1,416 @@
+"""
+実測（またはシミュレーション）カーブへの BSIM4 パラメータフィッティング。
+
+アナライザが出力する .dat（1 列目 = 掃引電圧、最終列 = Id）を Measurement として読み込み、
+差分進化（DE/rand/1/bin）で主要パラメータを最適化する。1 世代の候補はまとめて評価器に渡す:
+
+    DcModelEvaluator : bsim4_dc.py で世代全体 × 全カーブを 1 回のブロードキャストで評価（ngspice 不要）
+    NgspiceEvaluator : 候補 × カーブごとの ngspice -b を NgspiceScheduler で並列実行（サインオフ向け）。
+                       libngspice が読み込めればプロセス内で解き、ファイルを介さずにベクトルを受け取る
+
+    card = parse_file("models/nmos130.sp")[0]
+    meas = [load_measurement("l_vg/..._vg.dat", "idvg", bias=0.05, L=0.13e-6, W=1e-6),
+            load_measurement("l_vd/..._vd.dat", "idvd", bias=1.2, L=0.13e-6, W=1e-6)]
+    result = fit_card(card, meas, ["VTH0", "U0", "UA", "VSAT", "RDSW", "PCLM"], evaluator)
+    format_card(card, result.params)
+
+探索は各パラメータを [0, 1] に正規化した空間で行う。BOUNDS の "shift" は初期値 ± 幅、
+"scale" は初期値 ×/÷ 倍率（対数スケール）の範囲。
+コストは全カーブの log10|Id| 誤差の RMS（サブスレッショルドと強反転を同じ重みで見る）。
+"""
+import math
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from modelcard.parse import ModelCard, format_card, cards_to_table
+from .bsim4_dc import bsim4_ids, BSIM4_DEFAULTS
+
+# bsim/ を import パスに入れるのはエントリスクリプト（fit.py / surrogate.py）の役目
+from ngspice_tools import NgspiceJob, NgspiceScheduler, load_shared, resolve_ngspice
+
+
+# 探索範囲: ("shift", 幅) は初期値 ± 幅、("scale", 倍率) は初期値 ×/÷ 倍率
+BOUNDS: Dict[str, Tuple[str, float]] = {
+    "VTH0": ("shift", 0.3),
+    "VOFF": ("shift", 0.1),
+    "K2": ("shift", 0.1),
+    "K1": ("scale", 3.0),
+    "U0": ("scale", 3.0),
+    "UA": ("scale", 10.0),
+    "UB": ("scale", 10.0),
+    "VSAT": ("scale", 3.0),
+    "RDSW": ("scale", 5.0),
+    "PCLM": ("scale", 5.0),
+    "ETA0": ("scale", 5.0),
+    "NFACTOR": ("scale", 3.0),
+    "DVT0": ("scale", 5.0),
+    "DVT1": ("scale", 3.0),
+    "PDIBLC1": ("scale", 10.0),
+    "PDIBLC2": ("scale", 10.0),
+}
+
+DEFAULT_FIT_PARAMS = ("VTH0", "U0", "UA", "VSAT", "RDSW", "PCLM", "ETA0", "NFACTOR")
+
+CURRENT_FLOOR = 1e-15   # log 誤差の下限電流 [A]
+
+NGSPICE_EXE = resolve_ngspice("ngspice")
+NGSPICE_FIT_TIMEOUT = 120.0   # 1 候補 × 1 カーブのタイムアウト [s]
+
+
+@dataclass
+class Measurement:
+    kind: str             # "idvg"（x = Vgs, bias = Vds）/ "idvd"（x = Vds, bias = Vgs）
+    x: np.ndarray
+    id: np.ndarray        # 導通方向を正とした電流（符号はそろえなくてよい。|Id| で比べる）
+    bias: float
+    L: float
+    W: float
+    vbs: float = 0.0
+    temperature: float = 300.15   # [K]
+    name: str = ""
+
+
+def load_measurement(
+    path, kind: str, bias: float, L: float, W: float, vbs: float = 0.0, temp_c: float = 25.0
+) -> Measurement:
+    """アナライザの .dat（1 列目 = 掃引電圧、最終列 = Id）を読む。"""
+    if kind not in ("idvg", "idvd"):
+        raise ValueError(f"unknown measurement kind: {kind}")
+    data = np.loadtxt(path)
+    if data.ndim == 1:
+        data = data.reshape(1, -1)
+    return Measurement(
+        kind=kind, x=data[:, 0], id=data[:, -1], bias=float(bias), L=float(L), W=float(W),
+        vbs=float(vbs), temperature=float(temp_c) + 273.15, name=str(path),
+    )
+
+
+def _log_error(sim: np.ndarray, meas: np.ndarray) -> np.ndarray:
+    return np.log10(np.abs(sim) + CURRENT_FLOOR) - np.log10(np.abs(meas) + CURRENT_FLOOR)
+
+
+def _rms_cost(curves: Sequence[np.ndarray], measurements: Sequence[Measurement]) -> np.ndarray:
+    """simulate() の結果から候補ごとの RMS log 誤差 (P,) を出す。NaN を含む候補は inf。"""
+    sq = 0.0
+    count = 0
+    for sim, m in zip(curves, measurements):
+        err = _log_error(sim, m.id[None, :])
+        sq = sq + np.sum(err * err, axis=1)
+        count += m.x.shape[0]
+    cost = np.sqrt(sq / max(count, 1))
+    return np.where(np.isnan(cost), np.inf, cost)
+
+
+@dataclass
+class ParamSpace:
+    """正規化座標 u ∈ [0, 1]^D ⇔ パラメータ値。"""
+    names: List[str]
+    start: np.ndarray
+
+    @classmethod
+    def from_card(cls, card: ModelCard, names: Sequence[str]) -> "ParamSpace":
+        names = [n.upper() for n in names]
+        for n in names:
+            if n not in BOUNDS:
+                raise ValueError(f"no search range for {n} (choose from {sorted(BOUNDS)})")
+        start = np.array([card.params.get(n.lower(), BSIM4_DEFAULTS.get(n, 0.0)) for n in names])
+        return cls(names=names, start=start)
+
+    def decode(self, u: np.ndarray) -> np.ndarray:
+        """(P, D) の正規化座標を (P, D) のパラメータ値にする。"""
+        out = np.empty_like(u, dtype=float)
+        for j, name in enumerate(self.names):
+            mode, width = BOUNDS[name]
+            t = 2.0 * u[:, j] - 1.0        # [-1, 1]、0 が初期値
+            if mode == "shift":
+                out[:, j] = self.start[j] + t * width
+            else:
+                out[:, j] = self.start[j] * width ** t
+        return out
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        """decode の逆。(P, D) のパラメータ値を正規化座標にする（範囲外は [0, 1] の外になる）。"""
+        values = np.asarray(values, dtype=float)
+        u = np.empty_like(values)
+        for j, name in enumerate(self.names):
+            mode, width = BOUNDS[name]
+            if mode == "shift":
+                t = (values[..., j] - self.start[j]) / width
+            else:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    t = np.log(values[..., j] / self.start[j]) / math.log(width)
+            u[..., j] = 0.5 * (t + 1.0)
+        return u
+
+
+class DcModelEvaluator:
+    """世代全体を bsim4_dc で一括評価する（カーブごとに 1 回のブロードキャスト呼び出し）。"""
+
+    def __init__(self, card: ModelCard, measurements: Sequence[Measurement]):
+        self.base = cards_to_table([card])
+        self.measurements = list(measurements)
+
+    def simulate(self, names: List[str], values: np.ndarray) -> List[np.ndarray]:
+        """候補 (P, D) ごとの電流をカーブ順に (P, len(m.x)) で返す。"""
+        p = values.shape[0]
+        columns = {k: np.repeat(v, p) for k, v in self.base.columns.items()}
+        for j, name in enumerate(names):
+            columns[name] = values[:, j]
+        table = type(self.base)(columns=columns, is_nmos=np.repeat(self.base.is_nmos, p))
+
+        curves = []
+        for m in self.measurements:
+            vgs, vds = (m.x, m.bias) if m.kind == "idvg" else (m.bias, m.x)
+            curves.append(bsim4_ids(table, vgs, vds, m.vbs, L=m.L, W=m.W, temperature=m.temperature))
+        return curves
+
+    def __call__(self, names: List[str], values: np.ndarray) -> np.ndarray:
+        return _rms_cost(self.simulate(names, values), self.measurements)
+
+
+class NgspiceEvaluator:
+    """
+    候補 × カーブごとにネットリストを作って ngspice -b で解き、NgspiceScheduler で
+    jobs 本ずつ並列に回す。候補は毎回違うので結果キャッシュは使わず、失敗しても再実行しない
+    （その候補のコストが inf になるだけ）。
+    シミュレーション結果は実測の x 点に線形補間して比べる。失敗した候補のコストは inf。
+
+    shared=None（既定）なら libngspice（ngspice_tools.load_shared）を探し、見つかれば
+    ネットリストを文字列のまま渡してベクトルを直接受け取る（.cir / .dat もプロセス起動も無し）。
+    libngspice はプロセスに 1 つなので、その場合は直列に解く。True なら libngspice 必須、
+    False なら常に ngspice -b。
+    """
+
+    def __init__(
+        self,
+        card: ModelCard,
+        measurements: Sequence[Measurement],
+        jobs: int = os.cpu_count() or 1,
+        ngspice: str = NGSPICE_EXE,
+        workdir: Optional[Path] = None,
+        shared: Optional[bool] = None,
+    ):
+        self.shared = load_shared() if shared is not False else None
+        if shared and self.shared is None:
+            raise FileNotFoundError("libngspice not found (set NGSPICE_LIBRARY)")
+        if self.shared is None and shutil.which(ngspice) is None and not Path(ngspice).exists():
+            raise FileNotFoundError(f"ngspice not found: {ngspice} (set NGSPICE or use the dc evaluator)")
+        self.card = card
+        self.measurements = list(measurements)
+        self.jobs = jobs
+        self.ngspice = ngspice
+        self.scheduler = NgspiceScheduler(
+            ngspice=ngspice, jobs=jobs, timeout=NGSPICE_FIT_TIMEOUT, retries=0, cache=None
+        )
+        self._serial = 0
+        self._own_workdir = False
+        if self.shared is None:
+            self._own_workdir = workdir is None
+            self.workdir = Path(workdir) if workdir else Path(tempfile.mkdtemp(prefix="paramus_fit_"))
+            self.workdir.mkdir(parents=True, exist_ok=True)
+
+    def netlist(self, model_text: str, m: Measurement, dat_path: Optional[Path] = None) -> str:
+        """dat_path を省くと .control（wrdata）無しのネットリスト（libngspice 用）。"""
+        x = m.x
+        step = (x[-1] - x[0]) / max(len(x) - 1, 1)
+        sweep = "Vg" if m.kind == "idvg" else "Vd"
+        vg0, vd0 = (0.0, m.bias) if m.kind == "idvg" else (m.bias, 0.0)
+        return "\n".join([
+            "* Paramus fit",
+            model_text.rstrip("\n"),
+            f"Vd d 0 {vd0}",
+            f"Vg g 0 {vg0}",
+            "Vs s 0 0",
+            f"Vb b 0 {m.vbs}",
+            f"M1 d g s b {self.card.name} L={m.L} W={m.W}",
+            f".temp {m.temperature - 273.15}",
+            f".dc {sweep} {x[0]} {x[-1]} {step if step != 0 else 1.0}",
+            *([] if dat_path is None else [
+                ".control",
+                "set filetype=ascii",
+                "run",
+                "let id = -i(Vd)",
+                f"wrdata {dat_path.as_posix()} id",
+                "quit",
+                ".endc",
+            ]),
+            ".end",
+            "",
+        ])
+
+    @staticmethod
+    def _resample(xs: np.ndarray, ys: np.ndarray, m: Measurement) -> np.ndarray:
+        order = np.argsort(xs)
+        return np.interp(m.x, xs[order], ys[order])
+
+    def _run_shared(self, model_text: str, m: Measurement) -> Optional[np.ndarray]:
+        sweep = "v(g)" if m.kind == "idvg" else "v(d)"
+        try:
+            vec = self.shared.run(self.netlist(model_text, m), {"vx": sweep, "id": "-i(Vd)"})
+        except (RuntimeError, KeyError):
+            return None
+        if vec["vx"].shape != vec["id"].shape or vec["id"].size == 0:
+            return None
+        return self._resample(vec["vx"], vec["id"], m)
+
+    def _job(self, model_text: str, m: Measurement, index: Tuple[int, int]) -> NgspiceJob:
+        self._serial += 1
+        cir = self.workdir / f"job{self._serial}.cir"
+        dat = self.workdir / f"job{self._serial}.dat"
+        cir.write_text(self.netlist(model_text, m, dat), encoding="utf-8")
+        return NgspiceJob(cir, cwd=self.workdir, outputs=[dat], label=cir.stem, meta={"index": index})
+
+    def _finish(self, result, m: Measurement) -> Optional[np.ndarray]:
+        cir, dat = result.job.netlist, result.job.outputs[0]
+        try:
+            if not result.ok:
+                return None
+            data = np.loadtxt(dat)
+        except (OSError, ValueError):
+            return None
+        finally:
+            for f in (cir, dat):
+                Path(f).unlink(missing_ok=True)
+        if data.ndim == 1:
+            data = data.reshape(1, -1)
+        return self._resample(data[:, 0], data[:, -1], m)
+
+    def simulate(self, names: List[str], values: np.ndarray) -> List[np.ndarray]:
+        """候補 (P, D) ごとの電流をカーブ順に (P, len(m.x)) で返す。失敗した候補の行は NaN。"""
+        p = values.shape[0]
+        texts = [
+            format_card(self.card, dict(zip(names, row))) for row in values.tolist()
+        ]
+        curves = [np.full((p, m.x.shape[0]), np.nan) for m in self.measurements]
+        if self.shared is not None:
+            for i in range(p):
+                for k, m in enumerate(self.measurements):
+                    sim = self._run_shared(texts[i], m)
+                    if sim is not None:
+                        curves[k][i] = sim
+            return curves
+        jobs = (
+            self._job(texts[i], m, (i, k))
+            for i in range(p)
+            for k, m in enumerate(self.measurements)
+        )
+        for result in self.scheduler.imap(jobs):
+            i, k = result.job.meta["index"]
+            sim = self._finish(result, self.measurements[k])
+            if sim is not None:
+                curves[k][i] = sim
+        return curves
+
+    def __call__(self, names: List[str], values: np.ndarray) -> np.ndarray:
+        return _rms_cost(self.simulate(names, values), self.measurements)
+
+    def close(self) -> None:
+        """自分で作った作業ディレクトリを消す。"""
+        if self._own_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+@dataclass
+class FitResult:
+    params: Dict[str, float]        # 最良候補（大文字のパラメータ名）
+    cost: float                     # log10|Id| 誤差の RMS
+    start_cost: float
+    generations: int
+    evaluations: int
+    history: List[float] = field(default_factory=list)   # 世代ごとの最良コスト
+    at_bounds: List[str] = field(default_factory=list)   # 探索範囲の端に張り付いたパラメータ
+
+
+def differential_evolution(
+    objective: Callable[[np.ndarray], np.ndarray],
+    dim: int,
+    pop_size: int = 32,
+    generations: int = 60,
+    f: float = 0.7,
+    cr: float = 0.9,
+    seed: int = 0,
+    tol: float = 1e-6,
+    init: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, float, List[float], int]:
+    """
+    [0, 1]^dim 上の DE/rand/1/bin。objective は (P, dim) を受けて (P,) のコストを返す
+    （世代単位でまとめて呼ぶので、評価器側で並列化・ベクトル化できる）。
+    init を渡すと初期集団の先頭をその点にする（初期カードを必ず候補に入れる用）。
+    戻り値: (最良点, 最良コスト, 世代ごとの最良コスト, 評価回数)
+    """
+    rng = np.random.default_rng(seed)
+    pop = rng.random((pop_size, dim))
+    if init is not None:
+        pop[0] = init
+    cost = objective(pop)
+    evals = pop_size
+    history = [float(np.min(cost))]
+
+    idx = np.arange(pop_size)
+    others = np.array([np.delete(idx, i) for i in idx])    # 行 i = 自分以外の個体番号
+    for _ in range(generations):
+        # 自分以外の異なる 3 個体 a, b, c
+        r = np.argsort(rng.random((pop_size, pop_size - 1)), axis=1)[:, :3]
+        a, b, c = (pop[others[idx, r[:, k]]] for k in range(3))
+        mutant = np.clip(a + f * (b - c), 0.0, 1.0)
+
+        cross = rng.random((pop_size, dim)) < cr
+        cross[idx, rng.integers(0, dim, pop_size)] = True   # 最低 1 成分は変える
+        trial = np.where(cross, mutant, pop)
+
+        trial_cost = objective(trial)
+        evals += pop_size
+        better = trial_cost <= cost
+        pop[better] = trial[better]
+        cost[better] = trial_cost[better]
+
+        history.append(float(np.min(cost)))
+        if np.max(cost) - np.min(cost) < tol:
+            break
+
+    best = int(np.argmin(cost))
+    return pop[best], float(cost[best]), history, evals
+
+
+def fit_card(
+    card: ModelCard,
+    measurements: Sequence[Measurement],
+    names: Sequence[str] = DEFAULT_FIT_PARAMS,
+    evaluator=None,
+    pop_size: int = 32,
+    generations: int = 60,
+    seed: int = 0,
+) -> FitResult:
+    """card の names を measurements に合わせる。evaluator を省略すると DcModelEvaluator。"""
+    space = ParamSpace.from_card(card, names)
+    evaluator = evaluator or DcModelEvaluator(card, measurements)
+
+    def objective(u: np.ndarray) -> np.ndarray:
+        return evaluator(space.names, space.decode(u))
+
+    center = np.full(len(space.names), 0.5)
+    start_cost = float(objective(center[None, :])[0])
+    best_u, cost, history, evals = differential_evolution(
+        objective, len(space.names), pop_size, generations, seed=seed, init=center
+    )
+    best = space.decode(best_u[None, :])[0]
+    return FitResult(
+        params={n: float(v) for n, v in zip(space.names, best)},
+        cost=cost,
+        start_cost=start_cost,
+        generations=len(history) - 1,
+        evaluations=evals + 1,
+        history=history,
+        at_bounds=[n for n, u in zip(space.names, best_u) if u <= 1e-6 or u >= 1.0 - 1e-6],
+    )
+
+
+def cost_decades(cost: float) -> str:
+    """RMS log 誤差を「何 % 相当か」の目安に直した表示用文字列。"""
+    return f"{cost:.4f} dec (~{(10 ** cost - 1) * 100:.1f} %)" if math.isfinite(cost) else "inf"
@@ -0,0 +1,169 @@
+"""
+逆 Paramus: 目標特性（しきい値電圧・駆動電流）から物理パラメータを求める。
+
+順方向の解析モデル
+    run_poisson      : Vth = Vfb + 2φF + γ·sqrt(2φF),   γ = sqrt(2 q εsi Na) / Cox
+    generate_iv_data : Idsat = ½ μ0 Cox (W/L) Vov² (1 + λ Vdmax)   （Vov = VG_HIGH_OVERDRIVE）
+をそのまま逆に解く。Idsat は Cox だけで決まるので tox は閉形式で求まり、
+その tox の下で Vth が目標に一致するように Na（既定）または Vfb を解く。
+Na は Vth について単調なので、全目標を 1 本の配列として log(Na) 上で同時に二分法を回す。
+
+    res = solve_targets(load_preset("130nm", "nmos"), vth=[0.35, 0.40], idsat=[2e-4, 3e-4])
+    res.phys.na_m3          # 解いた Na [1/m^3]
+    cards = render_table(res.table)
+
+注: 目標の Vth は Poisson モデルのしきい値（物理パラメータが直接決める量）。
+カードは既定で extraction="direct"（VTH0 = Poisson の Vth）で作り、カードの VTH0 が
+目標から VTH0_TOL 以上ずれた行は converged=False にする。
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+import numpy as np
+
+from .poisson import PhysBatch, PoissonBatch, run_poisson_batch, _ensure_si_units
+from .constants import EPS_OX, VD_MAX, VG_HIGH_OVERDRIVE, LAMBDA0
+from .batch import run_paramus_batch
+from .mapping import BsimTable
+
+
+# Na の探索範囲 [1/m^3]（1e14 〜 1e20 cm^-3）
+NA_BRACKET = (1.0e20, 1.0e26)
+
+# カードの VTH0 と目標 Vth の許容差 [V]
+VTH0_TOL = 1e-6
+
+
+@dataclass
+class InverseResult:
+    phys: PhysBatch          # 解いた物理パラメータ
+    pois: PoissonBatch       # その Poisson 結果（pois.vth が目標に一致）
+    idsat: np.ndarray        # 解いたパラメータでの駆動電流 [A]
+    converged: np.ndarray    # bool。目標が探索範囲外・物理的に不可能、カードの VTH0 が目標とずれたら False
+    table: BsimTable         # 順方向パイプラインで生成した BSIM4 パラメータ
+
+
+def idsat_factor(mu0, L_m, W_m) -> np.ndarray:
+    """Idsat = factor * Cox となる係数（generate_iv_data の Id–Vd 終点）。"""
+    ratio = np.asarray(W_m, dtype=float) / np.asarray(L_m, dtype=float)
+    return 0.5 * np.asarray(mu0, dtype=float) * ratio * VG_HIGH_OVERDRIVE ** 2 * (1.0 + LAMBDA0 * VD_MAX)
+
+
+def _vth_of_na(na, cox, vfb, is_nmos, temperature) -> np.ndarray:
+    phys = PhysBatch(
+        tox_m=EPS_OX / cox, na_m3=na, vfb=vfb,
+        mu0=np.zeros_like(na), L_m=np.ones_like(na), W_m=np.ones_like(na),
+        is_nmos=is_nmos,
+    )
+    return run_poisson_batch(phys, temperature).vth
+
+
+def _solve_na(vth_target, cox, vfb, is_nmos, temperature, tol, max_iter):
+    """log(Na) 上の一括二分法。Vth(Na) は nMOS で単調増加、pMOS で単調減少。"""
+    n = vth_target.shape[0]
+    lo = np.full(n, np.log(NA_BRACKET[0]))
+    hi = np.full(n, np.log(NA_BRACKET[1]))
+    sign = np.where(is_nmos, 1.0, -1.0)  # sign * Vth が Na について増加
+
+    f_lo = sign * (_vth_of_na(np.exp(lo), cox, vfb, is_nmos, temperature) - vth_target)
+    f_hi = sign * (_vth_of_na(np.exp(hi), cox, vfb, is_nmos, temperature) - vth_target)
+    ok = (f_lo <= 0.0) & (f_hi >= 0.0)
+
+    for _ in range(max_iter):
+        mid = 0.5 * (lo + hi)
+        f_mid = sign * (_vth_of_na(np.exp(mid), cox, vfb, is_nmos, temperature) - vth_target)
+        below = f_mid < 0.0
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+        if np.all(hi - lo < tol):
+            break
+
+    na = np.exp(0.5 * (lo + hi))
+    # 範囲外の目標は近い方の端に張り付ける
+    na = np.where(ok, na, np.where(f_lo > 0.0, NA_BRACKET[0], NA_BRACKET[1]))
+    return na, ok
+
+
+def _solve_vfb(vth_target, cox, na, vfb0, is_nmos, temperature):
+    """Vfb は閉形式。pMOS は |Vfb| を解き、符号はプリセットのものを保つ。"""
+    vth0 = _vth_of_na(na, cox, np.zeros_like(na), is_nmos, temperature)
+    vfb_n = vth_target - vth0
+    mag_p = np.abs(vth_target) - np.abs(vth0)   # pMOS: |Vth| = |Vfb| + (Vfb=0 での |Vth|)
+    ok = is_nmos | ((mag_p >= 0.0) & (vth_target < 0.0))
+    mag_p = np.maximum(mag_p, 0.0)  # 届かない目標は |Vfb| = 0（最も近い値）に張り付ける
+    vfb_p = np.where(vfb0 < 0.0, -mag_p, mag_p)
+    vfb = np.where(is_nmos, vfb_n, vfb_p)
+    return vfb, ok
+
+
+def solve_targets(
+    base: Dict,
+    vth,
+    idsat,
+    solve_for: str = "na",
+    temperature: float = 300.0,
+    tol: float = 1e-12,
+    max_iter: int = 200,
+    extraction: str = "direct",
+) -> InverseResult:
+    """
+    目標 (Vth, Idsat) の組を一括で解く。vth / idsat はスカラーまたは配列（ブロードキャスト）。
+
+    base      : プリセット dict（mu0, L, W, device_type と、解かない方の Na / Vfb を使う）
+    solve_for : "na"（Vfb 固定で Na を解く）または "vfb"（Na 固定で Vfb を解く）
+    tol       : log(Na) の収束幅
+    extraction: カードを作る順方向パイプラインの抽出方法（run_paramus_batch と同じ）
+    """
+    if solve_for not in ("na", "vfb"):
+        raise ValueError(f"solve_for must be 'na' or 'vfb', got {solve_for!r}")
+
+    p = _ensure_si_units(base)
+    vth_t, id_t = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(vth, dtype=float)),
+        np.atleast_1d(np.asarray(idsat, dtype=float)),
+    )
+    n = vth_t.shape[0]
+    seed = PhysBatch.from_arrays(
+        tox_m=np.full(n, float(p["tox_m"])), na_m3=float(p["na_m3"]), vfb=float(p["vfb"]),
+        mu0=float(p["mu0"]), L_m=float(p["L_m"]), W_m=float(p["W_m"]),
+        device_type=p.get("device_type", "nmos"),
+    )
+
+    # 1) Idsat → Cox → tox（閉形式）
+    factor = idsat_factor(seed.mu0, seed.L_m, seed.W_m)
+    ok_id = id_t > 0.0
+    cox = np.where(ok_id, np.abs(id_t) / factor, EPS_OX / seed.tox_m)
+    tox = EPS_OX / cox
+
+    # 2) Vth → Na または Vfb
+    if solve_for == "na":
+        na, ok_vth = _solve_na(vth_t, cox, seed.vfb, seed.is_nmos, temperature, tol, max_iter)
+        vfb = seed.vfb
+    else:
+        vfb, ok_vth = _solve_vfb(vth_t, cox, seed.na_m3, seed.vfb, seed.is_nmos, temperature)
+        na = seed.na_m3
+
+    phys = PhysBatch(
+        tox_m=tox, na_m3=na, vfb=vfb, mu0=seed.mu0, L_m=seed.L_m, W_m=seed.W_m,
+        is_nmos=seed.is_nmos,
+    )
+    pois = run_poisson_batch(phys, temperature)
+    table = run_paramus_batch(phys, temperature, extraction=extraction)
+    ok_card = np.abs(table.columns["VTH0"] - vth_t) <= VTH0_TOL
+    return InverseResult(
+        phys=phys,
+        pois=pois,
+        idsat=factor * pois.cox,
+        converged=ok_id & ok_vth & ok_card,
+        table=table,
+    )
+
+
+def solve_target(base: Dict, vth: float, idsat: float, solve_for: str = "na",
+                 temperature: float = 300.0) -> Optional[Dict]:
+    """1 組だけ解いて、プリセット形式の dict（SI 単位）を返す。解けなければ None。"""
+    res = solve_targets(base, vth, idsat, solve_for=solve_for, temperature=temperature)
+    if not res.converged[0]:
+        return None
+    out = dict(base)
+    out.update(res.phys.row(0))
+    return out
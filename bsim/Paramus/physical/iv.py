@@ -2,7 +2,10 @@ from dataclasses import dataclass
 from typing import Dict
 import numpy as np
 
-from .poisson import PoissonResult
+from .poisson import PoissonResult, PhysBatch, PoissonBatch
+from .constants import (
+    VG_POINTS, VG_SPAN, VD_POINTS, VD_START, VD_LIN, VD_MAX, VG_HIGH_OVERDRIVE, LAMBDA0,
+)
 
 
 @dataclass
@@ -16,6 +19,18 @@ class IVData:
     vd_max: float
 
 
+@dataclass
+class IVBatch:
+    """IVData の配列版。各カーブは (デバイス数 N × 点数) の 2 次元配列。"""
+    vg: np.ndarray        # (N, VG_POINTS)
+    id_lin: np.ndarray    # (N, VG_POINTS)
+    vd: np.ndarray        # (N, VD_POINTS)
+    id_vd: np.ndarray     # (N, VD_POINTS)
+    vd_lin: float
+    vg_high: np.ndarray   # (N,)
+    vd_max: float
+
+
 def generate_iv_data(phys: Dict, pois: PoissonResult) -> IVData:
     """
     Poisson 結果と物理パラメータから、簡易な Id–Vg / Id–Vd を生成する。
@@ -34,21 +49,21 @@ def generate_iv_data(phys: Dict, pois: PoissonResult) -> IVData:
 
     # Vg スイープ
     vg_min = 0.0
-    vg_max = vg_th + 0.8
-    vg = np.linspace(vg_min, vg_max, 81)
+    vg_max = vg_th + VG_SPAN
+    vg = np.linspace(vg_min, vg_max, VG_POINTS)
 
-    vd_lin = 0.05  # 線形領域 Vd
-    vd_max = 1.2   # 飽和領域 Vd
+    vd_lin = VD_LIN  # 線形領域 Vd
+    vd_max = VD_MAX  # 飽和領域 Vd
 
     # Id–Vg（線形領域）
     overdrive = np.maximum(vg - vg_th, 0.0)
     id_lin = mu0 * cox * ratio * overdrive * vd_lin
 
     # Id–Vd（高 Vg でのチャネル長変調を見るため）
-    vg_high = vg_th + 0.6
-    vd = np.linspace(0.05, vd_max, 40)
+    vg_high = vg_th + VG_HIGH_OVERDRIVE
+    vd = np.linspace(VD_START, vd_max, VD_POINTS)
     overdrive_high = max(vg_high - vg_th, 0.0)
-    lambda0 = 0.1  # 仮のチャネル長変調係数
+    lambda0 = LAMBDA0
     id_vd = 0.5 * mu0 * cox * ratio * overdrive_high ** 2 * (1.0 + lambda0 * vd)
 
     return IVData(
@@ -60,3 +75,30 @@ def generate_iv_data(phys: Dict, pois: PoissonResult) -> IVData:
         vg_high=vg_high,
         vd_max=vd_max,
     )
+
+
+def generate_iv_batch(phys: PhysBatch, pois: PoissonBatch) -> IVBatch:
+    """generate_iv_data の配列版。全デバイスのカーブを 2 次元配列で一括生成する。"""
+    vg_th = pois.vth[:, None]
+    k = (phys.mu0 * pois.cox * (phys.W_m / phys.L_m))[:, None]
+
+    # Vg スイープ（デバイスごとに終点が異なる）
+    vg = np.linspace(0.0, pois.vth + VG_SPAN, VG_POINTS, axis=-1)
+    id_lin = k * np.maximum(vg - vg_th, 0.0) * VD_LIN
+
+    # Id–Vd（Vd 軸は全デバイス共通なのでコピーせずにブロードキャスト）
+    vg_high = pois.vth + VG_HIGH_OVERDRIVE
+    vd_1d = np.linspace(VD_START, VD_MAX, VD_POINTS)
+    overdrive_high = np.maximum(vg_high - pois.vth, 0.0)[:, None]
+    id_vd = 0.5 * k * overdrive_high ** 2 * (1.0 + LAMBDA0 * vd_1d)
+    vd = np.broadcast_to(vd_1d, id_vd.shape)
+
+    return IVBatch(
+        vg=vg,
+        id_lin=id_lin,
+        vd=vd,
+        id_vd=id_vd,
+        vd_lin=VD_LIN,
+        vg_high=vg_high,
+        vd_max=VD_MAX,
+    )
@@ -1,7 +1,39 @@
-from typing import Dict
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
 
-from .poisson import PoissonResult
-from .extract import CoreParams
+from .poisson import PoissonResult, PhysBatch, PoissonBatch
+from .extract import CoreParams, CoreParamsBatch
+from .constants import FIXED_PARAMS
+
+
+@dataclass
+class BsimTable:
+    """
+    BSIM4 パラメータの列指向テーブル。
+    columns[名前] が長さ N の配列で、N 個の dict を作らずに保持する。
+    """
+    columns: Dict[str, np.ndarray]
+    is_nmos: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.is_nmos.shape[0])
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    def row(self, i: int) -> Dict:
+        """i 番目のカードを build_modelcard にそのまま渡せる dict にする。"""
+        dev_type = "nmos" if self.is_nmos[i] else "pmos"
+        params: Dict = {k: float(v[i]) for k, v in self.columns.items()}
+        params["DEVICE_TYPE"] = dev_type
+        params["MODEL_NAME"] = f"paramus_{dev_type}"
+        return params
+
+    def rows(self):
+        for i in range(len(self)):
+            yield self.row(i)
 
 
 def map_to_bsim_params(phys: Dict, pois: PoissonResult, core: CoreParams) -> Dict[str, float]:
@@ -19,22 +51,22 @@ def map_to_bsim_params(phys: Dict, pois: PoissonResult, core: CoreParams) -> Dic
     # 酸化膜厚
     params["TOXM"] = float(phys["tox_m"])
 
-    # 表面制御係数など（簡易な固定値／ヒューリスティク）
-    params["NFACTOR"] = 1.5
-    params["ETA0"] = 0.05      # DIBL の初期値
-    params["DVT0"] = 1.0
-    params["DVT1"] = 0.5
+    # SCE / S/D / 容量などは固定値
+    params.update(FIXED_PARAMS)
 
-    # ソース/ドレイン
-    params["RDSW"] = 200.0     # [ohm*µm] 的なニュアンスの固定値
-    params["VSAT"] = 1.0e5     # [m/s] オーダーの値
+    return params
 
-    # 本来はドーピング・Vth ロールオフから決めるが、ここでは固定 or 緩い依存に留める
-    params["K1"] = 0.6
-    params["K2"] = -0.02
 
-    # 端子容量（かなりラフな固定値）
-    params["CGSO"] = 1.0e-10
-    params["CGDO"] = 1.0e-10
+def map_to_bsim_batch(phys: PhysBatch, pois: PoissonBatch, core: CoreParamsBatch) -> BsimTable:
+    """map_to_bsim_params の配列版。"""
+    n = len(phys)
+    columns: Dict[str, np.ndarray] = {
+        "VTH0": core.vth0,
+        "U0": core.u0,
+        "PCLM": core.pclm,
+        "TOXM": phys.tox_m,
+    }
+    for name, value in FIXED_PARAMS.items():
+        columns[name] = np.full(n, value)
 
-    return params
+    return BsimTable(columns=columns, is_nmos=phys.is_nmos)
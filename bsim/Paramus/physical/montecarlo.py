@@ -0,0 +1,152 @@
+"""
+Paramus Monte Carlo（統計モデルカード生成）。
+
+プリセットの物理パラメータを平均値として、指定分布（相関あり）から N 個サンプルし、
+バッチエンジンで BSIM4 カードを生成する。サンプル列は固定サイズのチャンクに分け、
+チャンクごとに SeedSequence.spawn した独立な乱数ストリームを使うので、
+ワーカー数を変えても同じ seed なら同じライブラリになる。
+
+分布指定（JSON）の例:
+    {
+      "params": {
+        "tox_m": {"dist": "normal",    "rel": 0.02},
+        "na_m3": {"dist": "lognormal", "rel": 0.05},
+        "vfb":   {"dist": "normal",    "abs": 0.01}
+      },
+      "correlation": [["tox_m", "na_m3", 0.3]]
+    }
+
+    rel : 平均値に対する相対標準偏差
+    abs : 絶対標準偏差（物理単位）
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+from modelcard.build import render_table
+
+from .poisson import PhysBatch, _ensure_si_units
+from .batch import run_paramus_batch
+
+
+MC_PARAMS = ("tox_m", "na_m3", "vfb", "mu0", "L_m", "W_m")
+
+# 分布指定が無いときのミスマッチ既定値
+DEFAULT_MC_SPEC: Dict = {
+    "params": {
+        "tox_m": {"dist": "normal", "rel": 0.02},
+        "na_m3": {"dist": "lognormal", "rel": 0.05},
+        "vfb": {"dist": "normal", "abs": 0.01},
+        "mu0": {"dist": "normal", "rel": 0.03},
+        "L_m": {"dist": "normal", "rel": 0.02},
+        "W_m": {"dist": "normal", "rel": 0.01},
+    },
+    "correlation": [],
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _correlation_matrix(spec: Dict, names: List[str]) -> np.ndarray:
+    """spec["correlation"] の (a, b, rho) 列から相関行列を作る。"""
+    index = {n: i for i, n in enumerate(names)}
+    corr = np.eye(len(names))
+    for a, b, rho in spec.get("correlation", []):
+        if a not in index or b not in index:
+            raise ValueError(f"correlation refers to unknown parameter: {a}, {b}")
+        corr[index[a], index[b]] = corr[index[b], index[a]] = float(rho)
+    return corr
+
+
+def sample_physical(
+    base: Dict,
+    spec: Dict,
+    n: int,
+    rng: np.random.Generator,
+) -> PhysBatch:
+    """
+    base（プリセット dict）を平均として n 個の物理パラメータをサンプルする。
+    相関は標準正規乱数に相関行列の Cholesky 因子を掛けて付与する。
+    """
+    p = _ensure_si_units(base)
+    dists = spec.get("params", {})
+    names = [k for k in MC_PARAMS if k in dists]
+    unknown = set(dists) - set(MC_PARAMS)
+    if unknown:
+        raise ValueError(f"unsupported Monte Carlo parameter(s): {sorted(unknown)}")
+
+    chol = np.linalg.cholesky(_correlation_matrix(spec, names))
+    z = rng.standard_normal((n, len(names))) @ chol.T
+
+    cols = {k: np.full(n, float(p[k])) for k in MC_PARAMS}
+    for j, name in enumerate(names):
+        d = dists[name]
+        mean = float(p[name])
+        sigma = float(d["abs"]) if "abs" in d else abs(mean) * float(d.get("rel", 0.0))
+        kind = d.get("dist", "normal")
+        if kind == "normal":
+            cols[name] = mean + sigma * z[:, j]
+        elif kind == "lognormal":
+            # 中央値 = mean, log 空間の標準偏差 = sigma / mean
+            cols[name] = mean * np.exp((sigma / abs(mean)) * z[:, j])
+        else:
+            raise ValueError(f"unsupported distribution: {kind}")
+
+    return PhysBatch.from_arrays(**cols, device_type=p.get("device_type", "nmos"))
+
+
+def _render_chunk(task) -> str:
+    """1 チャンク分をサンプル → バッチ評価 → .model テキスト化する（ワーカー側）。"""
+    base, spec, seed_seq, start, n, temperature, name_fmt, poisson, extraction = task
+    rng = np.random.default_rng(seed_seq)
+    phys = sample_physical(base, spec, n, rng)
+    table = run_paramus_batch(phys, temperature, poisson=poisson, extraction=extraction)
+
+    names = [
+        name_fmt.format(base="paramus_nmos" if f else "paramus_pmos", index=start + i)
+        for i, f in enumerate(table.is_nmos.tolist())
+    ]
+    return "\n".join(render_table(table, names))
+
+
+def generate_mc_blocks(
+    base: Dict,
+    n: int,
+    spec: Optional[Dict] = None,
+    seed: int = 0,
+    jobs: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    temperature: float = 300.0,
+    name_fmt: str = "{base}_mc{index:06d}",
+    poisson: str = "analytic",
+    extraction: str = "curves",
+) -> Iterator[str]:
+    """
+    N 個の統計カードをチャンク単位の .model テキストとして順番に返す。
+    jobs > 1 ならプロセスプールで並列評価し、先読みを jobs*2 チャンクに抑えて
+    メモリを一定に保つ。poisson / extraction は run_paramus_batch にそのまま渡す。
+    """
+    spec = DEFAULT_MC_SPEC if spec is None else spec
+    n_chunks = (n + chunk_size - 1) // chunk_size
+    streams = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    def tasks():
+        for c in range(n_chunks):
+            start = c * chunk_size
+            size = min(chunk_size, n - start)
+            yield (base, spec, streams[c], start, size, temperature, name_fmt, poisson, extraction)
+
+    if jobs <= 1:
+        for task in tasks():
+            yield _render_chunk(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for task in tasks():
+            pending.append(pool.submit(_render_chunk, task))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
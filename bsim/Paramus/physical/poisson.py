@@ -1,16 +1,13 @@
+from __future__ import annotations
+
+import math
 from dataclasses import dataclass
 from typing import Dict
-import numpy as np
 
-# 物理定数
-Q = 1.602176634e-19  # [C]
-K_B = 1.380649e-23   # [J/K]
-EPS0 = 8.8541878128e-12  # [F/m]
-EPS_SI = 11.7 * EPS0
-EPS_OX = 3.9 * EPS0
+# 物理定数は NumPy 非依存の constants.py に置き、ここから再エクスポートする
+from .constants import Q, K_B, EPS0, EPS_SI, EPS_OX, NI_M3
 
-# シリコンの固有キャリア密度（約 300 K）
-NI_M3 = 1.0e16  # [1/m^3] ≒ 1e10 [1/cm^3]
+# NumPy は単体（スカラー）実行では不要なので、バッチ用の関数の中でだけ import する
 
 
 @dataclass
@@ -21,6 +18,82 @@ class PoissonResult:
     gamma: float
 
 
+@dataclass
+class PhysBatch:
+    """
+    複数デバイス分の物理パラメータ（SI 単位）を struct-of-arrays で保持する。
+    各フィールドは長さ N の 1 次元配列。
+    """
+    tox_m: np.ndarray
+    na_m3: np.ndarray
+    vfb: np.ndarray
+    mu0: np.ndarray
+    L_m: np.ndarray
+    W_m: np.ndarray
+    is_nmos: np.ndarray   # bool 配列（False は pMOS）
+
+    def __len__(self) -> int:
+        return int(self.tox_m.shape[0])
+
+    @classmethod
+    def from_arrays(
+        cls,
+        tox_m,
+        na_m3,
+        vfb,
+        mu0,
+        L_m,
+        W_m,
+        device_type="nmos",
+    ) -> "PhysBatch":
+        """配列（またはスカラー）から PhysBatch を作る。スカラーは N にブロードキャスト。"""
+        import numpy as np
+
+        cols = np.broadcast_arrays(
+            *(np.asarray(v, dtype=float) for v in (tox_m, na_m3, vfb, mu0, L_m, W_m))
+        )
+        cols = [np.atleast_1d(c).astype(float) for c in cols]
+        n = cols[0].shape[0]
+        is_nmos = np.broadcast_to(np.asarray(device_type) == "nmos", (n,)).copy()
+        return cls(*cols, is_nmos=is_nmos)
+
+    @classmethod
+    def from_dicts(cls, items) -> "PhysBatch":
+        """プリセット形式の dict 列から PhysBatch を作る（単位変換込み）。"""
+        import numpy as np
+
+        rows = [_ensure_si_units(d) for d in items]
+        return cls(
+            tox_m=np.array([float(r["tox_m"]) for r in rows]),
+            na_m3=np.array([float(r["na_m3"]) for r in rows]),
+            vfb=np.array([float(r["vfb"]) for r in rows]),
+            mu0=np.array([float(r["mu0"]) for r in rows]),
+            L_m=np.array([float(r["L_m"]) for r in rows]),
+            W_m=np.array([float(r["W_m"]) for r in rows]),
+            is_nmos=np.array([r.get("device_type", "nmos") == "nmos" for r in rows]),
+        )
+
+    def row(self, i: int) -> Dict:
+        """i 番目のデバイスを単体パイプライン用の dict に戻す。"""
+        return {
+            "device_type": "nmos" if self.is_nmos[i] else "pmos",
+            "tox_m": float(self.tox_m[i]),
+            "na_m3": float(self.na_m3[i]),
+            "vfb": float(self.vfb[i]),
+            "mu0": float(self.mu0[i]),
+            "L_m": float(self.L_m[i]),
+            "W_m": float(self.W_m[i]),
+        }
+
+
+@dataclass
+class PoissonBatch:
+    vth: np.ndarray
+    cox: np.ndarray
+    phi_f: np.ndarray
+    gamma: np.ndarray
+
+
 def _ensure_si_units(phys: Dict) -> Dict:
     """
     プリセット JSON では:
@@ -65,14 +138,36 @@ def run_poisson(phys: Dict, temperature: float = 300.0) -> PoissonResult:
 
     cox = EPS_OX / tox  # 単位面積あたり [F/m^2]
 
-    phi_f = (K_B * t / Q) * np.log(na / NI_M3)  # フェルミポテンシャル
-    gamma = np.sqrt(2.0 * Q * EPS_SI * na) / cox
+    phi_f = (K_B * t / Q) * math.log(na / NI_M3)  # フェルミポテンシャル
+    gamma = math.sqrt(2.0 * Q * EPS_SI * na) / cox
 
     if dev_type == "nmos":
-        vth = vfb + 2.0 * phi_f + gamma * np.sqrt(2.0 * phi_f)
+        vth = vfb + 2.0 * phi_f + gamma * math.sqrt(2.0 * phi_f)
     else:  # pMOS（簡易近似）
         # 絶対値のみを合わせる単純モデル
-        vth_mag = abs(vfb) + 2.0 * abs(phi_f) + gamma * np.sqrt(2.0 * abs(phi_f))
+        vth_mag = abs(vfb) + 2.0 * abs(phi_f) + gamma * math.sqrt(2.0 * abs(phi_f))
         vth = -vth_mag
 
     return PoissonResult(vth=vth, cox=cox, phi_f=phi_f, gamma=gamma)
+
+
+def run_poisson_batch(phys: PhysBatch, temperature=300.0) -> PoissonBatch:
+    """
+    run_poisson の配列版。全デバイスを NumPy 演算で一括計算する。
+    temperature はスカラーまたは長さ N の配列 [K]。
+    """
+    import numpy as np
+
+    t = np.asarray(temperature, dtype=float)
+
+    cox = EPS_OX / phys.tox_m
+
+    phi_f = (K_B * t / Q) * np.log(phys.na_m3 / NI_M3)
+    gamma = np.sqrt(2.0 * Q * EPS_SI * phys.na_m3) / cox
+
+    vth_n = phys.vfb + 2.0 * phi_f + gamma * np.sqrt(2.0 * phi_f)
+    abs_phi = np.abs(phi_f)
+    vth_p = -(np.abs(phys.vfb) + 2.0 * abs_phi + gamma * np.sqrt(2.0 * abs_phi))
+    vth = np.where(phys.is_nmos, vth_n, vth_p)
+
+    return PoissonBatch(vth=vth, cox=cox, phi_f=phi_f, gamma=gamma)
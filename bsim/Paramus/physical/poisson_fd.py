@@ -0,0 +1,277 @@
+"""
+数値 1 次元 Poisson による Vth（run_poisson の数値版）。
+
+Si 側（基板）で非線形 Poisson 方程式
+    εsi ψ'' = −ρ(ψ),   ρ = q (p − n − Na),
+    p = Na exp(−ψ/Vt),  n = (ni²/Na) exp(ψ/Vt)
+を、表面電位 ψ(0) = ψs = 2φF・基板側 ψ(L) = 0 の境界条件で解く。
+離散化は表面側を細かくした不等間隔メッシュの 3 点差分で、Newton 法の各反復は
+三重対角（帯行列）系を Thomas 法でデバイス方向にベクトル化して解く。
+
+得られた Si 側の全電荷 Qs（空乏電荷 + 反転電荷、空乏近似なし）から
+    Vth = Vfb + ψs + |Qs| / Cox
+とする（PMOS は run_poisson と同じく絶対値で計算して符号を反転）。
+酸化膜は電荷を持たない線形誘電体なので Cox = εox / tox はそのまま使う。
+
+キャッシュ:
+    tox と Vfb は酸化膜側の代数式にしか入らないので、Si 側の解（ψ プロファイルと Qs）は
+    (Na, T) だけで決まる。収束したプロファイルを (Na, T) で保持し、
+      - 同じ (Na, T) → 解き直さずに Qs を再利用（(tox, Na, Vfb, T) の結果は即座に求まる）
+      - 新しい (Na, T) → (log Na, T) が最も近いプロファイルを初期値（ウォームスタート）にする
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import math
+import threading
+
+import numpy as np
+
+from .constants import Q, K_B, EPS_SI, EPS_OX, NI_M3
+from .poisson import PoissonResult, PhysBatch, PoissonBatch, _ensure_si_units
+
+
+MESH_POINTS = 161        # Si 側メッシュ点数（両端の境界点を含む）
+MESH_GRADING = 1.05      # 隣り合うメッシュ幅の比（表面側が細かい）
+DEPTH_FACTOR = 6.0       # Si 側の深さ = DEPTH_FACTOR × 空乏層幅
+NEWTON_TOL = 1e-10       # [V]
+NEWTON_MAX_ITER = 60
+
+PROFILE_CACHE_SIZE = 1024
+
+
+def _mesh_unit() -> np.ndarray:
+    """[0, 1] 上の等比メッシュ（表面 x=0 側が細かい）。"""
+    r = MESH_GRADING
+    h = r ** np.arange(MESH_POINTS - 1)
+    x = np.concatenate([[0.0], np.cumsum(h)])
+    return x / x[-1]
+
+
+_UNIT_MESH = _mesh_unit()
+
+
+def _thomas(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """
+    三重対角系を行（デバイス）ごとに一括で解く。形はすべて (B, K)。
+    a: 下対角（a[:, 0] は未使用）, b: 対角, c: 上対角（c[:, -1] は未使用）
+    """
+    k = b.shape[1]
+    cp = np.empty_like(b)
+    dp = np.empty_like(b)
+    cp[:, 0] = c[:, 0] / b[:, 0]
+    dp[:, 0] = d[:, 0] / b[:, 0]
+    for i in range(1, k):
+        m = b[:, i] - a[:, i] * cp[:, i - 1]
+        cp[:, i] = c[:, i] / m
+        dp[:, i] = (d[:, i] - a[:, i] * dp[:, i - 1]) / m
+    x = np.empty_like(b)
+    x[:, -1] = dp[:, -1]
+    for i in range(k - 2, -1, -1):
+        x[:, i] = dp[:, i] - cp[:, i] * x[:, i + 1]
+    return x
+
+
+def _depletion_width(na: np.ndarray, psi_s: np.ndarray) -> np.ndarray:
+    return np.sqrt(2.0 * EPS_SI * psi_s / (Q * na))
+
+
+def solve_si_charge(
+    na: np.ndarray,
+    temperature: np.ndarray,
+    psi_init: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    ψs = 2φF での Si 側 Poisson を全行一括で解く。
+    psi_init: (B, MESH_POINTS) の初期値（ψ/ψs で正規化したプロファイル）。None なら空乏近似。
+    戻り値: (|Qs| [C/m^2], ψ プロファイル (B, M), ψs, 反復回数)
+    """
+    na = np.asarray(na, dtype=float)
+    t = np.broadcast_to(np.asarray(temperature, dtype=float), na.shape)
+    vt = K_B * t / Q
+    psi_s = 2.0 * vt * np.log(na / NI_M3)
+    n0 = NI_M3 ** 2 / na
+
+    depth = DEPTH_FACTOR * _depletion_width(na, psi_s)
+    x = _UNIT_MESH[None, :] * depth[:, None]             # (B, M)
+    h = np.diff(x, axis=1)                               # (B, M-1)
+
+    if psi_init is None:
+        u = np.clip(1.0 - _UNIT_MESH[None, :] * DEPTH_FACTOR, 0.0, None)
+        psi = psi_s[:, None] * u ** 2
+    else:
+        psi = psi_s[:, None] * psi_init
+    psi[:, 0] = psi_s
+    psi[:, -1] = 0.0
+
+    hl = h[:, :-1]       # 内部点 i の左側の幅
+    hr = h[:, 1:]        # 右側の幅
+    w = 0.5 * (hl + hr)  # コントロールボリューム幅
+    vt_c = vt[:, None]
+    na_c = na[:, None]
+    n0_c = n0[:, None]
+
+    iters = 0
+    for iters in range(1, NEWTON_MAX_ITER + 1):
+        pi = psi[:, 1:-1]
+        ep = np.exp(-pi / vt_c)
+        en = np.exp(pi / vt_c)
+        rho = Q * (na_c * ep - n0_c * en - na_c)
+        drho = -Q * (na_c * ep + n0_c * en) / vt_c
+
+        flux = EPS_SI * ((psi[:, 2:] - pi) / hr - (pi - psi[:, :-2]) / hl)
+        f = flux + w * rho                                 # = 0 を解く
+        a = EPS_SI / hl
+        c = EPS_SI / hr
+        b = -(a + c) + w * drho
+        a_ = a.copy()
+        c_ = c.copy()
+        a_[:, 0] = 0.0
+        c_[:, -1] = 0.0
+
+        delta = _thomas(a_, b, c_, -f)
+        # 1 反復の更新幅を制限（指数項での発散防止）
+        delta = np.clip(delta, -2.0 * vt_c, 2.0 * vt_c)
+        psi[:, 1:-1] = pi + delta
+        if np.max(np.abs(delta)) < NEWTON_TOL:
+            break
+
+    # 表面のハーフセルまで含めた離散 Gauss の法則: −Qs = εsi ψ'(0) の FV 版
+    p0 = psi[:, 0]
+    rho0 = Q * (na * np.exp(-p0 / vt) - n0 * np.exp(p0 / vt) - na)
+    qs = EPS_SI * (psi[:, 0] - psi[:, 1]) / h[:, 0] - 0.5 * h[:, 0] * rho0
+    return np.abs(qs), psi, psi_s, iters
+
+
+class SiProfileCache:
+    """
+    (Na, T) → (|Qs|, 正規化 ψ プロファイル) の LRU。
+    モジュール共通のインスタンスを service.py のワーカースレッドなどから同時に使うので、
+    OrderedDict と統計の操作はロックで守る（Newton 法の計算自体はロックの外）。
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[float, float], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.warm_starts = 0
+        self.cold_starts = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, na: float, t: float) -> Optional[float]:
+        key = (float(na), float(t))
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def nearest_profiles(self, na: np.ndarray, t: np.ndarray) -> Optional[np.ndarray]:
+        """
+        各 (Na, T) に (log Na, T/100) の距離が最小のプロファイルを返す（ウォームスタート用）。
+        返せた組は warm_starts、キャッシュが空なら cold_starts に数える。
+        """
+        with self._lock:
+            if not self._entries:
+                self.cold_starts += len(na)
+                return None
+            self.warm_starts += len(na)
+            keys = np.array(list(self._entries.keys()))          # (E, 2)
+            profiles = [v[1] for v in self._entries.values()]
+        d = (np.log(keys[None, :, 0]) - np.log(na)[:, None]) ** 2 \
+            + ((keys[None, :, 1] - t[:, None]) / 100.0) ** 2
+        idx = np.argmin(d, axis=1)
+        return np.stack([profiles[j] for j in idx.tolist()])
+
+    def put(self, na: float, t: float, qs: float, psi_norm: np.ndarray) -> None:
+        with self._lock:
+            self._entries[(float(na), float(t))] = (float(qs), psi_norm)
+            self._entries.move_to_end((float(na), float(t)))
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "warm_starts": self.warm_starts,
+                "cold_starts": self.cold_starts,
+            }
+
+
+_CACHE = SiProfileCache()
+
+
+def get_profile_cache() -> SiProfileCache:
+    return _CACHE
+
+
+def si_charge(na: np.ndarray, temperature: np.ndarray, cache: Optional[SiProfileCache] = None) -> np.ndarray:
+    """
+    |Qs|(Na, T) を返す。キャッシュにある組は再利用し、無い組だけ
+    （最も近いキャッシュ済みプロファイルを初期値にして）一括で解く。
+    """
+    cache = _CACHE if cache is None else cache
+    na = np.atleast_1d(np.asarray(na, dtype=float))
+    t = np.broadcast_to(np.asarray(temperature, dtype=float), na.shape)
+    qs = np.empty_like(na)
+
+    missing: Dict[Tuple[float, float], list] = {}
+    for i, (n_i, t_i) in enumerate(zip(na.tolist(), t.tolist())):
+        hit = cache.get(n_i, t_i)
+        if hit is None:
+            missing.setdefault((n_i, t_i), []).append(i)
+        else:
+            qs[i] = hit
+    if not missing:
+        return qs
+
+    keys = list(missing)
+    na_u = np.array([k[0] for k in keys])
+    t_u = np.array([k[1] for k in keys])
+    psi_init = cache.nearest_profiles(na_u, t_u)
+    qs_u, psi, psi_s, _ = solve_si_charge(na_u, t_u, psi_init)
+
+    for j, key in enumerate(keys):
+        cache.put(key[0], key[1], qs_u[j], psi[j] / psi_s[j])
+        qs[missing[key]] = qs_u[j]
+    return qs
+
+
+def run_poisson_fd(phys: Dict, temperature: float = 300.0) -> PoissonResult:
+    """run_poisson と同じ形の結果を数値 Poisson で返す。"""
+    p = _ensure_si_units(phys)
+    tox = float(p["tox_m"])
+    na = float(p["na_m3"])
+    vfb = float(p["vfb"])
+
+    cox = EPS_OX / tox
+    phi_f = (K_B * temperature / Q) * math.log(na / NI_M3)
+    gamma = math.sqrt(2.0 * Q * EPS_SI * na) / cox
+    qs = float(si_charge(np.array([na]), temperature)[0])
+
+    if p.get("device_type", "nmos") == "nmos":
+        vth = vfb + 2.0 * phi_f + qs / cox
+    else:  # pMOS（run_poisson と同じく絶対値で計算）
+        vth = -(abs(vfb) + 2.0 * abs(phi_f) + qs / cox)
+    return PoissonResult(vth=vth, cox=cox, phi_f=phi_f, gamma=gamma)
+
+
+def run_poisson_fd_batch(phys: PhysBatch, temperature=300.0) -> PoissonBatch:
+    """run_poisson_batch の数値 Poisson 版。"""
+    t = np.broadcast_to(np.asarray(temperature, dtype=float), phys.na_m3.shape)
+    cox = EPS_OX / phys.tox_m
+    phi_f = (K_B * t / Q) * np.log(phys.na_m3 / NI_M3)
+    gamma = np.sqrt(2.0 * Q * EPS_SI * phys.na_m3) / cox
+    qs = si_charge(phys.na_m3, t)
+
+    vth_n = phys.vfb + 2.0 * phi_f + qs / cox
+    vth_p = -(np.abs(phys.vfb) + 2.0 * np.abs(phi_f) + qs / cox)
+    vth = np.where(phys.is_nmos, vth_n, vth_p)
+    return PoissonBatch(vth=vth, cox=cox, phi_f=phi_f, gamma=gamma)
@@ -0,0 +1,149 @@
+"""
+プリセットレジストリ。
+
+presets/*.json を 1 回だけ読み込んで (デバイス種別, ノード[nm]) で引けるメモリ上の
+テーブルにし、以降の load_preset はディスクを読まない。
+既存ファイルに無い中間ノード（例: 110nm）は、上下のノードから物理パラメータを補間する。
+
+    reg = get_registry()
+    reg.get("110nm", "nmos")     # 90nm / 130nm から補間
+
+事前に
+    python physical/presets.py
+を実行すると presets/presets.pkl（バイナリバンドル）を作成し、
+JSON より新しければ次回からはこちらを 1 回読むだけになる。
+"""
+import json
+import math
+import pickle
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+PRESET_DIR = Path(__file__).resolve().parent.parent / "presets"
+BUNDLE_PATH = PRESET_DIR / "presets.pkl"
+
+# 対数で補間する項目（ドーピング濃度）。それ以外の数値は線形補間
+LOG_INTERP_PREFIXES = ("na_",)
+
+
+def parse_node(node) -> float:
+    """'130nm' / '130' / 130 → 130.0 [nm]"""
+    if isinstance(node, (int, float)):
+        return float(node)
+    m = re.fullmatch(r"\s*([0-9.]+)\s*(nm)?\s*", str(node))
+    if m is None:
+        raise ValueError(f"invalid node: {node!r}")
+    return float(m.group(1))
+
+
+def format_node(node_nm: float) -> str:
+    return f"{node_nm:g}nm"
+
+
+def _interp_value(key: str, a, b, t: float):
+    if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+        return a
+    if key.startswith(LOG_INTERP_PREFIXES) and a > 0 and b > 0:
+        return math.exp(math.log(a) + t * (math.log(b) - math.log(a)))
+    return a + t * (b - a)
+
+
+class PresetRegistry:
+    """(dev_type, node_nm) → プリセット dict のインデックス付きテーブル。"""
+
+    def __init__(self, presets: Dict[Tuple[str, float], Dict], invalid: Optional[Dict] = None):
+        self.presets = presets
+        # 中身が空・壊れているファイル: (dev_type, node_nm) → パス
+        self.invalid: Dict[Tuple[str, float], str] = invalid or {}
+        self._nodes: Dict[str, List[float]] = {}
+        for dev_type, node_nm in presets:
+            self._nodes.setdefault(dev_type, []).append(node_nm)
+        for nodes in self._nodes.values():
+            nodes.sort()
+
+    @classmethod
+    def from_dir(cls, preset_dir: Path = PRESET_DIR) -> "PresetRegistry":
+        presets: Dict[Tuple[str, float], Dict] = {}
+        invalid: Dict[Tuple[str, float], str] = {}
+        for path in sorted(preset_dir.glob("*.json")):
+            m = re.fullmatch(r"(nmos|pmos)_(.+)", path.stem)
+            if m is None:
+                continue
+            key = (m.group(1), parse_node(m.group(2)))
+            try:
+                presets[key] = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                invalid[key] = str(path)
+        return cls(presets, invalid)
+
+    @classmethod
+    def from_bundle(cls, path: Path = BUNDLE_PATH) -> "PresetRegistry":
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        return cls(data["presets"], data.get("invalid"))
+
+    def save_bundle(self, path: Path = BUNDLE_PATH) -> None:
+        with open(path, "wb") as f:
+            pickle.dump({"presets": self.presets, "invalid": self.invalid}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    def nodes(self, dev_type: str) -> List[float]:
+        return list(self._nodes.get(dev_type, []))
+
+    def get(self, node, dev_type: str) -> Dict:
+        """
+        プリセットを返す（コピー）。完全一致が無ければ上下のノードから補間する。
+        見つからない / 補間できない場合は KeyError、ファイルが壊れている場合は ValueError。
+        """
+        node_nm = parse_node(node)
+        key = (dev_type, node_nm)
+        if key in self.presets:
+            return dict(self.presets[key])
+        if key in self.invalid:
+            raise ValueError(f"Preset file is empty or invalid: {self.invalid[key]}")
+        return self.interpolate(node_nm, dev_type)
+
+    def interpolate(self, node_nm: float, dev_type: str) -> Dict:
+        nodes = self._nodes.get(dev_type, [])
+        lower = [n for n in nodes if n < node_nm]
+        upper = [n for n in nodes if n > node_nm]
+        if not lower or not upper:
+            raise KeyError(
+                f"no {dev_type} preset for {format_node(node_nm)} and no bracketing nodes "
+                f"to interpolate from (available: {[format_node(n) for n in nodes]})"
+            )
+
+        n0, n1 = lower[-1], upper[0]
+        a = self.presets[(dev_type, n0)]
+        b = self.presets[(dev_type, n1)]
+        t = (node_nm - n0) / (n1 - n0)
+
+        out = {k: _interp_value(k, v, b.get(k, v), t) for k, v in a.items()}
+        out["node"] = format_node(node_nm)
+        out["device_type"] = dev_type
+        return out
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> PresetRegistry:
+    """
+    プロセス内で 1 回だけレジストリを構築する。
+    presets.pkl が全 JSON より新しければバンドルから、そうでなければ JSON から読む。
+    """
+    json_files = list(PRESET_DIR.glob("*.json"))
+    if BUNDLE_PATH.exists():
+        newest = max((p.stat().st_mtime_ns for p in json_files), default=0)
+        if BUNDLE_PATH.stat().st_mtime_ns >= newest:
+            return PresetRegistry.from_bundle()
+    return PresetRegistry.from_dir()
+
+
+if __name__ == "__main__":
+    reg = PresetRegistry.from_dir()
+    reg.save_bundle()
+    print(f"[presets] {len(reg.presets)} presets -> {BUNDLE_PATH}")
+    for key, path in reg.invalid.items():
+        print(f"[presets] skipped empty/invalid preset: {path}")
@@ -0,0 +1,125 @@
+"""
+単体デバイス用のスカラー版パイプライン（math のみ・NumPy 非依存）。
+
+iv.py → extract.py → mapping.py と同じ擬似カーブ・同じ抽出手順を
+Python の float リストで行う。paramus.py の 1 枚生成はこちらを使うので、
+起動時に NumPy を import しない（バッチ系の機能は必要になった時点で NumPy を読む）。
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from .constants import (
+    VG_POINTS, VG_SPAN, VD_POINTS, VD_START, VD_LIN, VD_MAX, VG_HIGH_OVERDRIVE, LAMBDA0,
+    FIXED_PARAMS, GM_PLATEAU_RTOL,
+)
+from .poisson import PoissonResult, run_poisson
+
+
+def _linspace(start: float, stop: float, num: int) -> List[float]:
+    # np.linspace と同じ値（終点は stop に一致させる）
+    step = (stop - start) / (num - 1)
+    out = [start + i * step for i in range(num)]
+    out[-1] = stop
+    return out
+
+
+def _gradient(y: List[float]) -> List[float]:
+    # np.gradient（等間隔・インデックス単位）と同じ中心差分
+    n = len(y)
+    g = [0.0] * n
+    g[0] = y[1] - y[0]
+    g[-1] = y[-1] - y[-2]
+    for i in range(1, n - 1):
+        g[i] = 0.5 * (y[i + 1] - y[i - 1])
+    return g
+
+
+def _fit_line(x: List[float], y: List[float]) -> Tuple[float, float]:
+    # y ≒ k*x + b の最小二乗（np.polyfit(x, y, 1) 相当）
+    n = len(x)
+    xm = sum(x) / n
+    ym = sum(y) / n
+    sxx = sum((xi - xm) ** 2 for xi in x)
+    sxy = sum((xi - xm) * (yi - ym) for xi, yi in zip(x, y))
+    k = sxy / sxx
+    return k, ym - k * xm
+
+
+@dataclass
+class IVScalar:
+    """IVData のリスト版。"""
+    vg: List[float]
+    id_lin: List[float]
+    vd: List[float]
+    id_vd: List[float]
+
+
+def generate_iv_scalar(phys: Dict, pois: PoissonResult) -> IVScalar:
+    """generate_iv_data のスカラー版（同じ擬似 Id–Vg / Id–Vd）。"""
+    mu0 = float(phys["mu0"])
+    ratio = float(phys["W_m"]) / float(phys["L_m"])
+    k = mu0 * pois.cox * ratio
+
+    # Id–Vg（線形領域）
+    vg = _linspace(0.0, pois.vth + VG_SPAN, VG_POINTS)
+    id_lin = [k * max(v - pois.vth, 0.0) * VD_LIN for v in vg]
+
+    # Id–Vd（高 Vg でのチャネル長変調）
+    vd = _linspace(VD_START, VD_MAX, VD_POINTS)
+    overdrive_high = max(VG_HIGH_OVERDRIVE, 0.0)
+    id_vd = [0.5 * k * overdrive_high ** 2 * (1.0 + LAMBDA0 * v) for v in vd]
+
+    return IVScalar(vg=vg, id_lin=id_lin, vd=vd, id_vd=id_vd)
+
+
+def extract_core_scalar(phys: Dict, pois: PoissonResult, iv: IVScalar) -> Dict[str, float]:
+    """extract_core_params のスカラー版（VTH0 / U0 / PCLM）。"""
+    ratio = float(phys["W_m"]) / float(phys["L_m"])
+    vg, id_lin = iv.vg, iv.id_lin
+
+    # gmmax 法（平坦部は最初の点を使う。gmmax_vth_rows と同じ）
+    dvg = _gradient(vg)
+    did = _gradient(id_lin)
+    gm = [di / dv if dv != 0 else None for dv, di in zip(dvg, did)]
+    peak = max(g for g in gm if g is not None)
+    idx = next(i for i, g in enumerate(gm) if g is not None and g >= peak - GM_PLATEAU_RTOL * abs(peak))
+    vth0 = vg[idx]
+
+    # 線形領域の傾きから μ0
+    pts = [(v - vth0, i) for v, i in zip(vg, id_lin) if v > vth0 + 0.1]
+    if len(pts) < 3:
+        u0 = float(phys["mu0"])  # うまく取れなければプリセット値
+    else:
+        slope, _ = _fit_line([p[0] for p in pts], [p[1] for p in pts])
+        u0 = slope / (pois.cox * ratio * VD_LIN)
+
+    # Id–Vd の直線フィットから λ → PCLM
+    slope, id0 = _fit_line(iv.vd, iv.id_vd)
+    pclm = 0.1 if id0 <= 0 else max(slope / id0, 0.01)
+
+    return {"vth0": vth0, "u0": u0, "pclm": pclm}
+
+
+def extract_core_direct_scalar(phys: Dict, pois: PoissonResult) -> Dict[str, float]:
+    """extract_core_direct のスカラー版（擬似カーブを作らない閉形式の抽出）。"""
+    return {"vth0": pois.vth, "u0": float(phys["mu0"]), "pclm": max(LAMBDA0, 0.01)}
+
+
+def map_to_bsim_scalar(phys: Dict, pois: PoissonResult, core: Dict[str, float]) -> Dict[str, float]:
+    """map_to_bsim_params のスカラー版。"""
+    params: Dict[str, float] = {
+        "VTH0": core["vth0"],
+        "U0": core["u0"],
+        "PCLM": core["pclm"],
+        "TOXM": float(phys["tox_m"]),
+    }
+    params.update(FIXED_PARAMS)
+    return params
+
+
+def run_pipeline_scalar(phys: Dict, temperature: float = 300.0) -> Dict[str, float]:
+    """Poisson → IV → 抽出 → BSIM4 マッピングを 1 デバイス分スカラーで行う。"""
+    pois = run_poisson(phys, temperature)
+    iv = generate_iv_scalar(phys, pois)
+    core = extract_core_scalar(phys, pois, iv)
+    return map_to_bsim_scalar(phys, pois, core)
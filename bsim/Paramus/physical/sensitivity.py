@@ -0,0 +1,178 @@
+"""
+Paramus の前進モード感度解析（ヤコビアン）。
+
+run_poisson → generate_iv_data → extract_core_params → map_to_bsim_params の各段を、
+値と一緒に接ベクトル（6 入力 tox, Na, Vfb, μ0, L, W 方向の微分）を運ぶ形で手で微分した。
+1 回の一括計算で BSIM4 パラメータと ∂(VTH0, U0, PCLM, TOXM)/∂(入力) が全デバイス分得られる。
+
+    sens = run_sensitivity_batch(phys)          # phys: PhysBatch
+    sens.jacobian["VTH0"]                        # (N, 6)、列の順は INPUTS
+    sens.normalized()["VTH0"]                    # ∂lnY/∂lnX（無次元の感度）
+
+接ベクトルの形: スカラー量は (N, P)、カーブは (N, 点数, P)（P = len(INPUTS)）。
+
+注: gmmax の点選択・μ0 フィットの点選択・PCLM 下限クリップなどの離散的な選択は、
+その点で固定して微分する（区分的に滑らかな関数の片側微分）。gmmax の点は平坦部の
+最初の点に決まる（extract.gmmax_vth_rows）ので、VTH0 の微分はその点の Vg の微分。
+"""
+from dataclasses import dataclass
+from typing import Dict
+import numpy as np
+
+from .poisson import PhysBatch, run_poisson_batch
+from .iv import generate_iv_batch
+from .extract import CoreParamsBatch, extract_core_direct_batch, gmmax_vth_rows, mobility_rows, pclm_rows
+from .mapping import BsimTable, map_to_bsim_batch
+from .constants import Q, K_B, VG_POINTS, VD_LIN
+
+
+# 微分する入力（PhysBatch のフィールド名）
+INPUTS = ("tox_m", "na_m3", "vfb", "mu0", "L_m", "W_m")
+
+# ヤコビアンを持つ出力（FIXED_PARAMS の項目は入力に依らないので 0）
+OUTPUTS = ("VTH0", "U0", "PCLM", "TOXM")
+
+
+@dataclass
+class SensitivityResult:
+    table: BsimTable                  # 値（run_paramus_batch と同じ）
+    jacobian: Dict[str, np.ndarray]   # 出力名 → (N, len(INPUTS))
+    phys: PhysBatch
+
+    def column(self, output: str, wrt: str) -> np.ndarray:
+        """∂output/∂wrt の (N,) 配列。"""
+        return self.jacobian[output][:, INPUTS.index(wrt)]
+
+    def normalized(self) -> Dict[str, np.ndarray]:
+        """対数感度 ∂lnY/∂lnX = (X/Y) ∂Y/∂X。"""
+        x = np.stack([getattr(self.phys, name) for name in INPUTS], axis=1)
+        out = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for name, jac in self.jacobian.items():
+                y = self.table.columns[name][:, None]
+                out[name] = jac * x / y
+        return out
+
+
+def _seed(n: int, name: str) -> np.ndarray:
+    """入力 name 自身の接ベクトル（単位ベクトル）。"""
+    d = np.zeros((n, len(INPUTS)))
+    d[:, INPUTS.index(name)] = 1.0
+    return d
+
+
+def _fit_slope_tangent(x, dx, y, dy, w):
+    """
+    行ごとの最小二乗 y ≒ k x + b（点選択 w は固定）の (k, dk, b, db)。
+        k = Sxy / Sxx,  dk = (dSxy − k dSxx) / Sxx,  b = ym − k xm
+    """
+    wf = w.astype(float)
+    n = np.maximum(wf.sum(axis=1), 1.0)
+    xm = (np.where(w, x, 0.0)).sum(axis=1) / n
+    ym = (np.where(w, y, 0.0)).sum(axis=1) / n
+    dxm = (wf[:, :, None] * dx).sum(axis=1) / n[:, None]
+    dym = (wf[:, :, None] * dy).sum(axis=1) / n[:, None]
+
+    xc = np.where(w, x - xm[:, None], 0.0)
+    yc = np.where(w, y - ym[:, None], 0.0)
+    dxc = wf[:, :, None] * (dx - dxm[:, None, :])
+    dyc = wf[:, :, None] * (dy - dym[:, None, :])
+
+    sxx = (xc * xc).sum(axis=1)
+    sxy = (xc * yc).sum(axis=1)
+    dsxx = 2.0 * (xc[:, :, None] * dxc).sum(axis=1)
+    dsxy = (dxc * yc[:, :, None] + xc[:, :, None] * dyc).sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = sxy / sxx
+        dk = (dsxy - k[:, None] * dsxx) / sxx[:, None]
+    b = ym - k * xm
+    db = dym - dk * xm[:, None] - k[:, None] * dxm
+    return k, dk, b, db
+
+
+def run_sensitivity_batch(phys: PhysBatch, temperature=300.0, extraction: str = "curves") -> SensitivityResult:
+    """
+    値（run_paramus_batch と同一）とヤコビアンを 1 回の一括計算で求める。
+    extraction="direct" なら extract_core_direct_batch（VTH0 = Vth, U0 = μ0, PCLM 一定）を微分する。
+    """
+    if extraction not in ("curves", "direct"):
+        raise ValueError(f"unknown extraction mode: {extraction}")
+    n = len(phys)
+    d_tox, d_na, d_vfb = _seed(n, "tox_m"), _seed(n, "na_m3"), _seed(n, "vfb")
+    d_mu0, d_L, d_W = _seed(n, "mu0"), _seed(n, "L_m"), _seed(n, "W_m")
+    col = lambda a: a[:, None]  # (N,) → (N, 1)（接ベクトルとのブロードキャスト用）
+
+    # --- Poisson ---------------------------------------------------------
+    pois = run_poisson_batch(phys, temperature)
+    cox, phi_f, gamma = pois.cox, pois.phi_f, pois.gamma
+    t = np.asarray(temperature, dtype=float)
+
+    d_cox = -col(cox / phys.tox_m) * d_tox
+    d_phi = col(K_B * t / Q / phys.na_m3) * d_na
+    d_gamma = col(gamma) * (0.5 * d_na / col(phys.na_m3) - d_cox / col(cox))
+
+    abs_phi = np.abs(phi_f)
+    s = np.sqrt(2.0 * abs_phi)
+    d_abs_phi = col(np.sign(phi_f)) * d_phi
+    d_mag = 2.0 * d_abs_phi + d_gamma * col(s) + col(gamma / s) * d_abs_phi
+    d_vth_n = d_vfb + d_mag
+    d_vth_p = -(col(np.sign(phys.vfb)) * d_vfb + d_mag)
+    d_vth = np.where(col(phys.is_nmos), d_vth_n, d_vth_p)
+
+    if extraction == "direct":
+        core = extract_core_direct_batch(phys, pois)
+        table = map_to_bsim_batch(phys, pois, core)
+        jacobian = {"VTH0": d_vth, "U0": d_mu0, "PCLM": np.zeros_like(d_vth), "TOXM": d_tox}
+        return SensitivityResult(table=table, jacobian=jacobian, phys=phys)
+
+    # --- IV ---------------------------------------------------------------
+    iv = generate_iv_batch(phys, pois)
+    ratio = phys.W_m / phys.L_m
+    k = phys.mu0 * cox * ratio
+    d_ratio = col(ratio) * (d_W / col(phys.W_m) - d_L / col(phys.L_m))
+    d_k = col(k) * (d_mu0 / col(phys.mu0) + d_cox / col(cox) + d_ratio / col(ratio))
+
+    # vg_i = (i / (M-1)) (Vth + VG_SPAN) なので dvg_i = (i / (M-1)) dVth
+    frac = np.linspace(0.0, 1.0, VG_POINTS)
+    d_vg = frac[None, :, None] * d_vth[:, None, :]
+    ov = iv.vg - col(pois.vth)
+    on = ov > 0.0
+    d_id_lin = VD_LIN * (
+        d_k[:, None, :] * np.maximum(ov, 0.0)[:, :, None]
+        + k[:, None, None] * on[:, :, None] * (d_vg - d_vth[:, None, :])
+    )
+
+    # Id–Vd: Id = ½ k Vov² (1 + λ Vd)、Vov（= VG_HIGH_OVERDRIVE）は入力に依らない
+    d_id_vd = (iv.id_vd / col(k))[:, :, None] * d_k[:, None, :]
+
+    # --- 抽出 -------------------------------------------------------------
+    vth0, _, idx = gmmax_vth_rows(iv.vg, iv.id_lin)
+    d_vth0 = np.take_along_axis(d_vg, idx[:, None, None], axis=1)[:, 0, :]
+
+    u0 = mobility_rows(iv.vg, iv.id_lin, vth0, cox=cox, ratio=ratio,
+                       vd_lin=iv.vd_lin, fallback=phys.mu0)
+    x = iv.vg - col(vth0)
+    w = x > 0.1
+    dx = d_vg - d_vth0[:, None, :]
+    slope, d_slope, _, _ = _fit_slope_tangent(x, dx, iv.id_lin, d_id_lin, w)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d_u0_fit = col(u0) * (d_slope / col(slope) - d_cox / col(cox) - d_ratio / col(ratio))
+    d_u0 = np.where(col(w.sum(axis=1) < 3), d_mu0, d_u0_fit)
+
+    pclm = pclm_rows(iv.vd, iv.id_vd)
+    vd = np.asarray(iv.vd)
+    k_vd, d_k_vd, id0, d_id0 = _fit_slope_tangent(
+        vd, np.zeros_like(d_id_vd), iv.id_vd, d_id_vd, np.ones(vd.shape, dtype=bool)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lam = k_vd / id0
+        d_lam = (d_k_vd - col(lam) * d_id0) / col(id0)
+    clipped = (id0 <= 0) | (lam < 0.01)
+    d_pclm = np.where(col(clipped), 0.0, d_lam)
+
+    # --- マッピング -------------------------------------------------------
+    core = CoreParamsBatch(vth0=vth0, u0=u0, pclm=pclm)
+    table = map_to_bsim_batch(phys, pois, core)
+    jacobian = {"VTH0": d_vth0, "U0": d_u0, "PCLM": d_pclm, "TOXM": d_tox}
+    return SensitivityResult(table=table, jacobian=jacobian, phys=phys)
@@ -0,0 +1,317 @@
+"""
+BSIM4 カード → I–V 特徴量（dim アナライザと同じ Vth_gmmax, gmmax, Id_lin, Id_sat, Vdsat_approx）の代理モデル。
+
+ベースカード（generate_dim_models.py の NMOS_BASE から作ったカードなど）の周りで
+パラメータをラテン超方格サンプリングし、シミュレータで Id–Vg / Id–Vd を一括評価して
+特徴量を抽出、2 次多項式のリッジ回帰を当てる:
+
+    card = card_from_dict("nmos_base", "nmos", NMOS_BASE)
+    sweeps = feature_sweeps("nmos", L=0.13e-6, W=1e-6)
+    sim = NgspiceEvaluator(card, sweeps, jobs=16)           # または DcModelEvaluator(card, sweeps)
+    sur = train_surrogate(card, ["VTH0", "U0", "VSAT", "RDSW"], sim, n_samples=256)
+    sur.query({"VTH0": 0.42, "U0": 0.014}, simulator=sim)
+    # -> {"Vth_gmmax": (0.47, 0.003), ..., "source": "surrogate"}
+
+問い合わせは多項式の内積だけなので 1 点あたり数十 µs。不確かさはベイズ線形回帰の予測分散
+σ²(1 + φᵀ(ΦᵀΦ + λI)⁻¹φ) で、σ² には leave-one-out 残差の 2 乗平均を使う。
+学習範囲（正規化座標で 0.5 ± span の箱）の外の点は、simulator を渡せば実シミュレーションで
+評価し直す（source = "sim"、std = 0）。渡さなければ外挿値を source = "extrapolated" で返す。
+
+パラメータの正規化は fitting.ParamSpace（BOUNDS の shift / scale）をそのまま使う。
+gmmax / Id_lin / Id_sat は log10 で回帰する（桁で変わる量を 2 次式に乗せるため）。
+"""
+import json
+import math
+import time
+from dataclasses import dataclass
+from itertools import combinations_with_replacement
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from modelcard.parse import ModelCard, format_card, parse_lines
+from .fitting import BOUNDS, Measurement, ParamSpace, DcModelEvaluator, NgspiceEvaluator
+
+
+FEATURES = ("Vth_gmmax", "gmmax", "Id_lin", "Id_sat", "Vdsat_approx")
+LOG_FEATURES = ("gmmax", "Id_lin", "Id_sat")
+
+DEFAULT_SURROGATE_PARAMS = ("VTH0", "U0", "UA", "VSAT", "RDSW", "PCLM", "ETA0", "NFACTOR")
+
+# dim アナライザ（run_vg_dim.py / run_vd_dim.py）の掃引条件
+VDD = 1.2
+VG_STEP = 0.01
+VD_STEP = 0.02
+VDS_LIN = 0.05     # Id–Vg のドレイン電圧
+V_LIN_TARGET = 0.1  # Id_lin を読む Vds
+
+INSIDE_TOL = 1e-9   # 学習箱の境界の許容幅（正規化座標）
+
+
+def card_from_dict(name: str, device_type: str, params: Dict[str, float]) -> ModelCard:
+    """NMOS_BASE のような {"VTH0": 0.4, ...} から ModelCard を作る（level=54 を補う）。"""
+    values = {"level": 54.0}
+    values.update({k.lower(): float(v) for k, v in params.items()})
+    return ModelCard(name=name, device_type=device_type.lower(), params=values)
+
+
+def feature_sweeps(
+    device_type: str, L: float, W: float, vdd: float = VDD, temp_c: float = 25.0
+) -> List[Measurement]:
+    """特徴量抽出に使う 2 本の掃引（Id–Vg @ Vds = 0.05 V、Id–Vd @ Vgs = VDD）。PMOS は負のバイアス。"""
+    sign = 1.0 if device_type.lower() == "nmos" else -1.0
+    vg = sign * np.round(np.arange(0.0, vdd + VG_STEP / 2, VG_STEP), 6)
+    vd = sign * np.round(np.arange(0.0, vdd + VD_STEP / 2, VD_STEP), 6)
+    common = dict(L=float(L), W=float(W), temperature=float(temp_c) + 273.15)
+    return [
+        Measurement(kind="idvg", x=vg, id=np.zeros_like(vg), bias=sign * VDS_LIN, name="idvg", **common),
+        Measurement(kind="idvd", x=vd, id=np.zeros_like(vd), bias=sign * vdd, name="idvd", **common),
+    ]
+
+
+def extract_features(curves: Sequence[np.ndarray], sweeps: Sequence[Measurement]) -> np.ndarray:
+    """
+    simulate() の結果（feature_sweeps の順）から (P, len(FEATURES)) の特徴量を出す。
+    抽出手順は run_vg_dim.extract_vth / run_vd_dim.extract_params と同じ（|Id| で評価）。
+    Id_lin は |Vds| が V_LIN_TARGET に最も近い点（PMOS も同じ点を読む）。
+    """
+    vg_sweep, vd_sweep = sweeps
+    id_vg = np.abs(curves[0])
+    id_vd = np.abs(curves[1])
+    p = id_vg.shape[0]
+    rows = np.arange(p)
+
+    # Vth(gmmax): 掃引の 10 %〜90 % の範囲で |gm| 最大の点
+    vgs = vg_sweep.x
+    gm = np.gradient(id_vg, vgs, axis=1)
+    n = vgs.shape[0]
+    lo, hi = int(n * 0.1), int(n * 0.9)
+    if hi <= lo:
+        lo, hi = 0, n
+    idx = lo + np.argmax(np.nan_to_num(np.abs(gm[:, lo:hi]), nan=-1.0), axis=1)
+    vth = vgs[idx]
+    gmmax = gm[rows, idx]
+
+    # Id–Vd: 膝（|gds| 最大）、Id_lin、終端 5 点平均の Id_sat
+    vds = vd_sweep.x
+    gds = np.gradient(id_vd, vds, axis=1)
+    knee = np.argmax(np.nan_to_num(np.abs(gds), nan=-1.0), axis=1)
+    vdsat = vds[knee]
+    id_lin = id_vd[:, int(np.argmin(np.abs(np.abs(vds) - V_LIN_TARGET)))]
+    id_sat = np.mean(id_vd[:, -5:], axis=1)
+
+    out = np.stack([vth, gmmax, id_lin, id_sat, vdsat], axis=1)
+    out[np.isnan(id_vg).any(axis=1) | np.isnan(id_vd).any(axis=1)] = np.nan
+    return out
+
+
+def latin_hypercube(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """[0, 1]^dim のラテン超方格サンプル (n, dim)。"""
+    cut = (np.arange(n)[:, None] + rng.random((n, dim))) / n
+    for j in range(dim):
+        cut[:, j] = cut[rng.permutation(n), j]
+    return cut
+
+
+class _Poly2:
+    """2 次多項式の特徴ベクトル φ(z) = [1, z_i, z_i z_j (i <= j)]。"""
+
+    def __init__(self, dim: int):
+        pairs = list(combinations_with_replacement(range(dim), 2))
+        self.dim = dim
+        self.ii = np.array([a for a, _ in pairs], dtype=int)
+        self.jj = np.array([b for _, b in pairs], dtype=int)
+        self.size = 1 + dim + len(pairs)
+
+    def __call__(self, z: np.ndarray) -> np.ndarray:
+        """(Q, dim) → (Q, size)。"""
+        return np.concatenate([np.ones((z.shape[0], 1)), z, z[:, self.ii] * z[:, self.jj]], axis=1)
+
+
+def _to_target(y: np.ndarray) -> np.ndarray:
+    y = y.copy()
+    for f in LOG_FEATURES:
+        j = FEATURES.index(f)
+        y[:, j] = np.log10(np.abs(y[:, j]) + 1e-30)
+    return y
+
+
+@dataclass
+class Surrogate:
+    names: List[str]
+    card: ModelCard
+    span: float
+    coef: np.ndarray        # (M, F) 目的変数（log 変換後）の回帰係数
+    ainv: np.ndarray        # (M, M) (ΦᵀΦ + λI)⁻¹
+    s2: np.ndarray          # (F,) LOO 残差の 2 乗平均
+    signs: np.ndarray       # (F,) log で回帰した特徴量の符号（PMOS の gmmax は負）
+    conditions: Dict        # feature_sweeps の引数（L, W, vdd, temp_c）
+    n_train: int
+
+    def __post_init__(self):
+        self.space = ParamSpace.from_card(self.card, self.names)
+        self._poly = _Poly2(len(self.names))
+        self._log = np.array([f in LOG_FEATURES for f in FEATURES])
+        # ParamSpace.encode を列ごとのループなしで: shift は (v - start) / w、scale は ln(v / start) / ln(w)
+        modes = [BOUNDS[n] for n in self.names]
+        self._is_shift = np.array([m == "shift" for m, _ in modes])
+        self._width = np.array([w if m == "shift" else math.log(w) for m, w in modes])
+        # φᵀ A⁻¹ φ = |φ C|²（A⁻¹ = C Cᵀ）なので係数と C を横に並べて 1 回の行列積で済ませる
+        self._proj = np.concatenate([self.coef, np.linalg.cholesky(self.ainv)], axis=1)
+        self._nf = self.coef.shape[1]
+
+    # ---- 予測 ----
+    def _z(self, values: np.ndarray) -> np.ndarray:
+        start = self.space.start
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(self._is_shift, values - start, np.log(values / start)) / self._width
+        return t / (2.0 * self.span)
+
+    def predict(self, values) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        values: (Q, D) のパラメータ値（names の順）。
+        戻り値: (平均 (Q, F), 標準偏差 (Q, F), 学習範囲内か (Q,))。
+        log 特徴量の std は相対誤差（ln10 × σ_log10）を値に掛けた 1 次近似。
+        """
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        z = self._z(values)
+        inside = np.all(np.abs(z) <= 1.0 + INSIDE_TOL, axis=1)   # NaN（符号違いの scale 値）も範囲外
+        r = self._poly(z) @ self._proj
+        t = r[:, :self._nf]
+        q = np.sum(r[:, self._nf:] ** 2, axis=1, keepdims=True)
+        t_std = np.sqrt(self.s2 * (1.0 + q))
+
+        mean = np.where(self._log, self.signs * 10.0 ** t, t)
+        std = np.where(self._log, np.abs(mean) * math.log(10.0) * t_std, t_std)
+        return mean, std, inside
+
+    def query(self, params: Dict[str, float], simulator=None) -> Dict:
+        """
+        1 点の問い合わせ。params に無い名前はベースカードの値。
+        戻り値: {特徴量: (値, 標準偏差), "source": "surrogate" | "sim" | "extrapolated"}
+        """
+        values = self.values_from(params)
+        mean, std, source = self.query_batch(values[None, :], simulator)
+        out = {f: (float(mean[0, j]), float(std[0, j])) for j, f in enumerate(FEATURES)}
+        out["source"] = source[0]
+        return out
+
+    def query_batch(self, values, simulator=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (Q, D) の一括問い合わせ。学習範囲外の行は simulator があればまとめて実評価する。
+        戻り値の 3 つ目は行ごとの "surrogate" / "sim" / "extrapolated"。
+        """
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        mean, std, inside = self.predict(values)
+        source = np.where(inside, "surrogate", "extrapolated").astype(object)
+        outside = np.flatnonzero(~inside)
+        if simulator is not None and outside.size:
+            curves = simulator.simulate(self.names, values[outside])
+            mean[outside] = extract_features(curves, simulator.measurements)
+            std[outside] = 0.0
+            source[outside] = "sim"
+        return mean, std, source
+
+    def values_from(self, params: Dict[str, float]) -> np.ndarray:
+        upper = {k.upper(): float(v) for k, v in params.items()}
+        unknown = set(upper) - set(self.names)
+        if unknown:
+            raise ValueError(f"surrogate has no input {sorted(unknown)} (inputs: {self.names})")
+        return np.array([upper.get(n, s) for n, s in zip(self.names, self.space.start)])
+
+    def simulator(self, backend: str = "dc", **kwargs):
+        """学習時と同じ掃引条件の評価器を作り直す（フォールバック用）。"""
+        sweeps = feature_sweeps(self.card.device_type, **self.conditions)
+        if backend == "ngspice":
+            return NgspiceEvaluator(self.card, sweeps, **kwargs)
+        return DcModelEvaluator(self.card, sweeps)
+
+    # ---- 保存 ----
+    def save(self, path) -> None:
+        meta = {
+            "names": self.names, "span": self.span, "conditions": self.conditions,
+            "n_train": self.n_train, "card": format_card(self.card),
+        }
+        np.savez(
+            path, coef=self.coef, ainv=self.ainv, s2=self.s2, signs=self.signs,
+            meta=np.array(json.dumps(meta)),
+        )
+
+    @classmethod
+    def load(cls, path) -> "Surrogate":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {k: data[k] for k in ("coef", "ainv", "s2", "signs")}
+        card = parse_lines(meta["card"].splitlines(), source=str(path))[0]
+        return cls(
+            names=meta["names"], card=card, span=meta["span"], conditions=meta["conditions"],
+            n_train=meta["n_train"], **arrays,
+        )
+
+
+@dataclass
+class SurrogateReport:
+    n_samples: int
+    n_failed: int
+    loo_rms: Dict[str, float]     # 特徴量ごとの LOO 残差 RMS（log 特徴量は decade）
+    seconds_sim: float
+    seconds_fit: float
+
+
+def train_surrogate(
+    card: ModelCard,
+    names: Sequence[str],
+    simulator,
+    n_samples: int = 256,
+    span: float = 0.25,
+    seed: int = 0,
+    ridge: float = 1e-6,
+) -> Tuple[Surrogate, SurrogateReport]:
+    """
+    card の周り（正規化座標 0.5 ± span）で n_samples 点を simulator.simulate に一括で渡し、
+    特徴量への 2 次多項式を当てる。simulator は feature_sweeps の掃引で作った
+    DcModelEvaluator / NgspiceEvaluator（conditions は simulator.measurements から読む）。
+    """
+    space = ParamSpace.from_card(card, names)
+    poly = _Poly2(len(space.names))
+    if n_samples < poly.size + 2:
+        raise ValueError(f"n_samples must be >= {poly.size + 2} for {len(space.names)} inputs")
+
+    rng = np.random.default_rng(seed)
+    z = 2.0 * latin_hypercube(n_samples, len(space.names), rng) - 1.0
+    values = space.decode(0.5 + span * z)
+
+    t0 = time.perf_counter()
+    y = extract_features(simulator.simulate(space.names, values), simulator.measurements)
+    t1 = time.perf_counter()
+
+    ok = np.all(np.isfinite(y), axis=1)
+    z, y = z[ok], y[ok]
+    signs = np.where(np.median(y, axis=0) < 0, -1.0, 1.0)
+    t = _to_target(y)
+
+    phi = poly(z)
+    ainv = np.linalg.inv(phi.T @ phi + ridge * np.eye(poly.size))
+    coef = ainv @ phi.T @ t
+    resid = t - phi @ coef
+    h = np.einsum("nm,mk,nk->n", phi, ainv, phi)
+    loo = resid / (1.0 - np.minimum(h, 0.999))[:, None]
+    s2 = np.mean(loo * loo, axis=0)
+    t2 = time.perf_counter()
+
+    m = simulator.measurements[0]
+    conditions = {
+        "L": m.L, "W": m.W, "vdd": float(np.max(np.abs(simulator.measurements[1].x))),
+        "temp_c": m.temperature - 273.15,
+    }
+    sur = Surrogate(
+        names=list(space.names), card=card, span=span, coef=coef, ainv=ainv, s2=s2,
+        signs=signs, conditions=conditions, n_train=int(ok.sum()),
+    )
+    report = SurrogateReport(
+        n_samples=n_samples, n_failed=int((~ok).sum()),
+        loo_rms={f: float(math.sqrt(v)) for f, v in zip(FEATURES, s2)},
+        seconds_sim=t1 - t0, seconds_fit=t2 - t1,
+    )
+    return sur, report
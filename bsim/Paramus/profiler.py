@@ -0,0 +1,71 @@
+"""
+profiler.py
+-----------
+
+paramus.py --profile 用の段ごとの計測。各段の壁時計時間と、その段の中での
+Python ヒープのピーク増分（tracemalloc）を記録し、JSON にできる dict で返す。
+
+    prof = StageProfiler()
+    with prof.stage("run_poisson"):
+        pois = run_poisson(phys)
+    prof.report()
+    # {"stages": [{"stage": "run_poisson", "wall_ms": 0.02, "peak_kib": 1.3}], ...}
+
+tracemalloc 自体が処理を遅くするので、--profile を付けたときだけ使う。
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+
+
+class StageProfiler:
+    def __init__(self):
+        self.stages: List[Dict] = []
+        self._started_here = False
+
+    @contextmanager
+    def stage(self, name: str):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_here = True
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            self.stages.append({
+                "stage": name,
+                "wall_ms": wall * 1e3,
+                "peak_kib": max(peak - base, 0) / 1024.0,
+            })
+
+    def report(self) -> Dict:
+        out = {
+            "stages": list(self.stages),
+            "total_ms": sum(s["wall_ms"] for s in self.stages),
+            "peak_kib": max((s["peak_kib"] for s in self.stages), default=0.0),
+        }
+        try:
+            import resource
+
+            # ru_maxrss は Linux では KiB、macOS では byte
+            out["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:  # Windows
+            pass
+        return out
+
+    def stop(self) -> None:
+        if self._started_here:
+            tracemalloc.stop()
+            self._started_here = False
+
+
+def stage_of(profiler):
+    """profiler が None なら何もしないコンテキストを返す関数を返す。"""
+    if profiler is None:
+        return lambda name: nullcontext()
+    return profiler.stage
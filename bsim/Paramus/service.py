@@ -0,0 +1,213 @@
+"""
+service.py
+----------
+
+Paramus 常駐サービス。インタプリタ起動・NumPy import・プリセット読み込み・
+テンプレート解析を 1 回だけ行い、以降は JSON-lines でモデルカード要求に答える。
+
+起動:
+    python service.py                          # stdin / stdout
+    python service.py --socket /tmp/paramus.sock   # Unix ドメインソケット
+
+要求（1 行 1 JSON。キーは paramus.py の CLI オプションと同じ）:
+    {"id": 1, "node": "130nm", "type": "nmos", "tox": 2.1e-9, "out": "model.sp"}
+    {"id": 2, "op": "stats"}
+    {"id": 3, "op": "ping"}
+    {"op": "shutdown"}
+
+応答:
+    {"id": 1, "ok": true, "params": {...}, "text": "* Paramus ...", "out": "model.sp"}
+    {"id": 9, "ok": false, "error": "..."}
+
+要求はスレッドプールで処理し、完了した順に応答する（id で対応付ける）ので、
+クライアントは応答を待たずに複数の要求をパイプラインで送ってよい。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from paramus import load_preset, override_physical_params, generate_card
+from modelcard.cache import cache_key, pipeline_extra
+
+
+OVERRIDE_KEYS = ("tox", "na", "vfb", "u0", "L", "W")
+
+
+class ParamusService:
+    """要求 dict → 応答 dict。結果はメモリ上の LRU に保持する。"""
+
+    def __init__(self, memo_size: int = 4096):
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hits = 0
+        self.shutdown_requested = threading.Event()
+
+    def _card(
+        self, phys: Dict, temperature: float, poisson: str = "analytic", extraction: str = "curves"
+    ):
+        key = cache_key(phys, temperature, pipeline_extra(poisson=poisson, extraction=extraction))
+        with self._lock:
+            hit = self._memo.get(key)
+            if hit is not None:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return hit
+
+        result = generate_card(phys, temperature, poisson=poisson, extraction=extraction)
+        with self._lock:
+            self._memo[key] = result
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return result
+
+    def handle(self, req: Dict) -> Dict:
+        rid = req.get("id")
+        op = req.get("op", "card")
+        try:
+            if op == "ping":
+                return {"id": rid, "ok": True}
+            if op == "stats":
+                return {"id": rid, "ok": True, "stats": self.stats()}
+            if op == "shutdown":
+                self.shutdown_requested.set()
+                return {"id": rid, "ok": True}
+            if op != "card":
+                raise ValueError(f"unknown op: {op}")
+
+            with self._lock:
+                self.requests += 1
+            dev_type = req.get("type", "nmos")
+            preset = load_preset(req.get("node", "130nm"), dev_type)
+            args = argparse.Namespace(**{k: req.get(k) for k in OVERRIDE_KEYS})
+            phys = override_physical_params(preset, args)
+            phys.setdefault("device_type", dev_type)
+
+            params, text = self._card(
+                phys,
+                float(req.get("temperature", 300.0)),
+                req.get("poisson", "analytic"),
+                req.get("extraction", "curves"),
+            )
+            resp = {"id": rid, "ok": True, "params": params}
+            if req.get("out"):
+                Path(req["out"]).write_text(text, encoding="utf-8")
+                resp["out"] = req["out"]
+            else:
+                resp["text"] = text
+            return resp
+        except Exception as e:  # 1 要求の失敗でサービスは止めない
+            return {"id": rid, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "memo_hits": self.hits,
+                "memo_entries": len(self._memo),
+            }
+
+
+def _serve_lines(
+    service: ParamusService,
+    lines,
+    write: Callable[[str], None],
+    pool: ThreadPoolExecutor,
+) -> None:
+    """
+    行の列を読み、各要求をプールに投げて完了順に write する。
+    shutdown はプールに投げずにこのループで処理する（応答してから読むのをやめる）。
+    """
+    write_lock = threading.Lock()
+
+    def reply(resp: Dict) -> None:
+        out = json.dumps(resp) + "\n"
+        with write_lock:
+            write(out)
+
+    for line in lines:
+        if service.shutdown_requested.is_set():
+            break   # 別の接続で shutdown 済み
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            reply({"id": None, "ok": False, "error": f"invalid JSON: {e}"})
+            continue
+        if isinstance(req, dict) and req.get("op") == "shutdown":
+            reply(service.handle(req))
+            break
+        pool.submit(service.handle, req).add_done_callback(lambda fut: reply(fut.result()))
+
+
+def serve_stdio(service: ParamusService, workers: int) -> None:
+    def write(s: str) -> None:
+        sys.stdout.write(s)
+        sys.stdout.flush()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        _serve_lines(service, sys.stdin, write, pool)
+
+
+def serve_socket(service: ParamusService, path: str, workers: int) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            sock_lock = threading.Lock()
+
+            def write(s: str) -> None:
+                with sock_lock:
+                    self.wfile.write(s.encode("utf-8"))
+                    self.wfile.flush()
+
+            lines = (raw.decode("utf-8") for raw in self.rfile)
+            _serve_lines(service, lines, write, pool)
+            if service.shutdown_requested.is_set():
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        print(f"[Paramus] service listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            pool.shutdown(wait=True)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def main(argv: Optional[list] = None) -> None:
+    ap = argparse.ArgumentParser(description="Paramus resident service (JSON-lines)")
+    ap.add_argument("--socket", type=str, help="listen on a Unix domain socket instead of stdin")
+    ap.add_argument("--workers", type=int, default=4, help="request worker threads")
+    ap.add_argument("--memo", type=int, default=4096, help="in-memory result LRU size")
+    args = ap.parse_args(argv)
+
+    service = ParamusService(memo_size=args.memo)
+    # 初回要求の前にプリセット・テンプレートを温めておく
+    service.handle({"node": "130nm", "type": "nmos"})
+    service.requests = 0
+
+    if args.socket:
+        serve_socket(service, args.socket, args.workers)
+    else:
+        serve_stdio(service, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+surrogate.py
+------------
+
+BSIM4 カード → dim アナライザ特徴量（Vth_gmmax, gmmax, Id_lin, Id_sat, Vdsat_approx）の代理モデル。
+
+    python surrogate.py train --card ../bsim4_analyzer_dim/models/130nm_nmos_l013.sp \\
+        --L 0.13e-6 --W 1e-6 --samples 256 --backend ngspice --jobs 16 --out nmos_l013.npz
+    python surrogate.py query nmos_l013.npz VTH0=0.25 U0=0.015         # 数十 µs、± は予測標準偏差
+    python surrogate.py query nmos_l013.npz VTH0=0.9 --fallback ngspice  # 学習範囲外は実シミュレーション
+
+学習範囲は fitting.BOUNDS で正規化した座標の 0.5 ± --span（既定 0.25）。
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))   # bsim/（共通の ngspice_tools）
+from modelcard.parse import parse_file
+from physical.fitting import DcModelEvaluator, NgspiceEvaluator
+from physical.surrogate import (
+    DEFAULT_SURROGATE_PARAMS, FEATURES, Surrogate, feature_sweeps, train_surrogate,
+)
+
+
+def _train(args) -> None:
+    cards = parse_file(args.card)
+    if args.model:
+        cards = [c for c in cards if c.name == args.model]
+    if not cards:
+        raise SystemExit(f"no .model card {args.model or ''} in {args.card}")
+    card = cards[0]
+
+    sweeps = feature_sweeps(card.device_type, args.L, args.W, args.vdd, args.temp)
+    if args.backend == "ngspice":
+        kwargs = {"jobs": args.jobs} if args.jobs else {}
+        sim = NgspiceEvaluator(card, sweeps, **kwargs)
+    else:
+        sim = DcModelEvaluator(card, sweeps)
+
+    names = [n.strip().upper() for n in args.params.split(",") if n.strip()]
+    try:
+        sur, report = train_surrogate(card, names, sim, args.samples, args.span, args.seed)
+    finally:
+        if hasattr(sim, "close"):
+            sim.close()
+    sur.save(args.out)
+
+    print(f"[surrogate] {report.n_samples} samples ({report.n_failed} failed), "
+          f"simulate {report.seconds_sim:.2f} s, fit {report.seconds_fit * 1e3:.1f} ms")
+    for name, rms in report.loo_rms.items():
+        unit = "dec" if name in ("gmmax", "Id_lin", "Id_sat") else "V"
+        print(f"[surrogate]   LOO rms {name:<13s} {rms:.3g} {unit}")
+    print(f"[surrogate] -> {args.out}")
+
+
+def _query(args) -> None:
+    sur = Surrogate.load(args.model_file)
+    params = {}
+    for item in args.params:
+        key, _, value = item.partition("=")
+        params[key] = float(value)
+
+    sim = sur.simulator(args.fallback, **({"jobs": 1} if args.fallback == "ngspice" else {})) if args.fallback else None
+    try:
+        t0 = time.perf_counter()
+        out = sur.query(params, simulator=sim)
+        elapsed = time.perf_counter() - t0
+    finally:
+        if sim is not None and hasattr(sim, "close"):
+            sim.close()
+
+    for name in FEATURES:
+        value, std = out[name]
+        print(f"{name:<13s} {value: .6g}  ± {std:.3g}")
+    print(f"[surrogate] source = {out['source']} ({elapsed * 1e6:.0f} us)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Surrogate model: BSIM4 card parameters -> I-V features")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    tr = sub.add_parser("train", help="sample around a card, simulate, and fit the surrogate")
+    tr.add_argument("--card", type=str, required=True, help="SPICE file with the base .model card")
+    tr.add_argument("--model", type=str, help="model name in --card (default: first card)")
+    tr.add_argument("--L", type=float, required=True, help="channel length [m]")
+    tr.add_argument("--W", type=float, required=True, help="channel width [m]")
+    tr.add_argument("--vdd", type=float, default=1.2)
+    tr.add_argument("--temp", type=float, default=25.0, help="temperature [degC]")
+    tr.add_argument("--params", type=str, default=",".join(DEFAULT_SURROGATE_PARAMS),
+                    help="comma separated surrogate inputs")
+    tr.add_argument("--samples", type=int, default=256)
+    tr.add_argument("--span", type=float, default=0.25, help="half width of the trained box (normalized, <= 0.5)")
+    tr.add_argument("--backend", type=str, default="dc", choices=["dc", "ngspice"])
+    tr.add_argument("--jobs", type=int, default=None, help="ngspice worker threads (default: CPU count)")
+    tr.add_argument("--seed", type=int, default=0)
+    tr.add_argument("--out", type=str, default="surrogate.npz")
+    tr.set_defaults(func=_train)
+
+    qu = sub.add_parser("query", help="predict features for NAME=VALUE overrides")
+    qu.add_argument("model_file", type=str)
+    qu.add_argument("params", nargs="*", help="NAME=VALUE (unspecified inputs use the base card)")
+    qu.add_argument("--fallback", type=str, choices=["dc", "ngspice"],
+                    help="simulate instead when the point is outside the trained region")
+    qu.set_defaults(func=_query)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
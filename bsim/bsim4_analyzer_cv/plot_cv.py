@@ -4,6 +4,8 @@ plot_cv.py
 
 results/<node>/ 以下の *.log を走査し、
 Cgg–Vg カーブのみを抽出して PNG を出力する。
+同じ名前の .raw（run_cv.py が ngspice -r で書くバイナリ rawfile）があれば、
+.log の表を解析する代わりにそちらを memmap で読む。
 
 出力:
     results/<node>/<same_basename>.png
@@ -12,11 +14,15 @@ Cgg–Vg カーブのみを抽出して PNG を出力する。
 
 from __future__ import annotations
 
+import sys
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import load_raw
+
 
 ROOT = Path(__file__).resolve().parent
 RESULTS = ROOT / "results"
@@ -88,8 +94,22 @@ def parse_cgg_from_log(log_path: Path) -> Tuple[List[float], List[float]]:
     return vg_list, cgg_list
 
 
+def parse_cgg_from_raw(raw_path: Path) -> Tuple[Sequence[float], Sequence[float]]:
+    plot = load_raw(raw_path)
+    # v(g)（run_cv.py --merged のデッキでは v(g1) / v(g2)）
+    vg_name = next((n for n in plot.names if n.lower().startswith("v(")), None)
+    cgg_name = next((n for n in plot.names if "cgg" in n.lower()), None)
+    if vg_name is None or cgg_name is None:
+        raise RuntimeError(f"Gate voltage or Cgg vector not found in {raw_path}")
+    return plot[vg_name], plot[cgg_name]
+
+
 def plot_one(log_path: Path) -> Path:
-    vg, cgg = parse_cgg_from_log(log_path)
+    raw_path = log_path.with_suffix(".raw")
+    if raw_path.exists():
+        vg, cgg = parse_cgg_from_raw(raw_path)
+    else:
+        vg, cgg = parse_cgg_from_log(log_path)
 
     # -----------------------------------------------------
     # ★ 不正な点の除外処理（重要）
@@ -141,6 +161,8 @@ def main() -> None:
         if not node_dir.is_dir():
             continue
         for log_path in sorted(node_dir.glob("*.log")):
+            if log_path.stem.endswith("_corners"):
+                continue   # run_cv.py --merged のまとめたログ（条件ごとの .log に切り分け済み）
             try:
                 plot_one(log_path)
             except Exception as e:
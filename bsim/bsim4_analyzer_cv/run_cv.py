@@ -12,14 +12,21 @@ results/<node>/ 以下に出力する。
         nmos_<node>_<TEMP>.log
         pmos_<node>_<TEMP>.cir
         pmos_<node>_<TEMP>.log
+        pmos_<node>_<TEMP>.raw   （ngspice -r のバイナリ rawfile。plot_cv.py はこちらを優先）
 など
+
+--merged なら条件ごとの .cir に加えて <node>_corners.cir を 1 回だけ実行し、
+ログを条件ごとの .log に切り分け、.raw は .control の write で条件ごとに書く。
 """
 
 from __future__ import annotations
 
-import subprocess
+import sys
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import NgspiceJob, NgspiceScheduler, corner_marker, resolve_ngspice, split_corners
 
 
 # ------------------------------------------------------------
@@ -31,8 +38,8 @@ TEMPLATE = ROOT / "template_cv.cir"
 MODELS = ROOT / "models"
 RESULTS = ROOT / "results"
 
-# ngspice 実行ファイル
-NGSPICE_CMD = r"C:\Program Files\Spice64\bin\ngspice.exe"
+# ngspice 実行ファイル（環境変数 NGSPICE があればそちら）
+NGSPICE_CMD = resolve_ngspice(r"C:\Program Files\Spice64\bin\ngspice.exe")
 
 
 # ------------------------------------------------------------
@@ -70,31 +77,34 @@ VG_STEP_PMOS = -0.01     # -方向 (PMOS)
 # Netlist 生成
 # ------------------------------------------------------------
 
-def generate_netlist(
-    node: str,
-    device: str,
-    temp_label: str,
-) -> Path:
+def device_sweep(node: str, device: str) -> tuple:
+    """(model_file, model_name, vg_start, vg_stop, vg_step)"""
     cfg = NODES[node]
     vdd = float(cfg["vdd"])
-    temp_value = TEMPS[temp_label]
 
     # NMOS / PMOS のスイープ方向
     if device == "nmos":
-        model_file = cfg["nmos_model_file"]
-        model_name = cfg["nmos_model_name"]
-        vg_start = 0.0
-        vg_stop = vdd
-        vg_step = VG_STEP_DEFAULT
+        return cfg["nmos_model_file"], cfg["nmos_model_name"], 0.0, vdd, VG_STEP_DEFAULT
     elif device == "pmos":
-        model_file = cfg["pmos_model_file"]
-        model_name = cfg["pmos_model_name"]
-        vg_start = vdd
-        vg_stop = 0.0
-        vg_step = VG_STEP_PMOS     # ★ 必須修正
+        return cfg["pmos_model_file"], cfg["pmos_model_name"], vdd, 0.0, VG_STEP_PMOS   # ★ 必須修正
     else:
         raise ValueError(f"Unknown device type: {device}")
 
+
+def generate_netlist(
+    node: str,
+    device: str,
+    temp_label: str,
+    lib_section: str | None = None,
+) -> Path:
+    """
+    lib_section を指定すると、NODES の "corner_lib"（Paramus --corners で作った
+    セクション付き .lib）から .lib "<file>" <lib_section> で該当コーナーを読む。
+    """
+    cfg = NODES[node]
+    temp_value = TEMPS[temp_label]
+    model_file, model_name, vg_start, vg_stop, vg_step = device_sweep(node, device)
+
     # 出力先フォルダ
     node_dir = RESULTS / node
     node_dir.mkdir(parents=True, exist_ok=True)
@@ -123,6 +133,10 @@ def generate_netlist(
         "VG_STEP": vg_step,
     }
 
+    if lib_section:
+        params["MODEL_FILE"] = f"models/{cfg['corner_lib']}"
+        text = text.replace('.include "{MODEL_FILE}"', '.lib "{MODEL_FILE}" ' + lib_section)
+
     # 埋め込み
     filled = text.format(**params)
     netlist_path.write_text(filled, encoding="utf-8")
@@ -131,46 +145,159 @@ def generate_netlist(
     return netlist_path
 
 
+def generate_merged_netlist(
+    node: str,
+    devices=("nmos", "pmos"),
+    temp_labels=tuple(TEMPS),
+    lib_section: str | None = None,
+) -> tuple:
+    """
+    devices × temp_labels の全条件を 1 本のデッキ results/<node>/<node>_corners.cir にまとめる。
+
+    デバイスごとに MOS を 1 個ずつ置き、.control で option temp を切り替えながら
+    条件ごとに dc → print → write する（print の表は .print と同じ "Index ..." 形式、
+    write は単独実行の -r と同じく条件ごとの .raw）。
+    条件ごとの .cir もいつも通り書き、(デッキ, 条件ごとの .cir のリスト) を返す。
+    """
+    cfg = NODES[node]
+    node_dir = RESULTS / node
+    node_dir.mkdir(parents=True, exist_ok=True)
+
+    netlists = [generate_netlist(node, d, t, lib_section) for d in devices for t in temp_labels]
+
+    includes = []
+    body = []
+    saves = []
+    control = []
+    for k, device in enumerate(devices, start=1):
+        model_file, model_name, vg_start, vg_stop, vg_step = device_sweep(node, device)
+        if lib_section:
+            line = f'.lib "models/{cfg["corner_lib"]}" {lib_section}'
+        else:
+            line = f'.include "models/{model_file}"'
+        if line not in includes:
+            includes.append(line)
+
+        body += [
+            f"* {device}: {model_name}",
+            f"Vx{k}   x{k}   0       0",
+            f"Vb{k}   b{k}   x{k}     {{VSB}}",
+            f"Vgdc{k} g{k}   x{k}     0",
+            f"M{k}   x{k}   g{k}   x{k}   b{k}   {model_name}  L=LCH  W=WCH",
+            "",
+        ]
+        cv = " ".join(f"@m{k}[{c}]" for c in ("cgg", "cgs", "cgd", "cgb"))
+        saves.append(f"v(g{k}) {cv}")
+        for temp_label in temp_labels:
+            label = f"{device}_{node}_{temp_label}"
+            control += [
+                "",
+                f"  {corner_marker(label)}",
+                f"  option temp={TEMPS[temp_label]}",
+                f"  dc Vgdc{k} {vg_start} {vg_stop} {vg_step}",
+                f"  print v(g{k}) {cv}",
+                f"  write {(node_dir / f'{label}.raw').as_posix()} v(g{k}) {cv}",
+            ]
+
+    deck_path = node_dir / f"{node}_corners.cir"
+    content = "\n".join(
+        [
+            "* ----------------------------------------------",
+            f"*  {node} C-V corners (merged): {', '.join(devices)} x {', '.join(temp_labels)}",
+            "* ----------------------------------------------",
+            "",
+            *includes,
+            "",
+            f".param LCH={cfg['lch']}",
+            f".param WCH={cfg['wch']}",
+            f".param TOXE={cfg['toxe']}",
+            f".param VSB={VSB_DEFAULT}",
+            "",
+            *body,
+            ".control",
+            f"  save {' '.join(saves)}",
+            "  set filetype=binary",
+            *control,
+            "",
+            "  quit",
+            ".endc",
+            "",
+            ".end",
+            "",
+        ]
+    )
+    deck_path.write_text(content, encoding="utf-8")
+
+    print(f"[GEN] {deck_path.relative_to(ROOT)} (merged)")
+    return deck_path, netlists
+
+
 # ------------------------------------------------------------
 # ngspice 実行
 # ------------------------------------------------------------
 
-def run_ngspice(netlist_path: Path) -> Path:
+def cv_job(netlist_path: Path, raw: bool = True, outputs=()) -> NgspiceJob:
     log_path = netlist_path.with_suffix(".log")
+    # ログは ngspice 自身が -o で書く
+    args = ["-o", str(log_path)]
+    if raw:
+        # 同じ C-V をバイナリ rawfile にも書く（前回の .raw は消しておく）
+        raw_path = netlist_path.with_suffix(".raw")
+        raw_path.unlink(missing_ok=True)
+        args += ["-r", str(raw_path)]
+    return NgspiceJob(netlist_path, args=tuple(args), outputs=list(outputs), label=netlist_path.stem)
+
+
+def report_result(result) -> Path:
+    log_path = result.job.netlist.with_suffix(".log")
+    if not result.ok:
+        print(f"[ERR] ngspice {result.error}: {result.job.netlist.name}")
+        print("----- stdout -----")
+        print(result.stdout)
+    else:
+        print(f"[OK ] log saved -> {log_path.relative_to(ROOT)}")
+    return log_path
 
-    cmd = [
-        NGSPICE_CMD,
-        "-b",
-        "-o",
-        str(log_path),
-        str(netlist_path),
-    ]
-    print(f"[RUN] {' '.join(cmd)}")
 
+def run_ngspice_many(netlists: List[Path]) -> List[Path]:
+    """netlist をまとめて並列実行する（NGSPICE_JOBS 本まで、結果は投入順）。"""
+    print(f"[RUN] {NGSPICE_CMD} -b × {len(netlists)} netlists")
+    scheduler = NgspiceScheduler(ngspice=NGSPICE_CMD)
     try:
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False,
-        )
+        return [report_result(r) for r in scheduler.imap(cv_job(n) for n in netlists)]
     except FileNotFoundError:
         raise SystemExit(
             "ngspice コマンドが見つかりません。\n"
-            "PATH または NGSPICE_CMD を確認してください。"
+            "PATH または NGSPICE_CMD（環境変数 NGSPICE）を確認してください。"
         )
 
-    if result.returncode != 0:
-        print(f"[ERR] ngspice exited with code {result.returncode}")
-        print("----- stdout -----")
-        print(result.stdout)
-        print("----- stderr -----")
-        print(result.stderr)
-    else:
-        print(f"[OK ] log saved -> {log_path.relative_to(ROOT)}")
 
-    return log_path
+def run_ngspice(netlist_path: Path) -> Path:
+    return run_ngspice_many([netlist_path])[0]
+
+
+def run_ngspice_merged(deck_path: Path, netlists: List[Path]) -> List[Path]:
+    """まとめたデッキを 1 回実行し、ログを netlists それぞれの .log に切り分ける。"""
+    print(f"[RUN] {NGSPICE_CMD} -b {deck_path.name} ({len(netlists)} corners)")
+    raws = [n.with_suffix(".raw") for n in netlists]
+    # 条件ごとの .raw はデッキの write が書く（前回の .raw は消し、無ければ失敗扱い）
+    for raw in raws:
+        raw.unlink(missing_ok=True)
+    job = cv_job(deck_path, raw=False, outputs=raws)
+    try:
+        result = NgspiceScheduler(ngspice=NGSPICE_CMD, jobs=1).run_one(job)
+    except FileNotFoundError:
+        raise SystemExit(
+            "ngspice コマンドが見つかりません。\n"
+            "PATH または NGSPICE_CMD（環境変数 NGSPICE）を確認してください。"
+        )
+    log_path = deck_path.with_suffix(".log")
+    text = log_path.read_text(encoding="utf-8", errors="ignore") if log_path.exists() else result.stdout
+    corner_jobs = [
+        NgspiceJob(n, log=n.with_suffix(".log"), outputs=[raw], label=n.stem)
+        for n, raw in zip(netlists, raws)
+    ]
+    return [report_result(r) for r in split_corners(result, corner_jobs, text=text)]
 
 
 # ------------------------------------------------------------
@@ -180,12 +307,22 @@ def run_ngspice(netlist_path: Path) -> Path:
 def main() -> None:
     RESULTS.mkdir(exist_ok=True)
 
+    if "--merged" in sys.argv[1:]:
+        # ノードごとに全条件を 1 本のデッキで実行
+        for node in NODES:
+            print(f"\n=== {node} / all corners (merged) ===")
+            run_ngspice_merged(*generate_merged_netlist(node))
+        return
+
+    netlists = []
     for node in NODES:
         for device in ("nmos", "pmos"):
             for temp_label in TEMPS:
                 print(f"\n=== {node} / {device.upper()} / {temp_label} ===")
-                netlist = generate_netlist(node, device, temp_label)
-                run_ngspice(netlist)
+                netlists.append(generate_netlist(node, device, temp_label))
+
+    # 全条件をまとめて並列実行
+    run_ngspice_many(netlists)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,14 @@
 from __future__ import annotations
 from pathlib import Path
-import subprocess
+import sys
 import numpy as np
 import csv
 
-# ngspice 実行ファイルへのパス
-NGSPICE_EXE = r"C:\Program Files\Spice64\bin\ngspice_con.exe"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import NgspiceJob, NgspiceScheduler, resolve_ngspice
+
+# ngspice 実行ファイルへのパス（環境変数 NGSPICE があればそちら）
+NGSPICE_EXE = resolve_ngspice(r"C:\Program Files\Spice64\bin\ngspice_con.exe")
 
 # Template 読み込み
 TEMPLATE = Path("templates/template_vdid.cir").read_text(encoding="utf-8")
@@ -45,9 +48,9 @@ def compute_Id_params(Vds: np.ndarray, Id: np.ndarray, device: str):
 
 
 # --------------------------
-#   VDID 実行
+#   VDID ネットリスト生成
 # --------------------------
-def run_vdid(
+def vdid_job(
     tech: str,
     device: str,
     temp_tag: str,
@@ -59,10 +62,11 @@ def run_vdid(
     vg_bias: float,
     vdd: float,
     raw_dir: Path,
-):
+    lib_section: str | None = None,   # Paramus のセクション付き .lib を使う場合（例: "TT_HT"）
+) -> NgspiceJob:
     """
-    指定条件で VDID（Vds–Id掃引）を実行し、
-    .cir / .dat / .csv / .log を出力する。
+    指定条件で VDID（Vds–Id掃引）の .cir を書き出し、ngspice ジョブを返す。
+    実行は NgspiceScheduler（まとめて並列）か run_vdid（1 条件）で行う。
     """
 
     raw_dir.mkdir(parents=True, exist_ok=True)
@@ -89,9 +93,14 @@ def run_vdid(
     bsim_path = raw_dir / f"{tech}_{device}_vdid_{temp_tag}_bsim4.out"
 
     # -------- テンプレート展開 --------
+    if lib_section:
+        include_line = f'.lib "{model_include}" {lib_section}'
+    else:
+        include_line = f'.include "{model_include}"'
+
     txt = (
         TEMPLATE
-        .replace("{{MODEL_INCLUDE}}", f'.include "{model_include}"')
+        .replace("{{MODEL_INCLUDE}}", include_line)
         .replace("{{MODEL_NAME}}", model_name)
         .replace("{{LCH}}", str(Lch))
         .replace("{{WCH}}", str(Wch))
@@ -106,16 +115,28 @@ def run_vdid(
     )
     cir_path.write_text(txt, encoding="utf-8")
 
-    # -------- ngspice 実行 --------
-    print(f"[VDID] Running ngspice → {cir_path}")
-    subprocess.run(
-        [NGSPICE_EXE, "-b", str(cir_path)],
-        stdout=open(log_path, "w", encoding="utf-8"),
-        stderr=subprocess.STDOUT,
+    print(f"[VDID] Queue ngspice → {cir_path}")
+    return NgspiceJob(
+        cir_path, log=log_path, outputs=[dat_path], label=cir_path.stem, meta={"device": device}
     )
 
-    if not dat_path.exists():
-        raise RuntimeError(f"ERROR: .dat not generated → {dat_path}")
+
+# --------------------------
+#   VDID 後処理
+# --------------------------
+def finish_vdid(result):
+    """
+    ngspice の結果（.dat）から Id_lin / Id_sat を抽出し、.csv を出力する。
+    """
+    cir_path = result.job.netlist
+    log_path = result.job.log
+    dat_path = result.job.outputs[0]
+    csv_path = cir_path.with_suffix(".csv")
+    bsim_path = cir_path.with_name(cir_path.stem + "_bsim4.out")
+    device = result.job.meta["device"]
+
+    if not result.ok:
+        raise RuntimeError(f"ERROR: .dat not generated → {dat_path} ({result.error})")
 
     # -------- .dat 読込 (Vds, Id) --------
     data = np.loadtxt(dat_path)
@@ -145,12 +166,24 @@ def run_vdid(
     }
 
 
+# --------------------------
+#   VDID 実行（1 条件）
+# --------------------------
+def run_vdid(*args, **kwargs):
+    """
+    指定条件で VDID（Vds–Id掃引）を実行し、
+    .cir / .dat / .csv / .log を出力する（引数は vdid_job と同じ）。
+    """
+    job = vdid_job(*args, **kwargs)
+    return finish_vdid(NgspiceScheduler(ngspice=NGSPICE_EXE, jobs=1).run_one(job))
+
+
 # --------------------------
 #   130nm 全温度・全デバイス
 # --------------------------
 def run_all_130nm(vgs_mag: float = 1.2, vdd: float = 1.2):
     base_dir = Path("results/130nm/vdid")
-    results = []
+    jobs = []
 
     for device in ("nmos", "pmos"):
 
@@ -164,7 +197,7 @@ def run_all_130nm(vgs_mag: float = 1.2, vdd: float = 1.2):
             vg = -vgs_mag
 
         for tag, temp in TEMP_TABLE.items():
-            out = run_vdid(
+            jobs.append(vdid_job(
                 tech="130nm",
                 device=device,
                 temp_tag=tag,
@@ -176,10 +209,11 @@ def run_all_130nm(vgs_mag: float = 1.2, vdd: float = 1.2):
                 vg_bias=vg,
                 vdd=vdd,
                 raw_dir=base_dir,
-            )
-            results.append(out)
+            ))
 
-    return results
+    # 全デバイス × 全温度をまとめて並列実行（結果は投入順）
+    scheduler = NgspiceScheduler(ngspice=NGSPICE_EXE)
+    return [finish_vdid(result) for result in scheduler.imap(jobs)]
 
 
 # --------------------------
@@ -1,14 +1,29 @@
 from __future__ import annotations
 from pathlib import Path
-import subprocess
+import sys
 import numpy as np
 import csv
 
-# ngspice 実行ファイルパス
-NGSPICE_EXE = r"C:\Program Files\Spice64\bin\ngspice_con.exe"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import (
+    NgspiceJob, NgspiceScheduler, collect_workdir, corner_marker, job_workdir, load_shared, resolve_ngspice,
+    split_corners,
+)
 
+# ngspice 実行ファイルパス（環境変数 NGSPICE があればそちら）
+NGSPICE_EXE = resolve_ngspice(r"C:\Program Files\Spice64\bin\ngspice_con.exe")
+# ジョブの作業ディレクトリから回収するファイル（キャッシュから書き戻すときも戻す）
+WORKFILES = ("bsim4.out", "sim.log")
 
-def run_vgid(
+
+def vgid_bias(device: str, vdd: float) -> tuple:
+    """(D, S, B, VG_START, VG_STOP, VG_STEP)。ゲートはソース基準で掃引する。"""
+    if device == "nmos":
+        return vdd, 0.0, 0.0, 0.0, vdd, 0.05
+    return 0.0, vdd, vdd, 0.0, -vdd, -0.05
+
+
+def vgid_job(
     model_include: str,
     model_name: str,
     tech: str,
@@ -19,7 +34,9 @@ def run_vgid(
     Wch: float,
     vdd: float,
     raw_dir: Path,
-) -> dict:
+    lib_section: str | None = None,   # Paramus のセクション付き .lib を使う場合（例: "TT_HT"）
+) -> NgspiceJob:
+    """ネットリストを書き出し、ngspice ジョブを返す（実行は NgspiceScheduler / run_vgid）。"""
 
     prefix = f"{tech}_{device}_vgid_{temp_tag}"
     raw_dir.mkdir(parents=True, exist_ok=True)
@@ -37,18 +54,18 @@ def run_vgid(
     #    のように VX(=Vgs), IY(=Id>0) を出すこと
     # -------------------------------------------------
     tpl = Path("templates/template_vgid.cir").read_text(encoding="utf-8")
-    include_str = model_include.replace("\\", "/")
+    # ngspice はジョブごとの作業ディレクトリで走るので、相対パスのモデルはここで絶対パスにする
+    include_str = str(Path(model_include).resolve()).replace("\\", "/")
+    if lib_section:
+        include_line = f'.lib "{include_str}" {lib_section}'
+    else:
+        include_line = f'.include "{include_str}"'
 
     # NMOS / PMOS のバイアス条件
-    if device == "nmos":
-        D, S, B = vdd, 0.0, 0.0
-        VG_START, VG_STOP, VG_STEP = 0.0, vdd, 0.05
-    else:
-        D, S, B = 0.0, vdd, vdd
-        VG_START, VG_STOP, VG_STEP = 0.0, -vdd, -0.05
+    D, S, B, VG_START, VG_STOP, VG_STEP = vgid_bias(device, vdd)
 
     content = (
-        tpl.replace("{{MODEL_INCLUDE}}", f'.include "{include_str}"')
+        tpl.replace("{{MODEL_INCLUDE}}", include_line)
            .replace("{{MODEL_NAME}}", model_name)
            .replace("{{TEMP}}", str(temp))
            .replace("{{LCH}}", str(Lch))
@@ -65,32 +82,130 @@ def run_vgid(
 
     cir_path.write_text(content, encoding="utf-8")
 
-    # -------------------------------------------------
-    #  ngspice 実行
-    # -------------------------------------------------
-    print(f"[VGID] Running ngspice → {cir_path}")
+    print(f"[VGID] Queue ngspice → {cir_path}")
+    # bsim4.out / sim.log が並列ジョブで混ざらないよう、ジョブごとの作業ディレクトリで走らせる。
+    # libngspice で解くとき用にデバイスとネットリスト本文を持たせておく
+    return NgspiceJob(
+        cir_path, cwd=job_workdir(cir_path), log=log_path, outputs=[dat_path], label=prefix,
+        workfiles=WORKFILES,
+        meta={"device": device, "netlist": content},
+    )
+
 
-    result = subprocess.run(
-        [NGSPICE_EXE, "-b", str(cir_path)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
+def vgid_corners_job(corners: list, deck_path: Path) -> tuple:
+    """
+    vgid_job の引数 dict を並べた corners（NMOS / PMOS × LT / RT / HT など）を
+    1 本のデッキ deck_path にまとめる。ngspice の起動とモデル読み込みは 1 回で済む。
+
+    デバイス（モデル・L / W・バイアスの組）ごとにトランジスタと電源を 1 組置き、
+    .control で温度（option temp）を切り替えながらコーナーごとに dc → wrdata する。
+    各コーナーの .cir（単独で再実行できるもの）はいつも通り書く。
+
+    戻り値は (まとめたジョブ, コーナーごとのジョブ)。実行結果を
+    split_corners(result, corner_jobs) で切り分ければ、各要素を finish_vgid に渡せる。
+
+    同じモデル名を別のファイル・別の .lib セクションから読むコーナーは 1 本のデッキに
+    入れられない（.model が重複する）ので ValueError にする。run_corner_jobs は
+    その場合コーナーごとのデッキに戻す。
+    """
+    include_lines = []
+    models: dict = {}
+    for c in corners:
+        include_str = c["model_include"].replace("\\", "/")
+        section = c.get("lib_section")
+        include_line = f'.lib "{include_str}" {section}' if section else f'.include "{include_str}"'
+        first = models.setdefault(c["model_name"], include_line)
+        if first != include_line:
+            raise ValueError(
+                f"model {c['model_name']} comes from both [{first}] and [{include_line}]; "
+                "these corners cannot share one deck"
+            )
+        include_lines.append(include_line)
+
+    corner_jobs = [vgid_job(**c) for c in corners]
+    includes = list(dict.fromkeys(include_lines))
+    devices: dict = {}
+    body: list = []
+    control = ["  set filetype=ascii"]
+    for c, job, include_line in zip(corners, corner_jobs, include_lines):
+        D, S, B, VG_START, VG_STOP, VG_STEP = vgid_bias(c["device"], c["vdd"])
+        key = (include_line, c["model_name"], c["device"], c["Lch"], c["Wch"], c["vdd"])
+        if key not in devices:
+            k = devices[key] = len(devices) + 1
+            body += [
+                f"* device {k}: {c['model_name']} ({c['device']})",
+                f"Vd{k}  d{k}  0   {D}",
+                f"Vs{k}  s{k}  0   {S}",
+                f"Vb{k}  b{k}  0   {B}",
+                f"Vg{k}  g{k}  s{k} 0",
+                f"M{k} d{k} g{k} s{k} b{k} {c['model_name']} L={c['Lch']} W={c['Wch']}",
+                "",
+            ]
+        k = devices[key]
+        # Id の正方向は単独デッキと同じ（NMOS: -i(Vd), PMOS: i(Vs)）
+        iy = f"-i(Vd{k})" if c["device"] == "nmos" else f"i(Vs{k})"
+        control += [
+            "",
+            f"  {corner_marker(job.label)}",
+            f"  option temp={c['temp']}",
+            f"  dc Vg{k} {VG_START} {VG_STOP} {VG_STEP}",
+            f"  let VX = v(g{k}) - v(s{k})",
+            f"  let IY = {iy}",
+            f"  wrdata {job.outputs[0].as_posix()} VX IY",
+        ]
+
+    deck_path = Path(deck_path).resolve()
+    deck_path.parent.mkdir(parents=True, exist_ok=True)
+    content = "\n".join(
+        [
+            "* ============================================================",
+            f"*  VGID corners (merged): {len(corner_jobs)} corners, {len(devices)} devices",
+            "* ============================================================",
+            "",
+            *includes,
+            "",
+            *body,
+            ".options post=2 nomod",
+            "",
+            ".control",
+            *control,
+            "",
+            "  quit",
+            ".endc",
+            "",
+            ".end",
+            "",
+        ]
     )
+    deck_path.write_text(content, encoding="utf-8")
 
-    # ログ保存
-    log_path.write_text(result.stdout)
+    print(f"[VGID] Queue ngspice (merged) → {deck_path}")
+    merged = NgspiceJob(
+        deck_path,
+        log=deck_path.with_suffix(".log"),
+        outputs=[p for j in corner_jobs for p in j.outputs],
+        label=deck_path.stem,
+    )
+    return merged, corner_jobs
+
+
+def finish_vgid(result) -> dict:
+    """ngspice の結果から Vth_gmmax / gmmax を抽出して summary CSV を書く。"""
+    cir_path = result.job.netlist
+    log_path = result.job.log
+    dat_path = result.job.outputs[0]
+    raw_dir = cir_path.parent
+    prefix = result.job.label
+    csv_path = raw_dir / f"{prefix}.csv"
+    out_path = raw_dir / f"{prefix}_bsim4.out"
 
-    # bsim4.out / sim.log が吐かれていればリネーム
-    tmp_bsim = raw_dir / "bsim4.out"
-    tmp_log = raw_dir / "sim.log"
-    if tmp_bsim.exists():
-        tmp_bsim.rename(out_path)
-    if tmp_log.exists():
-        tmp_log.rename(log_path)
+    # bsim4.out / sim.log が吐かれていればリネーム（ジョブ自身の作業ディレクトリのものだけ。
+    # まとめたデッキから切り分けたコーナーは作業ディレクトリが無いので何もしない）
+    collect_workdir(result.job.cwd, {"bsim4.out": out_path, "sim.log": log_path})
 
-    if result.returncode != 0:
+    if not result.ok:
         print("=== NGSPICE ERROR (VGID) ===")
-        raise RuntimeError(f"ngspice failed: {cir_path}")
+        result.raise_for_status()
 
     # -------------------------------------------------
     #  データ読み込み（Vgs, Id）
@@ -102,9 +217,21 @@ def run_vgid(
     if data.ndim == 1:
         data = data.reshape(1, -1)
 
-    Vgs = data[:, 0]
-    Id = data[:, 1]   # NMOS / PMOS とも Id > 0 になるように wrdata 側で調整済み
+    # wrdata は (スケール, VX, スケール, IY) の 4 列。Id は最後の列
+    # NMOS / PMOS とも Id > 0 になるように wrdata 側で調整済み
+    write_vgid_summary(data[:, 0], data[:, -1], csv_path)
 
+    return {
+        "dat": dat_path,
+        "csv": csv_path,
+        "cir": cir_path,
+        "log": log_path,
+        "bsim4": out_path,
+    }
+
+
+def write_vgid_summary(Vgs: np.ndarray, Id: np.ndarray, csv_path: Path) -> None:
+    """Vth_gmmax / gmmax を抽出して summary CSV を書く。"""
     # -------------------------------------------------
     #  パラメータ抽出
     # -------------------------------------------------
@@ -128,27 +255,82 @@ def run_vgid(
     with open(csv_path, "w", newline="") as f:
         csv.writer(f).writerows(rows)
 
+
+def run_vgid(*args, shared: bool = False, **kwargs) -> dict:
+    """
+    1 条件の VGID を実行する（引数は vgid_job と同じ）。
+    shared=True なら libngspice でプロセス内に解く（読み込めなければ ngspice -b に戻る）。
+    """
+    job = vgid_job(*args, **kwargs)
+    if shared:
+        ng = load_shared()
+        if ng is not None:
+            return finish_vgid_shared(job, ng)
+        print("[VGID] libngspice not found (set NGSPICE_LIBRARY) → ngspice -b")
+    return finish_vgid(NgspiceScheduler(ngspice=NGSPICE_EXE, jobs=1).run_one(job))
+
+
+def finish_vgid_shared(job: NgspiceJob, ng) -> dict:
+    """
+    vgid_job のネットリストを libngspice（ngspice_tools.SharedNgspice）で解き、
+    VX / IY のベクトルをそのまま抽出に渡す。.dat は書かず、ngspice の出力は .log に残す。
+    """
+    cir_path = job.netlist
+    csv_path = cir_path.parent / f"{job.label}.csv"
+    print(f"[VGID] libngspice → {cir_path}")
+    # Id の正方向は .control と同じ（NMOS: -i(Vd), PMOS: i(Vs)）
+    iy = "-i(Vd)" if job.meta["device"] == "nmos" else "i(Vs)"
+    try:
+        vec = ng.run(job.meta["netlist"], {"vx": "v(g) - v(s)", "iy": iy})
+    finally:
+        job.log.write_text("\n".join(ng.output) + "\n", encoding="utf-8")
+    write_vgid_summary(vec["vx"], vec["iy"], csv_path)
     return {
-        "dat": dat_path,
+        "dat": None,
         "csv": csv_path,
         "cir": cir_path,
-        "log": log_path,
-        "bsim4": out_path,
+        "log": job.log,
+        "bsim4": None,
     }
 
 
+def run_corner_jobs(corners: list, deck_path: Path) -> list:
+    """
+    corners を 1 回の ngspice でまとめて実行し、コーナーごとの JobResult を返す。
+    1 本のデッキにまとめられない（モデル名が重複する）ときはコーナーごとに並列実行する。
+    """
+    try:
+        merged, corner_jobs = vgid_corners_job(corners, deck_path)
+    except ValueError as e:
+        print(f"[VGID] {e} → per-corner decks")
+        return list(NgspiceScheduler(ngspice=NGSPICE_EXE).imap(vgid_job(**c) for c in corners))
+    result = NgspiceScheduler(ngspice=NGSPICE_EXE, jobs=1).run_one(merged)
+    return split_corners(result, corner_jobs)
+
+
+def run_vgid_corners(corners: list, deck_path: Path) -> list:
+    """run_corner_jobs の結果をコーナーごとに finish_vgid して返す。"""
+    return [finish_vgid(r) for r in run_corner_jobs(corners, deck_path)]
+
+
 # ======================================================
 # MAIN：NMOS / PMOS × LT / RT / HT すべて実行
+#   --merged で 6 条件を 1 本のデッキ（ngspice 1 回）にまとめる
+#   --shared で libngspice（NGSPICE_LIBRARY）を使い、プロセス内で順に解く
 # ======================================================
 if __name__ == "__main__":
+    merged = "--merged" in sys.argv[1:]
+    shared = load_shared() if "--shared" in sys.argv[1:] else None
+    if "--shared" in sys.argv[1:] and shared is None:
+        print("[VGID] libngspice not found (set NGSPICE_LIBRARY) → ngspice -b")
     tech = "130nm"
     temps = {"LT": -40.0, "RT": 25.0, "HT": 125.0}
 
+    corners = []
     for device in ["nmos", "pmos"]:
         for tag, T in temps.items():
             model = Path(f"models/{device}130.sp").resolve()
-            print(f"===== VGID RUN {device.upper()} {tag} =====")
-            out = run_vgid(
+            corners.append(dict(
                 model_include=str(model),
                 model_name=f"{device}130",
                 tech=tech,
@@ -159,5 +341,22 @@ if __name__ == "__main__":
                 Wch=1e-6,
                 vdd=1.2,
                 raw_dir=Path(f"results/{tech}/vgid"),
-            )
-            print(out)
+            ))
+
+    if shared is not None:
+        # ファイルを介さずにベクトルを受け取る（.dat は作らない）
+        for c in corners:
+            job = vgid_job(**c)
+            print(f"===== VGID {job.label} =====")
+            print(finish_vgid_shared(job, shared))
+    else:
+        if merged:
+            # 1 本のデッキにまとめ、結果をコーナーごとの .dat / .csv / .log に切り分ける
+            results = run_corner_jobs(corners, Path(f"results/{tech}/vgid/{tech}_vgid_corners.cir"))
+        else:
+            # 6 条件をまとめて並列実行（結果は投入順）
+            results = NgspiceScheduler(ngspice=NGSPICE_EXE).imap(vgid_job(**c) for c in corners)
+
+        for result in results:
+            print(f"===== VGID {result.job.label} =====")
+            print(finish_vgid(result))
@@ -1,14 +1,19 @@
 from __future__ import annotations
 from pathlib import Path
-import subprocess
+import sys
 import numpy as np
 import csv
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import NgspiceJob, NgspiceScheduler, collect_workdir, job_workdir, resolve_ngspice
+
 # ============================================================
 # 設定
 # ============================================================
 
-NGSPICE_EXE = r"C:\Program Files\Spice64\bin\ngspice_con.exe"
+NGSPICE_EXE = resolve_ngspice(r"C:\Program Files\Spice64\bin\ngspice_con.exe")
+# ジョブの作業ディレクトリから回収するファイル（キャッシュから書き戻すときも戻す）
+WORKFILES = ("bsim4.out", "sim.log")
 
 TECH = "130nm"
 TEMP_RT = 25.0
@@ -43,27 +48,39 @@ VD_STEP  = 0.02
 # ngspice 実行
 # ============================================================
 
-def run_ngspice(cir_path: Path, log_path: Path, out_dir: Path):
-    print(f"[VD] Running ngspice → {cir_path}")
-
-    result = subprocess.run(
-        [NGSPICE_EXE, "-b", str(cir_path)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
+def make_job(cir_path: Path, log_path: Path, dat_path: Path) -> NgspiceJob:
+    print(f"[VD] Queue ngspice → {cir_path}")
+    # bsim4.out / sim.log が並列ジョブで混ざらないよう、ジョブごとの作業ディレクトリで走らせる
+    return NgspiceJob(
+        cir_path, cwd=job_workdir(cir_path), log=log_path, outputs=[dat_path],
+        workfiles=WORKFILES,
     )
 
-    log_path.write_text(result.stdout, encoding="utf-8")
 
-    tmp_bsim = out_dir / "bsim4.out"
-    tmp_simlog = out_dir / "sim.log"
-    if tmp_bsim.exists():
-        tmp_bsim.rename(out_dir / (cir_path.stem + "_bsim4.out"))
-    if tmp_simlog.exists():
-        tmp_simlog.rename(log_path)
+def finish_job(result, out_dir: Path):
+    """bsim4.out / sim.log の整理と失敗チェック（結果は投入順に届く）。"""
+    cir_path = result.job.netlist
+    log_path = result.job.log
+
+    # ジョブ自身の作業ディレクトリに出たものだけを、そのネットリストの名前で回収する
+    collect_workdir(result.job.cwd, {
+        "bsim4.out": out_dir / (cir_path.stem + "_bsim4.out"),
+        "sim.log": log_path,
+    })
+
+    result.raise_for_status()
 
-    if result.returncode != 0:
-        raise RuntimeError(f"ngspice failed: {cir_path}")
+
+def run_tasks(tasks: list):
+    """
+    tasks: (NgspiceJob, out_dir, dat_path, csv_path) のリスト。
+    ngspice を並列に回し（NGSPICE_JOBS 本まで）、投入順に抽出まで行う。
+    """
+    scheduler = NgspiceScheduler(ngspice=NGSPICE_EXE)
+    results = scheduler.imap(job for job, _, _, _ in tasks)
+    for (job, out_dir, dat_path, csv_path), result in zip(tasks, results):
+        finish_job(result, out_dir)
+        extract_params(dat_path, csv_path)
 
 
 # ============================================================
@@ -148,7 +165,7 @@ def make_vd_cir(
            .replace("{{VD_START}}", str(VD_START_))
            .replace("{{VD_STOP}}", str(VD_STOP_))
            .replace("{{VD_STEP}}", str(VD_STEP_))
-           .replace("{{DAT_PATH}}", dat_path.as_posix())
+           .replace("{{DAT_PATH}}", dat_path.resolve().as_posix())   # cwd はジョブごとに違う
     )
     return cir
 
@@ -158,11 +175,13 @@ def make_vd_cir(
 #   ★ ファイル名を 130nm_nmos_l010.sp 形式に合わせて修正
 # ============================================================
 
-def sweep_L_vd():
+def l_tasks():
+    """L スイープのネットリストを書き出し、run_tasks に渡すタスクを返す。"""
     base = Path(".")
     template_path = base / "templates" / "template_vd_dim.cir"
     out_dir = base / "results" / TECH / "l_vd"
     out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = []
 
     for device in ["nmos", "pmos"]:
         for Lch in L_LIST:
@@ -195,8 +214,9 @@ def sweep_L_vd():
             )
             cir_path.write_text(cir_text, encoding="utf-8")
 
-            run_ngspice(cir_path, log_path, out_dir)
-            extract_params(dat_path, csv_path)
+            tasks.append((make_job(cir_path, log_path, dat_path), out_dir, dat_path, csv_path))
+
+    return tasks
 
 
 # ============================================================
@@ -204,11 +224,13 @@ def sweep_L_vd():
 #   ★ こちらも 130nm_nmos_w050.sp 形式に合わせて修正
 # ============================================================
 
-def sweep_W_vd():
+def w_tasks():
+    """W スイープのネットリストを書き出し、run_tasks に渡すタスクを返す。"""
     base = Path(".")
     template_path = base / "templates" / "template_vd_dim.cir"
     out_dir = base / "results" / TECH / "w_vd"
     out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = []
 
     for device in ["nmos", "pmos"]:
         for Wch in W_LIST:
@@ -242,8 +264,17 @@ def sweep_W_vd():
             )
             cir_path.write_text(cir_text, encoding="utf-8")
 
-            run_ngspice(cir_path, log_path, out_dir)
-            extract_params(dat_path, csv_path)
+            tasks.append((make_job(cir_path, log_path, dat_path), out_dir, dat_path, csv_path))
+
+    return tasks
+
+
+def sweep_L_vd():
+    run_tasks(l_tasks())
+
+
+def sweep_W_vd():
+    run_tasks(w_tasks())
 
 
 # ============================================================
@@ -251,10 +282,8 @@ def sweep_W_vd():
 # ============================================================
 
 if __name__ == "__main__":
-    print("===== VD Sweep : L-sweep (RT, 130nm) =====")
-    sweep_L_vd()
-
-    print("===== VD Sweep : W-sweep (RT, 130nm) =====")
-    sweep_W_vd()
+    # L / W スイープのネットリストを全部並べてから、まとめて並列実行
+    print("===== VD Sweep : L-sweep + W-sweep (RT, 130nm) =====")
+    run_tasks(l_tasks() + w_tasks())
 
     print("=== run_vd_dim.py DONE ===")
@@ -1,14 +1,21 @@
 from __future__ import annotations
 from pathlib import Path
-import subprocess
+import sys
 import numpy as np
 import csv
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import (
+    NgspiceJob, NgspiceScheduler, collect_workdir, job_workdir, load_shared, resolve_ngspice,
+)
+
 # ============================================================
 # 設定
 # ============================================================
 
-NGSPICE_EXE = r"C:\Program Files\Spice64\bin\ngspice_con.exe"
+NGSPICE_EXE = resolve_ngspice(r"C:\Program Files\Spice64\bin\ngspice_con.exe")
+# ジョブの作業ディレクトリから回収するファイル（キャッシュから書き戻すときも戻す）
+WORKFILES = ("bsim4.out", "sim.log")
 
 TECH = "130nm"
 TEMP_RT = 25.0
@@ -39,29 +46,63 @@ L_FIXED_FOR_W = 0.13e-6
 # ngspice 実行
 # ============================================================
 
-def run_ngspice(cir_path: Path, log_path: Path, out_dir: Path):
-    print(f"[VG] Running ngspice → {cir_path}")
-
-    result = subprocess.run(
-        [NGSPICE_EXE, "-b", str(cir_path)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
+def make_job(cir_path: Path, log_path: Path, dat_path: Path, device: str, cir_text: str) -> NgspiceJob:
+    print(f"[VG] Queue ngspice → {cir_path}")
+    # libngspice で解くとき用にデバイスとネットリスト本文を持たせておく
+    # bsim4.out / sim.log が並列ジョブで混ざらないよう、ジョブごとの作業ディレクトリで走らせる
+    return NgspiceJob(
+        cir_path, cwd=job_workdir(cir_path), log=log_path, outputs=[dat_path], workfiles=WORKFILES,
+        meta={"device": device, "netlist": cir_text},
     )
 
-    # ログ保存
-    log_path.write_text(result.stdout, encoding="utf-8")
-
-    # bsim4.out / sim.log の整理
-    tmp_bsim = out_dir / "bsim4.out"
-    tmp_simlog = out_dir / "sim.log"
-    if tmp_bsim.exists():
-        tmp_bsim.rename(out_dir / (cir_path.stem + "_bsim4.out"))
-    if tmp_simlog.exists():
-        tmp_simlog.rename(log_path)
 
-    if result.returncode != 0:
-        raise RuntimeError(f"ngspice failed: {cir_path}")
+def finish_job(result, out_dir: Path):
+    """bsim4.out / sim.log の整理と失敗チェック（結果は投入順に届く）。"""
+    cir_path = result.job.netlist
+    log_path = result.job.log
+
+    # ジョブ自身の作業ディレクトリに出たものだけを、そのネットリストの名前で回収する
+    collect_workdir(result.job.cwd, {
+        "bsim4.out": out_dir / (cir_path.stem + "_bsim4.out"),
+        "sim.log": log_path,
+    })
+
+    result.raise_for_status()
+
+
+def run_tasks(tasks: list, shared: bool = False):
+    """
+    tasks: (NgspiceJob, out_dir, dat_path, csv_path) のリスト。
+    ngspice を並列に回し（NGSPICE_JOBS 本まで）、投入順に抽出まで行う。
+    shared=True なら libngspice でプロセス内に解く（読み込めなければ ngspice -b に戻る）。
+    """
+    if shared:
+        ng = load_shared()
+        if ng is not None:
+            run_tasks_shared(tasks, ng)
+            return
+        print("[VG] libngspice not found (set NGSPICE_LIBRARY) → ngspice -b")
+    scheduler = NgspiceScheduler(ngspice=NGSPICE_EXE)
+    results = scheduler.imap(job for job, _, _, _ in tasks)
+    for (job, out_dir, dat_path, csv_path), result in zip(tasks, results):
+        finish_job(result, out_dir)
+        extract_vth(dat_path, csv_path)
+
+
+def run_tasks_shared(tasks: list, ng):
+    """
+    libngspice（ngspice_tools.SharedNgspice）で 1 本ずつ解き、VX / IY のベクトルを
+    そのまま抽出に渡す。.dat は書かず、ngspice の出力は .log に残す。
+    """
+    for job, out_dir, dat_path, csv_path in tasks:
+        print(f"[VG] libngspice → {job.netlist}")
+        # Id の正方向は .control と同じ（NMOS: -i(Vd), PMOS: i(Vs)）
+        iy = "-i(Vd)" if job.meta["device"] == "nmos" else "i(Vs)"
+        try:
+            vec = ng.run(job.meta["netlist"], {"vx": "v(g) - v(s)", "iy": iy})
+        finally:
+            job.log.write_text("\n".join(ng.output) + "\n", encoding="utf-8")
+        write_vth(vec["vx"], vec["iy"], csv_path)
 
 
 # ============================================================
@@ -74,9 +115,10 @@ def extract_vth(dat_path: Path, csv_path: Path):
         data = data.reshape(1, -1)
 
     # Vgs = 先頭列, Id = 最終列（2列でも4列でも対応）
-    Vgs = data[:, 0]
-    Id  = data[:, -1]
+    write_vth(data[:, 0], data[:, -1], csv_path)
 
+
+def write_vth(Vgs: np.ndarray, Id: np.ndarray, csv_path: Path):
     gm = np.gradient(Id, Vgs)
 
     n = len(Vgs)
@@ -141,7 +183,7 @@ def make_vg_cir(
            .replace("{{VG_START}}", str(VG_START))
            .replace("{{VG_STOP}}", str(VG_STOP))
            .replace("{{VG_STEP}}", str(VG_STEP_))
-           .replace("{{CSV_PATH}}", dat_path.as_posix())
+           .replace("{{CSV_PATH}}", dat_path.resolve().as_posix())   # cwd はジョブごとに違う
     )
     return cir
 
@@ -151,11 +193,13 @@ def make_vg_cir(
 #   130nm_nmos_l010.sp / 130nm_pmos_l010.sp などを読む
 # ============================================================
 
-def sweep_L_vg():
+def l_tasks():
+    """L スイープのネットリストを書き出し、run_tasks に渡すタスクを返す。"""
     base = Path(".")
     template_path = base / "templates" / "template_vg_dim.cir"
     out_dir = base / "results" / TECH / "l_vg"
     out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = []
 
     for device in ["nmos", "pmos"]:
         for Lch in L_LIST:
@@ -189,8 +233,9 @@ def sweep_L_vg():
 
             cir_path.write_text(cir_text, encoding="utf-8")
 
-            run_ngspice(cir_path, log_path, out_dir)
-            extract_vth(dat_path, csv_path)
+            tasks.append((make_job(cir_path, log_path, dat_path, device, cir_text), out_dir, dat_path, csv_path))
+
+    return tasks
 
 
 # ============================================================
@@ -198,11 +243,13 @@ def sweep_L_vg():
 #   130nm_nmos_w050.sp / 130nm_pmos_w050.sp などを読む
 # ============================================================
 
-def sweep_W_vg():
+def w_tasks():
+    """W スイープのネットリストを書き出し、run_tasks に渡すタスクを返す。"""
     base = Path(".")
     template_path = base / "templates" / "template_vg_dim.cir"
     out_dir = base / "results" / TECH / "w_vg"
     out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = []
 
     for device in ["nmos", "pmos"]:
         for Wch in W_LIST:
@@ -235,8 +282,17 @@ def sweep_W_vg():
 
             cir_path.write_text(cir_text, encoding="utf-8")
 
-            run_ngspice(cir_path, log_path, out_dir)
-            extract_vth(dat_path, csv_path)
+            tasks.append((make_job(cir_path, log_path, dat_path, device, cir_text), out_dir, dat_path, csv_path))
+
+    return tasks
+
+
+def sweep_L_vg(shared: bool = False):
+    run_tasks(l_tasks(), shared=shared)
+
+
+def sweep_W_vg(shared: bool = False):
+    run_tasks(w_tasks(), shared=shared)
 
 
 # ============================================================
@@ -244,10 +300,10 @@ def sweep_W_vg():
 # ============================================================
 
 if __name__ == "__main__":
-    print("===== VG Sweep : L-sweep (RT, 130nm) =====")
-    sweep_L_vg()
-
-    print("===== VG Sweep : W-sweep (RT, 130nm) =====")
-    sweep_W_vg()
+    # L / W スイープのネットリストを全部並べてから、まとめて並列実行
+    #   --shared で libngspice（NGSPICE_LIBRARY）を使い、プロセス内で順に解く
+    shared = "--shared" in sys.argv[1:]
+    print("===== VG Sweep : L-sweep + W-sweep (RT, 130nm) =====")
+    run_tasks(l_tasks() + w_tasks(), shared=shared)
 
     print("=== run_vg_dim.py DONE ===")
@@ -1,15 +1,18 @@
 from __future__ import annotations
 from pathlib import Path
-import subprocess
+import sys
 import numpy as np
 import csv
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import NgspiceJob, NgspiceScheduler, load_raw, resolve_ngspice
+
 # ======================================================
 # 固定パス
 # ======================================================
 BASE = Path(r"C:/Users/Lenovo/Documents/bsim4_analyzer_reliability")
 
-NGSPICE_EXE = r"C:\Program Files\Spice64\bin\ngspice_con.exe"
+NGSPICE_EXE = resolve_ngspice(r"C:\Program Files\Spice64\bin\ngspice_con.exe")
 
 MODEL_FILE = BASE / "models" / "nmos130.sp"
 MODEL_NAME = "nmos130"
@@ -38,21 +41,22 @@ BIAS_LIST = [(1.2, 1.2)]
 # ======================================================
 # ngspice 実行
 # ======================================================
-def run_ngspice(cir_path: Path, cwd: Path):
-    result = subprocess.run(
-        [NGSPICE_EXE, "-b", str(cir_path)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        cwd=str(cwd),
-    )
-    log = result.stdout
-    (cir_path.with_suffix(".log")).write_text(log, encoding="utf-8")
+def ngspice_job(cir_path: Path, cwd: Path, *outputs: Path) -> NgspiceJob:
+    # wrdata / write はファイル名だけなので cwd で出力先を決める。ログは .cir と同じ名前の .log
+    return NgspiceJob(cir_path, cwd=cwd, log=cir_path.with_suffix(".log"), outputs=list(outputs))
+
 
-    if result.returncode != 0:
-        raise RuntimeError(log)
+def run_ngspice_jobs(jobs: list) -> list:
+    """ジョブをまとめて並列実行し（結果は投入順）、失敗があればそのログで止める。"""
+    results = NgspiceScheduler(ngspice=NGSPICE_EXE).run(jobs)
+    for result in results:
+        if not result.ok:
+            raise RuntimeError(result.stdout or result.error)
+    return results
 
-    return log
+
+def run_ngspice(cir_path: Path, cwd: Path, dat: Path):
+    return run_ngspice_jobs([ngspice_job(cir_path, cwd, dat)])[0].stdout
 
 
 # ======================================================
@@ -85,9 +89,10 @@ def extract_vtc_const_current(Vgs, Id, W, L):
 # VGID sweep（t=0 用）
 #   130nm_hci_nmos_12v_85c_t0s_vgid.dat を生成
 # ======================================================
-def run_vgid(label: str, vgs: float, temp: float):
+def vgid_job(label: str, vgs: float, temp: float) -> NgspiceJob:
     cir = DIR_VGID / f"{label}.cir"
     dat = DIR_VGID / f"{label}_vgid.dat"
+    raw = DIR_VGID / f"{label}_vgid.raw"   # 同じ VX / IY のバイナリ rawfile
 
     tpl = TEMPLATE_VGID.read_text(encoding="utf-8")
     txt = (
@@ -104,26 +109,33 @@ def run_vgid(label: str, vgs: float, temp: float):
            .replace("{{VG_STEP}}", "0.005")
            # wrdata ではファイル名だけ出力
            .replace("{{CSV_PATH}}", dat.name)
+           .replace("{{RAW_PATH}}", raw.name)
     )
 
     cir.write_text(txt, encoding="utf-8")
-    run_ngspice(cir, cwd=DIR_VGID)
+    return ngspice_job(cir, DIR_VGID, dat, raw)
 
-    arr = np.loadtxt(dat)
-    if arr.ndim == 1:
-        arr = arr.reshape(1, -1)
 
-    # .dat の 1 列目が Vgs, 最後の列が Id になるように読み取り
-    Vgs = arr[:, 0]
-    Id  = arr[:, -1]
+def read_vgid(job: NgspiceJob):
+    # 0.005 V 刻みの掃引は .dat の np.loadtxt より rawfile の memmap の方が速い
+    # （.dat は plot/ 用にそのまま残す）
+    plot = load_raw(job.outputs[1])
+    Vgs = plot["vx"]
+    Id  = plot["iy"]
     return Vgs, Id
 
 
+def run_vgid(label: str, vgs: float, temp: float):
+    job = vgid_job(label, vgs, temp)
+    run_ngspice_jobs([job])
+    return read_vgid(job)
+
+
 # ======================================================
 # DC HCI（t=0 の Idlin / Idsat を測るだけ）
 #   130nm_hci_nmos_12v_85c_t0s.dat を生成
 # ======================================================
-def run_hci_dc(vgs: float, vds: float, temp: float):
+def hci_dc_job(vgs: float, vds: float, temp: float) -> NgspiceJob:
     label = f"130nm_hci_nmos_{int(vgs*10)}v_{int(temp)}c_t0s"
     cir = DIR_HCI / f"{label}.cir"
     dat = DIR_HCI / f"{label}.dat"
@@ -139,13 +151,21 @@ def run_hci_dc(vgs: float, vds: float, temp: float):
     )
 
     cir.write_text(txt, encoding="utf-8")
-    run_ngspice(cir, cwd=DIR_HCI)
+    return ngspice_job(cir, DIR_HCI, dat)
 
-    arr = np.loadtxt(dat)
+
+def read_hci_dc(job: NgspiceJob):
+    arr = np.loadtxt(job.outputs[0])
     # arr[0]=Vth, arr[1]=Idlin, arr[2]=Idsat
     return float(arr[1]), float(arr[2])  # Idlin, Idsat
 
 
+def run_hci_dc(vgs: float, vds: float, temp: float):
+    job = hci_dc_job(vgs, vds, temp)
+    run_ngspice_jobs([job])
+    return read_hci_dc(job)
+
+
 # ======================================================
 # HCI 劣化モデル（時間依存 ΔVth & ΔIdrel）
 # ======================================================
@@ -174,19 +194,23 @@ def main():
     rows = [["VGS","VDS","TEMP","t","Vtc","Vtg","Idlin","Idsat",
              "dVtc","dVtg","dIdlin","dIdsat"]]
 
+    # --- t=0s: 全バイアスの VG–ID スイープと DC 測定をまとめて並列実行 ---
+    jobs = []
     for vgs, vds in BIAS_LIST:
-        print(f"\n===== BASELINE {vgs} V =====")
-
-        # --- t=0s: SPICE 実測 ---
         base_label = f"130nm_hci_nmos_{int(vgs*10)}v_{int(TEMP)}c_t0s"
+        jobs.append((vgid_job(base_label, vgs, TEMP), hci_dc_job(vgs, vds, TEMP)))
+    run_ngspice_jobs([job for pair in jobs for job in pair])
+
+    for (vgs, vds), (job_vgid, job_dc) in zip(BIAS_LIST, jobs):
+        print(f"\n===== BASELINE {vgs} V =====")
 
         # VG–ID スイープ → Vtg0, Vtc0
-        Vgs0, Id0 = run_vgid(base_label, vgs, TEMP)
+        Vgs0, Id0 = read_vgid(job_vgid)
         Vtg0 = extract_vtg_gmmax(Vgs0, Id0)
         Vtc0 = extract_vtc_const_current(Vgs0, Id0, WCH, LCH)
 
         # DC 測定 → Idlin0, Idsat0
-        Idlin0, Idsat0 = run_hci_dc(vgs, vds, TEMP)
+        Idlin0, Idsat0 = read_hci_dc(job_dc)
 
         # baseline 行（Δは 0）
         rows.append([
@@ -1,15 +1,18 @@
 from __future__ import annotations
 from pathlib import Path
-import subprocess
+import sys
 import numpy as np
 import csv
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))   # bsim/（共通の ngspice_tools）
+from ngspice_tools import NgspiceJob, NgspiceScheduler, load_raw, resolve_ngspice
+
 # =====================================================================
 # 固定パス
 # =====================================================================
 BASE = Path(r"C:/Users/Lenovo/Documents/bsim4_analyzer_reliability")
 
-NGSPICE_EXE = r"C:\Program Files\Spice64\bin\ngspice_con.exe"
+NGSPICE_EXE = resolve_ngspice(r"C:\Program Files\Spice64\bin\ngspice_con.exe")
 
 MODEL_FILE = BASE / "models" / "pmos130.sp"
 MODEL_NAME = "pmos130"
@@ -34,20 +37,21 @@ BIAS_LIST    = [(-1.2, -1.2)]  # PMOS
 # =====================================================================
 # ngspice 実行
 # =====================================================================
-def run_ngspice(cir: Path, cwd: Path):
-    result = subprocess.run(
-        [NGSPICE_EXE, "-b", str(cir)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        cwd=str(cwd),
-    )
-    log = result.stdout
-    (cir.with_suffix(".log")).write_text(log, encoding="utf-8")
+def ngspice_job(cir: Path, cwd: Path, *outputs: Path) -> NgspiceJob:
+    return NgspiceJob(cir, cwd=cwd, log=cir.with_suffix(".log"), outputs=list(outputs))
+
+
+def run_ngspice_jobs(jobs: list) -> list:
+    """ジョブをまとめて並列実行し（結果は投入順）、失敗があればそのログで止める。"""
+    results = NgspiceScheduler(ngspice=NGSPICE_EXE).run(jobs)
+    for result in results:
+        if not result.ok:
+            raise RuntimeError(result.stdout or result.error)
+    return results
 
-    if result.returncode != 0:
-        raise RuntimeError(log)
-    return log
+
+def run_ngspice(cir: Path, cwd: Path, dat: Path):
+    return run_ngspice_jobs([ngspice_job(cir, cwd, dat)])[0].stdout
 
 
 # =====================================================================
@@ -73,9 +77,10 @@ def extract_vtc_const_current(Vgs, Id, W, L):
 # =====================================================================
 # VGID sweep（t=0）
 # =====================================================================
-def run_vgid(label, vgs, temp):
+def vgid_job(label, vgs, temp):
     cir = DIR_VGID / f"{label}.cir"
     dat = DIR_VGID / f"{label}_vgid.dat"
+    raw = DIR_VGID / f"{label}_vgid.raw"   # 同じ VX / IY のバイナリ rawfile
 
     tpl = TEMPLATE_VGID.read_text(encoding="utf-8")
     txt = (
@@ -91,24 +96,31 @@ def run_vgid(label, vgs, temp):
            .replace("{{VG_STOP}}", str(vgs))
            .replace("{{VG_STEP}}", "-0.005")
            .replace("{{CSV_PATH}}", dat.name)
+           .replace("{{RAW_PATH}}", raw.name)
     )
 
     cir.write_text(txt, encoding="utf-8")
-    run_ngspice(cir, DIR_VGID)
+    return ngspice_job(cir, DIR_VGID, dat, raw)
 
-    arr = np.loadtxt(dat)
-    if arr.ndim == 1:
-        arr = arr.reshape(1, -1)
 
-    Vgs = arr[:, 2]  # v(g)-v(s)
-    Id  = arr[:, 3]  # |Id|
+def read_vgid(job):
+    # rawfile を memmap で読む（.dat は plot/ 用にそのまま残す）
+    plot = load_raw(job.outputs[1])
+    Vgs = plot["vx"]  # v(g)-v(s)
+    Id  = plot["iy"]  # |Id|
     return Vgs, Id
 
 
+def run_vgid(label, vgs, temp):
+    job = vgid_job(label, vgs, temp)
+    run_ngspice_jobs([job])
+    return read_vgid(job)
+
+
 # =====================================================================
 # NBTI DC（t=0）
 # =====================================================================
-def run_nbti_dc(vgs, vds, temp, t):
+def nbti_dc_job(vgs, vds, temp, t):
     label = f"130nm_nbti_pmos_{int(abs(vgs)*10)}v_{int(temp)}c_t{t}s"
     cir = DIR_NBTI / f"{label}.cir"
     dat = DIR_NBTI / f"{label}.dat"
@@ -123,12 +135,20 @@ def run_nbti_dc(vgs, vds, temp, t):
     )
 
     cir.write_text(txt, encoding="utf-8")
-    run_ngspice(cir, DIR_NBTI)
+    return ngspice_job(cir, DIR_NBTI, dat)
 
-    arr = np.loadtxt(dat)
+
+def read_nbti_dc(job):
+    arr = np.loadtxt(job.outputs[0])
     return float(arr[1]), float(arr[2])
 
 
+def run_nbti_dc(vgs, vds, temp, t):
+    job = nbti_dc_job(vgs, vds, temp, t)
+    run_ngspice_jobs([job])
+    return read_nbti_dc(job)
+
+
 # =====================================================================
 # NBTI 劣化モデル
 # =====================================================================
@@ -151,14 +171,20 @@ def main():
     rows = [["VGS","VDS","TEMP","t","Vtc","Vtg",
              "Idlin","Idsat","dVtc","dVtg","dIdlin","dIdsat"]]
 
+    # ---- t=0: 全バイアスの VGID と DC をまとめて並列実行 ----
+    jobs = []
     for vgs, vds in BIAS_LIST:
         base_label = f"130nm_nbti_pmos_{int(abs(vgs)*10)}v_{int(TEMP)}c_t0s"
+        jobs.append((vgid_job(base_label, vgs, TEMP), nbti_dc_job(vgs, vds, TEMP, 0)))
+    run_ngspice_jobs([job for pair in jobs for job in pair])
+
+    for (vgs, vds), (job_vgid, job_dc) in zip(BIAS_LIST, jobs):
 
         # ---- t=0 VGID ----
-        Vgs0, Id0 = run_vgid(base_label, vgs, TEMP)
+        Vgs0, Id0 = read_vgid(job_vgid)
 
         # ---- t=0 DC ----
-        Idlin0, Idsat0 = run_nbti_dc(vgs, vds, TEMP, 0)
+        Idlin0, Idsat0 = read_nbti_dc(job_dc)
 
         # ---- threshold ----
         gm = np.gradient(Id0, Vgs0)
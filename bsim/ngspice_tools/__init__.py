@@ -0,0 +1,37 @@
+"""
+ngspice_tools: bsim/ 以下のアナライザ共通の ngspice 実行ユーティリティ。
+
+各アナライザのスクリプトは bsim/ を sys.path に足してから import する。
+"""
+from .scheduler import (
+    NgspiceJob,
+    JobResult,
+    NgspiceScheduler,
+    run_jobs,
+    resolve_ngspice,
+    default_jobs,
+    default_timeout,
+    job_workdir,
+    collect_workdir,
+)
+from .cache import (
+    NgspiceCache,
+    default_cache,
+    default_cache_dir,
+)
+from .rawfile import (
+    RawPlot,
+    read_raw,
+    load_raw,
+)
+from .corners import (
+    CORNER_TAG,
+    corner_marker,
+    split_corner_log,
+    split_corners,
+)
+from .shared import (
+    SharedNgspice,
+    load_shared,
+    strip_control,
+)
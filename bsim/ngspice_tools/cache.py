@@ -0,0 +1,272 @@
+"""
+ngspice の実行結果キャッシュ（NgspiceScheduler から使う）。
+
+キーは「展開済みネットリストの本文 + .include / .lib で読むファイルの中身（入れ子も辿る）
++ ngspice 実行ファイルと引数」の SHA-256。同じキーの成功結果（outputs の .dat、-o のログ、
+-r の rawfile、stdout、作業ディレクトリに出た workfiles）がキャッシュにあれば ngspice を
+起動せずに書き戻す。モデルファイルを 1 本作り直せば
+その .include を含むネットリストだけキーが変わるので、run_vd_dim.py の 18 本を流し直しても
+実際に解くのは変わったジオメトリだけになる。
+
+    cache = default_cache()                 # 既定: ~/.cache/semidevkit/ngspice（NGSPICE_CACHE）
+    key = cache.key(job, ngspice)           # 作れなければ None（キャッシュしない）
+    hit = cache.restore(job, key)           # (returncode, stdout) か None
+    ...
+    cache.store(job, key, stdout, returncode)   # 成功したジョブだけ保存
+
+NgspiceScheduler はこれを run_one の前後で自動的に行う（JobResult.cached が True なら再利用）。
+
+整合性: 保存時に各ファイルの SHA-256 とサイズを manifest.json に書き、書き戻す前に照合する。
+合わない（途中で壊れた・書き換えられた）エントリは消して、そのジョブは普通に実行する。
+退避: 合計サイズが max_bytes（NGSPICE_CACHE_MB、既定 2048 MB）を超えたら、
+最後に使われたのが古いエントリから消す。
+
+キーを作れないジョブ（.include 先が見つからないなど）はキャッシュしない。
+環境変数 NGSPICE_CACHE にディレクトリを指定して場所を変え、off で無効にする。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .scheduler import NgspiceJob
+
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_MB = 2048.0
+
+# .include "file" / .inc file / .lib "file" section（.lib section だけの行はセクション見出し）
+_INCLUDE_RE = re.compile(r'^\s*\.(include|inc|lib)\s+(?:"([^"]+)"|(\S+))(\s+\S+)?', re.IGNORECASE)
+
+
+def default_cache_dir() -> Optional[Path]:
+    """NGSPICE_CACHE（off なら None）、無ければユーザーのキャッシュディレクトリ。"""
+    env = os.environ.get("NGSPICE_CACHE")
+    if env:
+        return None if env.lower() in ("off", "0", "none") else Path(env)
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or Path.home() / ".cache"
+    return Path(base) / "semidevkit" / "ngspice"
+
+
+def default_cache() -> Optional["NgspiceCache"]:
+    root = default_cache_dir()
+    if root is None:
+        return None
+    max_mb = float(os.environ.get("NGSPICE_CACHE_MB") or DEFAULT_CACHE_MB)
+    return NgspiceCache(root, max_bytes=int(max_mb * 1024 * 1024))
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _artifacts(job: "NgspiceJob") -> List[Path]:
+    """キャッシュに入れるファイル: outputs と、-o / -r で ngspice 自身が書くログ・rawfile。"""
+    paths = [Path(p) for p in job.outputs]
+    args = list(job.args)
+    for i, a in enumerate(args[:-1]):
+        if a in ("-o", "-r"):
+            paths.append(Path(args[i + 1]))
+    return paths
+
+
+def _workfiles(job: "NgspiceJob") -> List[Path]:
+    """作業ディレクトリに ngspice（BSIM4）が書くファイル（bsim4.out など）。出ないこともある。"""
+    cwd = Path(job.cwd) if job.cwd else Path.cwd()
+    return [cwd / name for name in job.workfiles]
+
+
+class NgspiceCache:
+    def __init__(self, root: Path, max_bytes: int = int(DEFAULT_CACHE_MB * 1024 * 1024)):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    # ---- キー ----
+    def _resolve_include(self, name: str, bases: List[Path]) -> Optional[Path]:
+        p = Path(name).expanduser()
+        if p.is_absolute():
+            return p if p.is_file() else None
+        for base in bases:
+            if (base / p).is_file():
+                return (base / p).resolve()
+        return None
+
+    def _hash_includes(self, text: str, bases: List[Path], h, seen: set) -> bool:
+        """text 中の .include / .lib 先の中身を h に足す。見つからないファイルがあれば False。"""
+        for line in text.splitlines():
+            m = _INCLUDE_RE.match(line)
+            if not m:
+                continue
+            kind, quoted, bare, section = m.groups()
+            if kind.lower() == "lib" and not quoted and not section:
+                continue   # .lib TT のようなセクション見出し
+            path = self._resolve_include(quoted or bare, bases)
+            if path is None:
+                return False
+            if path in seen:
+                continue
+            seen.add(path)
+            data = path.read_bytes()
+            h.update(b"\0include\0" + hashlib.sha256(data).hexdigest().encode())
+            inner = data.decode("utf-8", errors="replace")
+            # 入れ子もジョブの cwd（bases[0]）と取り込み元ファイルのディレクトリを基準に探す
+            if not self._hash_includes(inner, [bases[0], path.parent], h, seen):
+                return False
+        return True
+
+    def key(self, job: "NgspiceJob", ngspice: str) -> Optional[str]:
+        """ジョブのキャッシュキー（作れなければ None）。"""
+        try:
+            text = Path(job.netlist).read_bytes()
+        except OSError:
+            return None
+        h = hashlib.sha256()
+        h.update(f"ngspice-cache-v{CACHE_VERSION}\0".encode())
+
+        # ngspice を入れ替えたら別キー（実行ファイルのパス・サイズ・更新時刻）
+        exe = shutil.which(ngspice) or ngspice
+        try:
+            st = os.stat(exe)
+            h.update(f"{Path(exe).resolve()}\0{st.st_size}\0{st.st_mtime_ns}\0".encode())
+        except OSError:
+            h.update(f"{ngspice}\0".encode())
+        cwd = Path(job.cwd) if job.cwd else Path.cwd()
+        h.update(f"{cwd.resolve()}\0".encode())   # 相対パスの wrdata / .include の基準
+        h.update("\0".join(str(a) for a in job.args).encode() + b"\0")
+        h.update("\0".join(job.workfiles).encode() + b"\0")
+        h.update(text)
+
+        bases = [cwd, Path(job.netlist).resolve().parent]
+        if not self._hash_includes(text.decode("utf-8", errors="replace"), bases, h, set()):
+            return None
+        return h.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    # ---- 読み出し ----
+    def restore(self, job: "NgspiceJob", key: str) -> Optional[Tuple[Optional[int], str]]:
+        """キャッシュにあれば成果物を書き戻して (returncode, stdout) を返す（無い・壊れていれば None）。"""
+        entry = self._entry(key)
+        manifest_path = entry / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            files = manifest["files"]
+            targets = _artifacts(job)
+            # workfiles は出たものだけ保存してある（"workfile" に元の名前）
+            work = [info for info in files if "workfile" in info]
+            files = [info for info in files if "workfile" not in info]
+            if len(files) != len(targets) + 1 or any(info["workfile"] not in job.workfiles for info in work):
+                raise ValueError("artifact count mismatch")
+            for info in files + work:
+                src = entry / info["name"]
+                if src.stat().st_size != info["size"] or _sha256_file(src) != info["sha256"]:
+                    raise ValueError(f"corrupt artifact {info['name']}")
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        for info, dst in zip(files[1:], targets):
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry / info["name"], dst)
+        if work:
+            cwd = Path(job.cwd) if job.cwd else Path.cwd()
+            cwd.mkdir(parents=True, exist_ok=True)
+            for info in work:
+                shutil.copyfile(entry / info["name"], cwd / info["workfile"])
+        stdout = (entry / files[0]["name"]).read_text(encoding="utf-8")
+        os.utime(manifest_path)   # LRU 用に最終利用時刻を更新
+        return manifest.get("returncode", 0), stdout
+
+    # ---- 書き込み ----
+    def store(self, job: "NgspiceJob", key: str, stdout: str, returncode: Optional[int] = 0) -> bool:
+        """成功したジョブの成果物を保存する（保存したら True）。失敗したジョブは呼ばないこと。"""
+        entry = self._entry(key)
+        if (entry / "manifest.json").exists():
+            return False
+        sources = _artifacts(job)
+        if not all(p.is_file() for p in sources):
+            return False
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key[:8]}_", dir=entry.parent))
+        try:
+            (tmp / "stdout.txt").write_text(stdout, encoding="utf-8")
+            names = ["stdout.txt"]
+            for i, src in enumerate(sources):
+                name = f"{i}{src.suffix}"
+                shutil.copyfile(src, tmp / name)
+                names.append(name)
+            files = [
+                {"name": n, "size": (tmp / n).stat().st_size, "sha256": _sha256_file(tmp / n)} for n in names
+            ]
+            for i, src in enumerate(p for p in _workfiles(job) if p.is_file()):
+                name = f"w{i}{src.suffix}"
+                shutil.copyfile(src, tmp / name)
+                files.append({
+                    "name": name, "workfile": src.name,
+                    "size": (tmp / name).stat().st_size, "sha256": _sha256_file(tmp / name),
+                })
+            manifest = {
+                "version": CACHE_VERSION,
+                "netlist": str(job.netlist),
+                "returncode": returncode,
+                "created": time.time(),
+                "files": files,
+            }
+            # manifest は最後に書く（manifest があるエントリ = 書き終わったエントリ）
+            (tmp / "manifest.json").write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+            if entry.exists() and not (entry / "manifest.json").exists():
+                shutil.rmtree(entry, ignore_errors=True)   # manifest の無い残骸
+            os.replace(tmp, entry)
+        except OSError:
+            # 並列に同じキーを書いた場合などは先に書いた方を残す
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        self.evict()
+        return True
+
+    # ---- 退避 ----
+    def entries(self) -> Iterator[Tuple[Path, float, int]]:
+        """(エントリ, 最終利用時刻, バイト数) を列挙する。"""
+        if not self.root.exists():
+            return
+        for manifest_path in self.root.glob("??/*/manifest.json"):
+            entry = manifest_path.parent
+            try:
+                used = manifest_path.stat().st_mtime
+                size = sum(p.stat().st_size for p in entry.iterdir())
+            except OSError:
+                continue
+            yield entry, used, size
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """合計が max_bytes 以下になるまで古いエントリから消す。消した数を返す。"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        items = sorted(self.entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in items)
+        removed = 0
+        for entry, _, size in items:
+            if total <= limit:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        return self.evict(0)
@@ -0,0 +1,77 @@
+"""
+複数コーナー（デバイス × 温度など）を 1 本の ngspice デッキにまとめて流すときの補助。
+
+ngspice の起動とモデルの読み込みはコーナー数によらず 1 回で済む。デッキの .control では
+各コーナーの解析の直前に corner_marker() の echo 行を置き、実行後の出力（stdout や -o のログ）を
+split_corner_log() / split_corners() でコーナー別に切り分ける:
+
+    lines += [corner_marker(job.label), "option temp=125", "dc Vg1 0 1.2 0.05", ...]
+    merged = NgspiceScheduler(...).run_one(NgspiceJob(deck, outputs=[...全コーナーの .dat]))
+    for res in split_corners(merged, corner_jobs):   # コーナーごとの JobResult（.log も書く）
+        post_process(res)
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from .scheduler import JobResult, NgspiceJob
+
+
+CORNER_TAG = "==corner=="
+
+
+def corner_marker(label: str) -> str:
+    """.control 内に置く区切り行（label に空白や $ などは使わない）。"""
+    return f"echo {CORNER_TAG} {label}"
+
+
+def split_corner_log(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    出力を (最初の区切りより前の共通部分, {label: そのコーナーの部分}) に分ける。
+    区切り行そのものは含めない。
+    """
+    header: List[str] = []
+    parts: Dict[str, List[str]] = {}
+    current = header
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith(CORNER_TAG):
+            label = stripped[len(CORNER_TAG):].strip()
+            current = parts.setdefault(label, [])
+            continue
+        current.append(line)
+    return "".join(header), {k: "".join(v) for k, v in parts.items()}
+
+
+def split_corners(result: JobResult, corner_jobs: Sequence[NgspiceJob], text: str | None = None) -> List[JobResult]:
+    """
+    まとめて流したデッキの結果を、コーナーごとの JobResult（job は corner_jobs の各要素）に戻す。
+
+    stdout は共通部分 + そのコーナーの部分。job.log があればそこにも書く。
+    デッキ全体が失敗したときは全コーナーが同じ error、成功していても自分の outputs が
+    無いコーナーは失敗扱い。text を渡すと stdout の代わりにそれを切り分ける（-o のログなど）。
+    """
+    header, parts = split_corner_log(result.stdout if text is None else text)
+    out = []
+    for job in corner_jobs:
+        stdout = header + parts.get(job.label, "")
+        error = result.error
+        if error is None:
+            missing = [str(p) for p in job.outputs if not Path(p).exists()]
+            if job.label not in parts:
+                error = f"corner {job.label} not found in output"
+            elif missing:
+                error = f"missing output {', '.join(missing)}"
+        if job.log is not None:
+            Path(job.log).write_text(stdout, encoding="utf-8")
+        out.append(JobResult(
+            job=job,
+            returncode=result.returncode,
+            stdout=stdout,
+            attempts=result.attempts,
+            seconds=result.seconds,
+            error=error,
+            cached=result.cached,
+        ))
+    return out
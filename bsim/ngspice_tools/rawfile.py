@@ -0,0 +1,187 @@
+"""
+ngspice の rawfile（ngspice -r FILE、.control の write FILE）の読み込み。
+
+バイナリ rawfile はヘッダ（テキスト）の後に「点ごとに全変数の double（複素数なら 2 個）」が
+並ぶだけなので、データ部を (点数, 変数数) の np.memmap として開き、各ベクトルはその列の
+ビュー（コピー無し）として渡す。0.005 V 刻みの掃引や 2 次元の格子でも、読み込み時間は
+ヘッダの解析だけでほぼ一定。ASCII の rawfile（set filetype=ascii）も読めるが、こちらは
+テキストを解析して通常の配列にする。
+
+    from ngspice_tools import load_raw
+
+    plot = load_raw("results/.../130nm_hci_nmos_12v_85c_t0s_vgid.raw")
+    vg, idd = plot["vx"], plot["iy"]        # 名前は大文字小文字を区別しない
+    plot.scale                              # 掃引変数（先頭のベクトル）
+    # 2 重の .dc（.dc Vd ... Vg ...）は外側の点数で reshape すれば格子になる
+    grid = plot["i(vd)"].reshape(n_vg, -1)
+
+1 つのファイルに複数のプロット（write を繰り返した・複数の解析）があれば read_raw が
+すべてを返す。memmap はファイルを開いたままにするので、書き換える前に参照を手放すこと。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+
+@dataclass
+class RawPlot:
+    title: str
+    date: str
+    plotname: str
+    flags: str
+    names: List[str]                  # 変数名（ヘッダの順）
+    types: List[str]                  # voltage / current / time など
+    data: np.ndarray                  # (点数, 変数数)。バイナリなら np.memmap
+    header: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def npoints(self) -> int:
+        return int(self.data.shape[0])
+
+    @property
+    def is_complex(self) -> bool:
+        return np.iscomplexobj(self.data)
+
+    @property
+    def scale(self) -> np.ndarray:
+        return self.data[:, 0]
+
+    def index(self, name: str) -> int:
+        """変数の列番号。v(g) ↔ g、i(vd) ↔ vd#branch の書き方の違いも吸収する。"""
+        lower = [n.lower() for n in self.names]
+        key = name.strip().lower()
+        candidates = [key]
+        if key.startswith("v(") and key.endswith(")"):
+            candidates.append(key[2:-1])
+        elif key.startswith("i(") and key.endswith(")"):
+            candidates.append(f"{key[2:-1]}#branch")
+        elif key.endswith("#branch"):
+            candidates.append(f"i({key[:-len('#branch')]})")
+        else:
+            candidates.append(f"v({key})")
+        for c in candidates:
+            if c in lower:
+                return lower.index(c)
+        raise KeyError(f"no vector {name!r} in plot {self.plotname!r} (vectors: {self.names})")
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.data[:, self.index(name)]
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.index(name)
+        except KeyError:
+            return False
+        return True
+
+    def vectors(self) -> Dict[str, np.ndarray]:
+        return {n: self.data[:, i] for i, n in enumerate(self.names)}
+
+
+def _read_header(f) -> tuple:
+    """(header dict, names, types, 'binary' / 'values')。ファイル末尾なら header は None。"""
+    header: Dict[str, str] = {}
+    names: List[str] = []
+    types: List[str] = []
+    in_vars = False
+    while True:
+        line = f.readline()
+        if not line:
+            return None, names, types, None
+        text = line.decode("latin-1").rstrip("\r\n")
+        key = text.strip().lower()
+        if key in ("binary:", "values:"):
+            return header, names, types, key[:-1]
+        if not key:
+            continue
+        if in_vars and len(names) < int(header.get("no. variables", 0)):
+            parts = text.split()
+            names.append(parts[1])
+            types.append(parts[2] if len(parts) > 2 else "")
+            continue
+        k, _, v = text.partition(":")
+        header[k.strip().lower()] = v.strip()
+        if k.strip().lower() == "variables":
+            in_vars = True
+
+
+def _read_values(f, npoints: int, nvars: int, is_complex: bool) -> np.ndarray:
+    """ASCII rawfile の Values: 部（点ごとに "番号<TAB>値" → "<TAB>値" × 変数数）。"""
+    out = np.empty((npoints, nvars), dtype=np.complex128 if is_complex else np.float64)
+    p = v = 0
+    while p < npoints:
+        pos = f.tell()
+        line = f.readline()
+        if not line:
+            return out[:p]
+        tokens = line.decode("latin-1").split()
+        if not tokens:
+            continue
+        if v == 0 and tokens[0].lower().startswith("title"):
+            f.seek(pos)   # 次のプロットのヘッダ（点数がヘッダより少ない場合）
+            return out[:p]
+        value = tokens[-1]
+        if is_complex:
+            re_, _, im = value.partition(",")
+            out[p, v] = complex(float(re_), float(im or 0.0))
+        else:
+            out[p, v] = float(value)
+        v += 1
+        if v == nvars:
+            p, v = p + 1, 0
+    return out
+
+
+def read_raw(path: Union[str, Path], mmap: bool = True) -> List[RawPlot]:
+    """rawfile のプロットをすべて読む。mmap=False ならバイナリも通常の配列に読み込む。"""
+    path = Path(path)
+    size = path.stat().st_size
+    plots: List[RawPlot] = []
+    with open(path, "rb") as f:
+        while f.tell() < size:
+            header, names, types, mode = _read_header(f)
+            if header is None:
+                break
+            nvars = int(header.get("no. variables", len(names)))
+            npoints = int(header.get("no. points", 0))
+            flags = header.get("flags", "real")
+            is_complex = "complex" in flags.lower()
+
+            if mode == "binary":
+                dtype = np.dtype("<c16" if is_complex else "<f8")
+                offset = f.tell()
+                row = nvars * dtype.itemsize
+                # 途中で止まったシミュレーションはヘッダの点数より短いことがある
+                n = min(npoints, (size - offset) // row) if row else 0
+                if n == 0:
+                    data = np.empty((0, nvars), dtype=dtype)
+                elif mmap:
+                    data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n, nvars))
+                else:
+                    data = np.fromfile(f, dtype=dtype, count=n * nvars).reshape(n, nvars)
+                f.seek(offset + n * row)
+            else:
+                data = _read_values(f, npoints, nvars, is_complex)
+
+            plots.append(RawPlot(
+                title=header.get("title", ""),
+                date=header.get("date", ""),
+                plotname=header.get("plotname", ""),
+                flags=flags,
+                names=names,
+                types=types,
+                data=data,
+                header=header,
+            ))
+    if not plots:
+        raise ValueError(f"not an ngspice rawfile: {path}")
+    return plots
+
+
+def load_raw(path: Union[str, Path], plot: int = -1, mmap: bool = True) -> RawPlot:
+    """rawfile の 1 プロット（既定は最後のもの）を返す。"""
+    return read_raw(path, mmap=mmap)[plot]
@@ -0,0 +1,226 @@
+"""
+ngspice バッチジョブの共通スケジューラ（全アナライザ共通）。
+
+ネットリスト N 本を ngspice -b で同時に最大 jobs 本まで走らせ、ジョブごとのタイムアウト、
+失敗時の再実行、投入順での結果受け取りをまとめて面倒を見る:
+
+    from ngspice_tools import NgspiceJob, NgspiceScheduler
+
+    jobs = [NgspiceJob(cir, log=cir.with_suffix(".log"), outputs=[dat]) for cir, dat in ...]
+    for res in NgspiceScheduler(ngspice=NGSPICE_EXE).imap(jobs):   # 投入順に届く
+        res.raise_for_status()
+        post_process(res.job)
+
+失敗の判定: 終了コード != 0、タイムアウト、outputs に挙げたファイルが無い。
+失敗したジョブは retries 回まで同じ条件で再実行する（outputs は実行前に消すので、
+前回の残骸を成功と取り違えない）。ngspice 自体が見つからないときは FileNotFoundError。
+
+既定値は環境変数で上書きできる:
+    NGSPICE          ngspice 実行ファイル（各アナライザの NGSPICE_EXE より優先）
+    NGSPICE_JOBS     同時実行数（既定: CPU コア数）
+    NGSPICE_TIMEOUT  1 ジョブのタイムアウト [s]（既定: 600）
+    NGSPICE_CACHE    結果キャッシュのディレクトリ（off で無効、cache.py 参照）
+    NGSPICE_CACHE_MB キャッシュの上限サイズ [MB]（既定: 2048）
+
+ネットリスト本文と .include 先の中身が前回と同じジョブは、キャッシュから成果物を
+書き戻して ngspice を起動しない（JobResult.cached = True）。
+
+ngspice は子プロセスなのでスレッドプールで十分（GIL は待ち時間中に解放される）。
+BSIM4 の bsim4.out や sim.log は ngspice の作業ディレクトリに書かれるので、同じ cwd で
+並列に走らせるとどのジョブのものか分からなくなる。ジョブごとに job_workdir(netlist) を
+cwd に渡し、後処理で collect_workdir() を呼んでネットリストの名前で回収する:
+
+    job = NgspiceJob(cir, cwd=job_workdir(cir), log=..., outputs=[dat],   # wrdata は絶対パスで
+                     workfiles=("bsim4.out",))
+    ...
+    collect_workdir(res.job.cwd, {"bsim4.out": cir.with_name(cir.stem + "_bsim4.out")})
+
+回収するファイルは workfiles=("bsim4.out",) のようにジョブにも書いておくと、キャッシュから
+書き戻すときも作業ディレクトリに戻るので、後処理はキャッシュの有無を気にしなくてよい。
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .cache import NgspiceCache, default_cache
+
+
+DEFAULT_TIMEOUT = 600.0
+DEFAULT_RETRIES = 1
+
+
+def resolve_ngspice(default: str = "ngspice") -> str:
+    """環境変数 NGSPICE があればそれを、無ければ default を返す。"""
+    return os.environ.get("NGSPICE") or default
+
+
+def default_jobs() -> int:
+    return int(os.environ.get("NGSPICE_JOBS") or os.cpu_count() or 1)
+
+
+def default_timeout() -> float:
+    return float(os.environ.get("NGSPICE_TIMEOUT") or DEFAULT_TIMEOUT)
+
+
+def job_workdir(netlist: Path) -> Path:
+    """ネットリストごとの作業ディレクトリ（<ネットリスト名>.work）。作るのは run_one。"""
+    netlist = Path(netlist).resolve()
+    return netlist.with_name(netlist.stem + ".work")
+
+
+def collect_workdir(workdir: Optional[Path], moves: Dict[str, Path]) -> None:
+    """作業ディレクトリのファイル name を moves[name] に移し、ディレクトリごと消す。"""
+    if workdir is None or not Path(workdir).is_dir():
+        return
+    for name, dst in moves.items():
+        src = Path(workdir) / name
+        if src.exists():
+            os.replace(src, dst)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+@dataclass
+class NgspiceJob:
+    netlist: Path
+    cwd: Optional[Path] = None          # ngspice の作業ディレクトリ（wrdata の相対パスの基準。無ければ作る）
+    log: Optional[Path] = None          # stdout / stderr をまとめて保存する先
+    outputs: Sequence[Path] = ()        # 成功なら存在するはずのファイル（.dat など）
+    args: Sequence[str] = ()            # -b の前に足す引数（-o LOG など）
+    workfiles: Sequence[str] = ()       # cwd に出て後で回収するファイル名（bsim4.out など。キャッシュにも入れる）
+    label: str = ""
+    meta: Dict = field(default_factory=dict)   # 後処理用に呼び出し側が持たせる情報（スケジューラは見ない）
+
+
+@dataclass
+class JobResult:
+    job: NgspiceJob
+    returncode: Optional[int]           # タイムアウトなどで終了コードが無ければ None
+    stdout: str = ""
+    attempts: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None         # 失敗理由（成功なら None）
+    cached: bool = False                # キャッシュから書き戻した（ngspice は起動していない）
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def raise_for_status(self) -> "JobResult":
+        if self.error is not None:
+            raise RuntimeError(f"ngspice failed: {self.job.netlist} ({self.error})")
+        return self
+
+
+@dataclass
+class NgspiceScheduler:
+    ngspice: str = field(default_factory=resolve_ngspice)
+    jobs: int = field(default_factory=default_jobs)
+    timeout: float = field(default_factory=default_timeout)
+    retries: int = DEFAULT_RETRIES
+    on_done: Optional[Callable[[JobResult], None]] = None   # 完了順に呼ばれる（進捗表示用）
+    cache: Optional[NgspiceCache] = field(default_factory=default_cache)   # None で無効
+
+    def run_one(self, job: NgspiceJob) -> JobResult:
+        """1 本を（必要なら再実行しながら）同期実行する。"""
+        # cwd を変えて走らせても読めるよう、ネットリストは絶対パスで渡す
+        cmd = [self.ngspice, *job.args, "-b", str(Path(job.netlist).resolve())]
+        t0 = time.perf_counter()
+        result = JobResult(job=job, returncode=None)
+
+        key = self.cache.key(job, self.ngspice) if self.cache is not None else None
+        hit = self.cache.restore(job, key) if key is not None else None
+        if hit is not None:
+            result.returncode, result.stdout = hit
+            result.cached = True
+            if job.log is not None:
+                Path(job.log).write_text(result.stdout, encoding="utf-8")
+            result.seconds = time.perf_counter() - t0
+            return result
+
+        if job.cwd is not None:
+            Path(job.cwd).mkdir(parents=True, exist_ok=True)
+        for attempt in range(1, self.retries + 2):
+            for out in job.outputs:
+                Path(out).unlink(missing_ok=True)
+            result.attempts = attempt
+            try:
+                proc = subprocess.run(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    cwd=str(job.cwd) if job.cwd else None,
+                    timeout=self.timeout,
+                    check=False,
+                )
+                result.returncode = proc.returncode
+                result.stdout = proc.stdout or ""
+                missing = [str(p) for p in job.outputs if not Path(p).exists()]
+                if proc.returncode != 0:
+                    result.error = f"exit code {proc.returncode}"
+                elif missing:
+                    result.error = f"missing output {', '.join(missing)}"
+                else:
+                    result.error = None
+            except subprocess.TimeoutExpired as exc:
+                result.returncode = None
+                out = exc.stdout or ""
+                result.stdout = out.decode(errors="replace") if isinstance(out, bytes) else out
+                result.error = f"timeout after {self.timeout:g} s"
+            except FileNotFoundError:
+                # 実行ファイルが無いのは再実行しても直らないので、ジョブの失敗ではなく例外にする
+                raise FileNotFoundError(f"ngspice not found: {self.ngspice} (set NGSPICE)") from None
+            if result.error is None:
+                break
+
+        if key is not None and result.error is None:
+            self.cache.store(job, key, result.stdout, result.returncode)
+        if job.log is not None:
+            Path(job.log).write_text(result.stdout, encoding="utf-8")
+        result.seconds = time.perf_counter() - t0
+        return result
+
+    def imap(self, jobs: Iterable[NgspiceJob]) -> Iterator[JobResult]:
+        """
+        jobs を並列に実行し、結果を投入順に返す。先読みは jobs*2 本までに抑えるので、
+        ジェネレータで大量のネットリストを渡してもメモリは一定。
+        """
+        if self.jobs <= 1:
+            for job in jobs:
+                res = self.run_one(job)
+                if self.on_done:
+                    self.on_done(res)
+                yield res
+            return
+
+        def _run(job: NgspiceJob) -> JobResult:
+            res = self.run_one(job)
+            if self.on_done:
+                self.on_done(res)
+            return res
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            pending: deque = deque()
+            for job in jobs:
+                pending.append(pool.submit(_run, job))
+                if len(pending) >= self.jobs * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def run(self, jobs: Iterable[NgspiceJob]) -> List[JobResult]:
+        """全ジョブを実行して投入順の結果リストを返す。"""
+        return list(self.imap(jobs))
+
+
+def run_jobs(jobs: Iterable[NgspiceJob], **kwargs) -> List[JobResult]:
+    """NgspiceScheduler(**kwargs).run(jobs) の短縮形。"""
+    return NgspiceScheduler(**kwargs).run(jobs)
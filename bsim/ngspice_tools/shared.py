@@ -0,0 +1,246 @@
+"""
+libngspice（ngspice の共有ライブラリ版）を ctypes で直接呼ぶバックエンド。
+
+ネットリストは文字列のまま ngSpice_Circ で読ませ、解析後のベクトルは ngGet_Vec_Info の
+ポインタから NumPy 配列に写すので、.cir / wrdata / np.loadtxt のファイル往復も
+ngspice プロセスの起動も無い:
+
+    from ngspice_tools import load_shared
+
+    ng = load_shared()                      # 見つからなければ None（subprocess の経路を使う）
+    if ng is not None:
+        vec = ng.run(netlist_text, {"vg": "v(g)", "id": "-i(Vd)"})   # {名前: np.ndarray}
+
+ライブラリの場所: 環境変数 NGSPICE_LIBRARY → ctypes.util.find_library("ngspice") → 既定の名前。
+NGSPICE_LIBRARY=off で無効にできる。ngSpice_* の C API さえ同じなら、テスト用の
+代替 .so / .dll を NGSPICE_LIBRARY で指定してもよい。
+
+libngspice はプロセス内に 1 つの回路・プロットしか持たない（スレッドセーフでもない）ので、
+run() はライブラリごとのロックで直列化する。並列に回したい場合は subprocess の経路
+（NgspiceScheduler）を使う。
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import threading
+from ctypes import POINTER, c_bool, c_char_p, c_double, c_int, c_short, c_void_p
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+
+LIBRARY_NAMES = ("ngspice", "libngspice.so.0", "libngspice.so", "libngspice.dylib", "ngspice.dll")
+
+
+class _NgComplex(ctypes.Structure):
+    _fields_ = [("cx_real", c_double), ("cx_imag", c_double)]
+
+
+class _VectorInfo(ctypes.Structure):
+    _fields_ = [
+        ("v_name", c_char_p),
+        ("v_type", c_int),
+        ("v_flags", c_short),
+        ("v_realdata", POINTER(c_double)),
+        ("v_compdata", POINTER(_NgComplex)),
+        ("v_length", c_int),
+    ]
+
+
+# sharedspice.h のコールバック型（NG_BOOL は C の bool）
+_SendChar = ctypes.CFUNCTYPE(c_int, c_char_p, c_int, c_void_p)
+_SendStat = ctypes.CFUNCTYPE(c_int, c_char_p, c_int, c_void_p)
+_ControlledExit = ctypes.CFUNCTYPE(c_int, c_int, c_bool, c_bool, c_int, c_void_p)
+_SendData = ctypes.CFUNCTYPE(c_int, c_void_p, c_int, c_int, c_void_p)
+_SendInitData = ctypes.CFUNCTYPE(c_int, c_void_p, c_int, c_void_p)
+_BGThreadRunning = ctypes.CFUNCTYPE(c_int, c_bool, c_int, c_void_p)
+
+
+def strip_control(netlist: str) -> str:
+    """.control ～ .endc を取り除く（quit で共有ライブラリごと終了させないため）。"""
+    out = []
+    skip = False
+    for line in netlist.splitlines():
+        key = line.strip().lower()
+        if key.startswith(".control"):
+            skip = True
+        elif key.startswith(".endc"):
+            skip = False
+        elif not skip:
+            out.append(line)
+    return "\n".join(out)
+
+
+class SharedNgspice:
+    """libngspice 1 つ分。直接作るより load_shared() で共有インスタンスを取る。"""
+
+    def __init__(self, library: str):
+        self.library = library
+        self._lib = ctypes.CDLL(library)
+        self._lock = threading.Lock()
+        self.output: List[str] = []     # 直近の run() / command() の ngspice 出力（stdout / stderr）
+        self.exited: Optional[int] = None   # ngspice が終了を要求したときの終了コード
+
+        lib = self._lib
+        lib.ngSpice_Init.argtypes = [_SendChar, _SendStat, _ControlledExit, _SendData, _SendInitData,
+                                     _BGThreadRunning, c_void_p]
+        lib.ngSpice_Init.restype = c_int
+        lib.ngSpice_Command.argtypes = [c_char_p]
+        lib.ngSpice_Command.restype = c_int
+        lib.ngSpice_Circ.argtypes = [POINTER(c_char_p)]
+        lib.ngSpice_Circ.restype = c_int
+        lib.ngGet_Vec_Info.argtypes = [c_char_p]
+        lib.ngGet_Vec_Info.restype = POINTER(_VectorInfo)
+        lib.ngSpice_CurPlot.argtypes = []
+        lib.ngSpice_CurPlot.restype = c_char_p
+        lib.ngSpice_AllVecs.argtypes = [c_char_p]
+        lib.ngSpice_AllVecs.restype = POINTER(c_char_p)
+
+        # コールバックは GC されないよう self に持たせておく
+        self._callbacks = (
+            _SendChar(self._on_char),
+            _SendStat(lambda text, ident, user: 0),
+            _ControlledExit(self._on_exit),
+            _SendData(),
+            _SendInitData(),
+            _BGThreadRunning(lambda running, ident, user: 0),
+        )
+        lib.ngSpice_Init(*self._callbacks, None)
+
+    # ---- コールバック ----
+    def _on_char(self, text: bytes, ident: int, user) -> int:
+        line = (text or b"").decode(errors="replace")
+        if line.startswith("stdout "):
+            line = line[len("stdout "):]
+        elif line.startswith("stderr "):
+            line = "stderr: " + line[len("stderr "):]
+        self.output.append(line)
+        return 0
+
+    def _on_exit(self, status: int, unload: bool, quit_: bool, ident: int, user) -> int:
+        self.exited = status
+        return status
+
+    # ---- 低レベル API ----
+    def _check(self) -> None:
+        if self.exited is not None:
+            raise RuntimeError(f"libngspice exited (status {self.exited}); restart the process to reload it")
+
+    def _errors(self) -> List[str]:
+        return [s for s in self.output if s.startswith("stderr: ") and "error" in s.lower()]
+
+    def command(self, cmd: str) -> int:
+        """ngspice の対話コマンドを 1 つ実行する（run は同期実行、bg_run は使わない）。"""
+        self._check()
+        return self._lib.ngSpice_Command(cmd.encode())
+
+    def circ(self, netlist: str) -> None:
+        """文字列のネットリストを回路として読み込む（.end が無ければ足す）。"""
+        self._check()
+        lines = [s for s in netlist.splitlines() if s.strip()]
+        if not lines or lines[-1].strip().lower() != ".end":
+            lines.append(".end")
+        arr = (c_char_p * (len(lines) + 1))(*[s.encode() for s in lines], None)
+        if self._lib.ngSpice_Circ(arr) != 0:
+            raise RuntimeError("libngspice could not load the circuit:\n" + "\n".join(self.output[-20:]))
+
+    def vector(self, name: str) -> np.ndarray:
+        """現在のプロットのベクトルを NumPy 配列にコピーして返す（複素数なら complex128）。"""
+        self._check()
+        ptr = self._lib.ngGet_Vec_Info(name.encode())
+        if not ptr:
+            raise KeyError(f"no vector {name!r} in plot {self.current_plot()}")
+        info = ptr.contents
+        n = int(info.v_length)
+        if n <= 0:
+            return np.empty(0)
+        # ngspice 側のメモリは次のコマンドで解放されうるので必ずコピーする
+        if info.v_realdata:
+            return np.ctypeslib.as_array(info.v_realdata, shape=(n,)).copy()
+        raw = ctypes.cast(info.v_compdata, POINTER(c_double))
+        return np.ctypeslib.as_array(raw, shape=(2 * n,)).view(np.complex128).copy()
+
+    def current_plot(self) -> str:
+        name = self._lib.ngSpice_CurPlot()
+        return name.decode() if name else ""
+
+    def vector_names(self, plot: Optional[str] = None) -> List[str]:
+        names = self._lib.ngSpice_AllVecs((plot or self.current_plot()).encode())
+        out = []
+        i = 0
+        while names and names[i]:
+            out.append(names[i].decode())
+            i += 1
+        return out
+
+    # ---- 高レベル API ----
+    def run(
+        self,
+        netlist: str,
+        vectors: Union[Mapping[str, str], Sequence[str], None] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        netlist を読み込んで解析（.dc / .tran などのカード）を実行し、ベクトルを返す。
+
+        vectors は {名前: 式}（let 名前 = 式 で作ってから取り出す）か、そのまま取り出す
+        ベクトル名の並び。None なら現在のプロットの全ベクトル。
+        .control ブロックは読み飛ばす。ngspice がエラーを出したら RuntimeError。
+        実行後は回路とプロットを破棄するので、連続して呼んでもメモリは増えない。
+        """
+        with self._lock:
+            self.output = []
+            self.circ(strip_control(netlist))
+            try:
+                self.command("run")
+                errors = self._errors()
+                if errors:
+                    raise RuntimeError("ngspice error:\n" + "\n".join(errors))
+                if vectors is None:
+                    names = self.vector_names()
+                elif isinstance(vectors, Mapping):
+                    for name, expr in vectors.items():
+                        if expr != name:
+                            self.command(f"let {name} = {expr}")
+                    names = list(vectors)
+                else:
+                    names = list(vectors)
+                return {name: self.vector(name) for name in names}
+            finally:
+                if self.exited is None:
+                    self.command("destroy all")
+                    self.command("remcirc")
+
+
+_INSTANCES: Dict[str, SharedNgspice] = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def load_shared(library: Optional[str] = None) -> Optional[SharedNgspice]:
+    """
+    libngspice を読み込んだ共有インスタンスを返す。読み込めなければ None なので、
+    呼び出し側はそのまま ngspice -b（subprocess）の経路に戻ればよい。
+    同じライブラリは 1 プロセスに 1 回しか初期化しない。
+    """
+    env = os.environ.get("NGSPICE_LIBRARY")
+    if library:
+        candidates = [library]
+    elif env:
+        candidates = [] if env.lower() in ("off", "0", "none") else [env]
+    else:
+        candidates = [ctypes.util.find_library("ngspice"), *LIBRARY_NAMES]
+
+    with _INSTANCES_LOCK:
+        for path in candidates:
+            if not path:
+                continue
+            if path in _INSTANCES:
+                return _INSTANCES[path]
+            try:
+                inst = SharedNgspice(path)
+            except (OSError, AttributeError):
+                continue
+            _INSTANCES[path] = inst
+            return inst
+    return None
@@ -0,0 +1,28 @@
+"""
+bsim/ 以下のテスト共通設定。
+
+各スクリプトと同じく、bsim/（ngspice_tools）と bsim/Paramus（physical, modelcard）を
+import パスに入れる。ngspice 本体が無くても走るように、ngspice を使うテストは
+テスト内で作るスタブ実行ファイルで代用する。
+"""
+import sys
+from pathlib import Path
+
+BSIM = Path(__file__).resolve().parents[1]
+for path in (BSIM, BSIM / "Paramus"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+import pytest
+
+
+@pytest.fixture
+def stub_ngspice(tmp_path, monkeypatch):
+    """スタブの ngspice を NGSPICE に設定し、結果キャッシュは無効にする。"""
+    from stubs import write_stub_ngspice
+
+    stub = write_stub_ngspice(tmp_path / "bin")
+    monkeypatch.setenv("NGSPICE", str(stub))
+    monkeypatch.setenv("NGSPICE_CACHE", "off")
+    return stub
@@ -0,0 +1,247 @@
+"""
+ngspice の代わりに使うスタブ（テスト用）。
+
+write_stub_ngspice(dir) が書く実行ファイルは ngspice -b の最小限だけを真似る:
+    -o LOG / -r RAW、.dc カード、.control の dc / echo / wrdata / write / quit
+電流は Id = 1e-4 (|V| − 0.3)² + 1e-12 の擬似カーブ。wrdata は ngspice と同じくベクトルごとに
+(スケール, 値) の 2 列を並べ、V で始まるベクトルは掃引電圧、それ以外は電流にする。ネットリストに FAIL（または環境変数
+STUB_FAIL の文字列）があれば終了コード 1。
+起動のたびに <スタブ>.calls にネットリストのパスを 1 行足すので、起動回数を数えられる。
+STUB_SLEEP=秒 なら起動後に待ち、STUB_FLAKY があれば最初の 1 回だけ失敗する。
+STUB_BSIM4_OUT があれば、BSIM4 のように作業ディレクトリへ bsim4.out（中身はネットリスト名）を書く。
+
+build_stub_libngspice(dir) は同じ擬似カーブを返す代わりの libngspice（.so）をビルドする
+（NGSPICE_LIBRARY に指定して ngspice_tools.load_shared で読む）。
+"""
+import importlib.util
+import inspect
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+
+def write_raw(path, names, data, binary=True, plotname="DC transfer characteristic", mode="wb"):
+    """ngspice と同じ形式の rawfile（実数）を書く。"""
+    n, m = data.shape
+    header = (
+        f"Title: stub\nDate: today\nPlotname: {plotname}\nFlags: real\n"
+        f"No. Variables: {m}\nNo. Points: {n}\nVariables:\n"
+        + "".join(f"\t{i}\t{name}\tvoltage\n" for i, name in enumerate(names))
+    )
+    with open(path, mode) as f:
+        if binary:
+            f.write((header + "Binary:\n").encode())
+            f.write(np.ascontiguousarray(data, dtype="<f8").tobytes())
+        else:
+            f.write((header + "Values:\n").encode())
+            for i, row in enumerate(data):
+                f.write((f" {i}\t{row[0]:.17e}\n" + "".join(f"\t{v:.17e}\n" for v in row[1:]) + "\n").encode())
+
+
+_MAIN = r'''
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def sweep(a, b, s):
+    a, b, s = float(a), float(b), float(s)
+    return np.arange(a, b + s / 2, s) if s else np.array([a])
+
+
+def current(x):
+    return 1e-4 * np.maximum(np.abs(x) - 0.3, 0.0) ** 2 + 1e-12
+
+
+args = sys.argv[1:]
+log = raw = None
+if "-o" in args:
+    i = args.index("-o"); log = args[i + 1]; del args[i:i + 2]
+if "-r" in args:
+    i = args.index("-r"); raw = args[i + 1]; del args[i:i + 2]
+netlist = Path(args[-1])
+text = netlist.read_text()
+with open(Path(__file__).with_suffix(".calls"), "a") as f:
+    f.write(f"{netlist}\n")
+calls = Path(__file__).with_suffix(".calls").read_text().splitlines()
+if os.environ.get("STUB_SLEEP"):
+    time.sleep(float(os.environ["STUB_SLEEP"]))
+if os.environ.get("STUB_FLAKY") and len(calls) == 1:
+    print("flaky failure")
+    sys.exit(1)
+
+out = [f"Circuit: {netlist.name}"]
+if "FAIL" in text or (os.environ.get("STUB_FAIL") and os.environ["STUB_FAIL"] in text):
+    print("\n".join(out + ["error: FAIL"]))
+    sys.exit(1)
+
+x = None
+m = re.search(r"^\.dc\s+\S+\s+(\S+)\s+(\S+)\s+(\S+)", text, re.M | re.I)
+if m:
+    x = sweep(*m.groups())
+control = text.split(".control", 1)[1].split(".endc", 1)[0] if ".control" in text else ""
+for line in control.splitlines():
+    t = line.split()
+    if not t:
+        continue
+    cmd = t[0].lower()
+    if cmd == "echo":
+        out.append(" ".join(t[1:]))
+    elif cmd == "option":
+        out.append(f"Doing analysis at {' '.join(t[1:]).upper()}")
+    elif cmd == "dc":
+        x = sweep(*t[2:5])
+    elif cmd == "wrdata":
+        # ngspice と同じく (スケール, 値) の組をベクトルごとに並べる。V で始まる名前は掃引電圧
+        cols = []
+        for name in t[2:]:
+            cols += [x, x if name.lower().startswith("v") else current(x)]
+        np.savetxt(t[1], np.column_stack(cols))
+    elif cmd == "write":
+        vecs = [x if name.lower().startswith("v") else current(x) for name in t[2:]]
+        write_raw(t[1], ["v-sweep", *t[2:]], np.column_stack([x] + vecs))
+if raw and x is not None:
+    write_raw(raw, ["v-sweep", "i(vd)"], np.column_stack([x, current(x)]))
+
+if os.environ.get("STUB_BSIM4_OUT"):
+    Path("bsim4.out").write_text(f"{netlist.name}\n")
+
+out.append(f"stub ngspice ok {netlist.name}")
+report = "\n".join(out) + "\n"
+if log:
+    Path(log).write_text(report)
+else:
+    sys.stdout.write(report)
+'''
+
+
+def write_stub_ngspice(directory: Path) -> Path:
+    """スタブの実行ファイルを directory に書いてパスを返す。"""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    path = Path(directory) / "ngspice_stub"
+    source = f"#!{sys.executable}\nimport numpy as np\n\n" + inspect.getsource(write_raw) + _MAIN
+    path.write_text(source, encoding="utf-8")
+    path.chmod(0o755)
+    return path
+
+
+def load_script(path: Path):
+    """アナライザの実行スクリプト（パッケージではない .py）をモジュールとして読む。"""
+    spec = importlib.util.spec_from_file_location(Path(path).stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def stub_calls(stub: Path) -> list:
+    """スタブが起動されたネットリストのパス（起動順）。"""
+    calls = Path(stub).with_suffix(".calls")
+    return calls.read_text().splitlines() if calls.exists() else []
+
+
+# libngspice の代わり（ngSpice_* の C API だけ持つ）。回路の .dc カードから掃引を作り、
+# let 名前 = 式 のうち i( を含む式は上と同じ擬似電流、それ以外は掃引電圧を返す。
+# FAIL を含む回路は run でエラー、.control を渡されたら読み込みを拒否する。
+_LIBNGSPICE_C = r"""
+#include <stdbool.h>
+#include <stdio.h>
+#include <string.h>
+#include <strings.h>
+
+typedef struct { double r, i; } cx;
+typedef struct { char *name; int type; short flags; double *real; cx *comp; int len; } vinfo;
+typedef int (SendChar)(char *, int, void *);
+typedef int (Exit)(int, bool, bool, int, void *);
+
+#define NMAX 4096
+static SendChar *send_char;
+static Exit *send_exit;
+static double start, stop, step;
+static int fail, npts, nvec, ncirc;
+static double sweep[NMAX], current[NMAX];
+static char names[16][32];
+static double *data[16];
+static vinfo info;
+static char *no_vecs[] = {NULL};
+
+static void say(const char *prefix, const char *text) {
+    char buf[512];
+    snprintf(buf, sizeof buf, "%s %s", prefix, text);
+    send_char(buf, 0, NULL);
+}
+
+int ngSpice_Init(SendChar *a, void *b, Exit *c, void *d, void *e, void *f, void *u) {
+    send_char = a;
+    send_exit = c;
+    return 0;
+}
+
+int ngSpice_Circ(char **lines) {
+    char src[64];
+    fail = npts = nvec = 0;
+    for (int k = 0; lines[k]; k++) {
+        if (!strncasecmp(lines[k], ".control", 8)) return 1;
+        if (strstr(lines[k], "FAIL")) fail = 1;
+        if (!strncasecmp(lines[k], ".dc", 3)) sscanf(lines[k] + 3, "%63s %lf %lf %lf", src, &start, &stop, &step);
+    }
+    ncirc++;
+    say("stdout", "Circuit: stand-in");
+    return 0;
+}
+
+int ngSpice_Command(char *cmd) {
+    char name[32], expr[128];
+    if (!strcmp(cmd, "run")) {
+        if (fail) { say("stderr", "Error: stand-in failure"); return 1; }
+        npts = step != 0.0 ? (int)((stop - start) / step + 1.5) : 1;
+        if (npts > NMAX) npts = NMAX;
+        for (int i = 0; i < npts; i++) {
+            double v = start + i * step, a = v < 0 ? -v : v;
+            sweep[i] = v;
+            current[i] = 1e-4 * (a > 0.3 ? (a - 0.3) * (a - 0.3) : 0.0) + 1e-12;
+        }
+        say("stdout", "Doing analysis");
+    } else if (sscanf(cmd, "let %31s = %127[^\n]", name, expr) == 2 && nvec < 16) {
+        strcpy(names[nvec], name);
+        data[nvec++] = strstr(expr, "i(") ? current : sweep;
+    } else if (!strcmp(cmd, "quit")) {
+        send_exit(0, true, true, 0, NULL);
+    }
+    return 0;
+}
+
+vinfo *ngGet_Vec_Info(char *name) {
+    for (int k = 0; k < nvec; k++) {
+        if (!strcasecmp(names[k], name)) {
+            info.name = name; info.flags = 1; info.real = data[k]; info.comp = NULL; info.len = npts;
+            return &info;
+        }
+    }
+    return NULL;
+}
+
+char *ngSpice_CurPlot(void) { return "dc1"; }
+char **ngSpice_AllVecs(char *plot) { return no_vecs; }
+"""
+
+
+def build_stub_libngspice(directory: Path):
+    """代わりの libngspice を C コンパイラでビルドしてパスを返す（コンパイラが無ければ None）。"""
+    cc = shutil.which(os.environ.get("CC", "cc")) or shutil.which("gcc")
+    if cc is None:
+        return None
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    src = directory / "stub_ngspice.c"
+    lib = directory / "libstubngspice.so"
+    src.write_text(_LIBNGSPICE_C, encoding="utf-8")
+    proc = subprocess.run([cc, "-shared", "-fPIC", "-o", str(lib), str(src)], capture_output=True, text=True)
+    return lib if proc.returncode == 0 else None
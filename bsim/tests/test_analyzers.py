@@ -0,0 +1,94 @@
+"""アナライザの並列実行（NgspiceScheduler）をスタブの ngspice で回すテスト。"""
+from pathlib import Path
+
+import pytest
+
+from ngspice_tools import load_raw
+from stubs import load_script, stub_calls
+
+BSIM = Path(__file__).resolve().parents[1]
+
+
+@pytest.mark.parametrize("script, make_cir, template", [
+    ("run_vg_dim.py", "make_vg_cir", "template_vg_dim.cir"),
+    ("run_vd_dim.py", "make_vd_cir", "template_vd_dim.cir"),
+])
+def test_dim_bsim4_out_follows_its_netlist(stub_ngspice, tmp_path, monkeypatch, script, make_cir, template):
+    monkeypatch.setenv("STUB_BSIM4_OUT", "1")
+    monkeypatch.setenv("NGSPICE_JOBS", "4")
+    monkeypatch.chdir(tmp_path)                       # 相対パスの .dat もジョブの cwd に依らない
+    mod = load_script(BSIM / "bsim4_analyzer_dim" / "run" / script)
+    mod.NGSPICE_EXE = str(stub_ngspice)
+
+    out_dir = Path("results")
+    out_dir.mkdir()
+    tasks = []
+    for device in ("nmos", "pmos"):
+        for code in ("010", "013", "050"):
+            stem = f"130nm_{device}_L{code}"
+            cir, dat, log, csv = (out_dir / f"{stem}{ext}" for ext in (".cir", ".dat", ".log", ".csv"))
+            text = getattr(mod, make_cir)(
+                BSIM / "bsim4_analyzer_dim" / "templates" / template, "model.sp", stem,
+                int(code) * 1e-8, 1e-6, device, dat,
+            )
+            cir.write_text(text, encoding="utf-8")
+            args = (cir, log, dat, device, text) if script == "run_vg_dim.py" else (cir, log, dat)
+            tasks.append((mod.make_job(*args), out_dir, dat, csv))
+    mod.run_tasks(tasks)
+
+    for job, _, dat, csv in tasks:
+        stem = job.netlist.stem
+        assert (out_dir / f"{stem}_bsim4.out").read_text().strip() == f"{stem}.cir"
+        assert dat.exists() and csv.exists()
+        assert not job.cwd.exists()                   # 作業ディレクトリは回収後に消える
+    assert not (out_dir / "bsim4.out").exists()
+
+
+def test_vgid_bsim4_out_follows_its_netlist(stub_ngspice, tmp_path, monkeypatch):
+    monkeypatch.setenv("STUB_BSIM4_OUT", "1")
+    monkeypatch.chdir(BSIM / "bsim4_analyzer_dc")     # テンプレートは相対パスで読む
+    mod = load_script(BSIM / "bsim4_analyzer_dc" / "run" / "run_vgid.py")
+    mod.NGSPICE_EXE = str(stub_ngspice)
+
+    jobs = [
+        mod.vgid_job(
+            model_include="model.sp", model_name=f"{device}130", tech="130nm", device=device,
+            temp_tag=tag, temp=temp, Lch=0.13e-6, Wch=1e-6, vdd=1.2, raw_dir=tmp_path,
+        )
+        for device in ("nmos", "pmos")
+        for tag, temp in (("LT", -40.0), ("HT", 125.0))
+    ]
+    for result in mod.NgspiceScheduler(ngspice=str(stub_ngspice), jobs=4).imap(jobs):
+        out = mod.finish_vgid(result)
+        assert out["bsim4"].read_text().strip() == result.job.netlist.name
+    assert not (tmp_path / "bsim4.out").exists()
+
+
+def _run_cv_merged(stub_ngspice, tmp_path, monkeypatch):
+    mod = load_script(BSIM / "bsim4_analyzer_cv" / "run_cv.py")
+    mod.NGSPICE_CMD = str(stub_ngspice)
+    monkeypatch.setattr(mod, "ROOT", tmp_path)                 # 表示用の相対パスの基準
+    monkeypatch.setattr(mod, "RESULTS", tmp_path / "results")
+    logs = mod.run_ngspice_merged(*mod.generate_merged_netlist("130nm"))
+    assert len(stub_calls(stub_ngspice)) == 1
+    return mod, logs
+
+
+def test_cv_merged_writes_rawfile_per_corner(stub_ngspice, tmp_path, monkeypatch):
+    # 1 回の ngspice で 6 条件ぶんの .raw が揃い、ログも条件ごとに切り分けられる
+    mod, logs = _run_cv_merged(stub_ngspice, tmp_path, monkeypatch)
+    assert len(logs) == 6
+    for log in logs:
+        device, _, temp = log.stem.split("_")
+        k = 1 if device == "nmos" else 2
+        plot = load_raw(log.with_suffix(".raw"))
+        assert plot.names[1:] == [f"v(g{k})"] + [f"@m{k}[{c}]" for c in ("cgg", "cgs", "cgd", "cgb")]
+        assert f"TEMP={mod.TEMPS[temp]}" in log.read_text()
+
+
+def test_plot_cv_reads_merged_rawfile(stub_ngspice, tmp_path, monkeypatch):
+    pytest.importorskip("matplotlib")
+    plot_cv = load_script(BSIM / "bsim4_analyzer_cv" / "plot_cv.py")
+    for log in _run_cv_merged(stub_ngspice, tmp_path, monkeypatch)[1]:
+        vg, cgg = plot_cv.parse_cgg_from_raw(log.with_suffix(".raw"))
+        assert len(vg) == len(cgg) > 1
@@ -0,0 +1,36 @@
+"""L × W ビンライブラリ生成（generate_binned_cards）のテスト。"""
+import pytest
+
+from modelcard.parse import parse_lines
+from physical.binning import bin_edges, generate_binned_cards
+from physical.presets import get_registry
+
+L_GRID = [0.1e-6, 0.13e-6, 0.5e-6, 1e-6]
+W_GRID = [0.5e-6, 1e-6, 10e-6]
+
+
+def _cards(extraction):
+    devices = {t: get_registry().get("130nm", t) for t in ("nmos", "pmos")}
+    texts = generate_binned_cards(devices, L_GRID, W_GRID, extraction=extraction)
+    return [card for text in texts for card in parse_lines(text.splitlines())]
+
+
+def test_bin_edges_cover_grid():
+    edges = bin_edges(L_GRID)
+    for value, (lo, hi) in zip(L_GRID, edges):
+        assert lo <= value < hi
+    for (_, hi), (lo, _) in zip(edges[:-1], edges[1:]):
+        assert hi == pytest.approx(lo)
+
+
+def test_binned_vth0_is_deterministic():
+    # 擬似モデルの Vth はジオメトリに依らないので、全ビンで同じ VTH0 になるはず
+    # （curves は gm 最大点の Vg なので direct とは格子 1〜2 点ぶんずれる）
+    curves, direct = _cards("curves"), _cards("direct")
+    assert len(curves) == 2 * len(L_GRID) * len(W_GRID)
+    for dev_type in ("nmos", "pmos"):
+        vth = [c.params["vth0"] for c in curves if c.device_type == dev_type]
+        assert max(vth) - min(vth) < 1e-9
+    for a, b in zip(curves, direct):
+        assert a.name == b.name
+        assert a.params["u0"] == pytest.approx(b.params["u0"], rel=1e-9)
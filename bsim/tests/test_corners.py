@@ -0,0 +1,42 @@
+"""温度・プロセスコーナー生成（generate_corner_sections）のテスト。"""
+import pytest
+
+from modelcard.parse import parse_lines
+from physical.corners import generate_corner_sections
+from physical.presets import get_registry
+
+
+@pytest.fixture(scope="module")
+def cards():
+    devices = {t: get_registry().get("130nm", t) for t in ("nmos", "pmos")}
+    temps = {"LT": -40.0, "RT": 25.0, "HT": 125.0}
+    # curves の VTH0 は Vg 格子点に丸まり、Vth <= 0 では掃引の先頭（0 V）になるので direct で比べる
+    procs = ["TT", "FF", "SS", "FS", "SF"]
+    sections = generate_corner_sections(devices, temps, procs, extraction="direct")
+    out = {}
+    for section, text in sections:
+        for card in parse_lines(text.splitlines()):
+            out[section, card.device_type] = card.params
+    return out
+
+
+@pytest.mark.parametrize("temp", ["LT", "RT", "HT"])
+@pytest.mark.parametrize("dev_type", ["nmos", "pmos"])
+def test_process_corners_are_ordered(cards, temp, dev_type):
+    # NMOS は Vth、PMOS は |Vth|（Vth < 0）が fast ほど小さい
+    sign = 1.0 if dev_type == "nmos" else -1.0
+    vth = {p: sign * cards[f"{p}_{temp}", dev_type]["vth0"] for p in ("FF", "TT", "SS")}
+    u0 = {p: cards[f"{p}_{temp}", dev_type]["u0"] for p in ("FF", "TT", "SS")}
+    assert vth["FF"] < vth["TT"] < vth["SS"]
+    assert u0["FF"] > u0["TT"] > u0["SS"]
+
+
+@pytest.mark.parametrize("temp", ["LT", "RT", "HT"])
+def test_skewed_corners_follow_each_device(cards, temp):
+    vth = lambda p, t: cards[f"{p}_{temp}", t]["vth0"]
+    # FS = NMOS fast / PMOS slow、SF はその逆
+    assert vth("FS", "nmos") == pytest.approx(vth("FF", "nmos"))
+    assert vth("FS", "pmos") == pytest.approx(vth("SS", "pmos"))
+    assert vth("SF", "nmos") == pytest.approx(vth("SS", "nmos"))
+    assert vth("SF", "pmos") == pytest.approx(vth("FF", "pmos"))
+
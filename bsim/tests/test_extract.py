@@ -0,0 +1,48 @@
+"""抽出カーネル（gmmax 法など）のテスト。"""
+import numpy as np
+import pytest
+
+from physical.batch import run_paramus_batch
+from physical.constants import VG_POINTS, VG_SPAN
+from physical.extract import gmmax_vth_rows
+from physical.montecarlo import DEFAULT_MC_SPEC, sample_physical
+from physical.poisson import run_poisson_batch
+from physical.presets import get_registry
+
+
+@pytest.mark.parametrize("dev_type", ["nmos", "pmos"])
+def test_gmmax_vth_is_first_plateau_grid_point(dev_type):
+    # 擬似カーブの gm は丸め誤差の範囲で平坦なので、argmax 任せだと Vth が平坦部を飛び回る
+    base = get_registry().get("130nm", dev_type)
+    phys = sample_physical(base, DEFAULT_MC_SPEC, 2000, np.random.default_rng(1))
+    curves = run_paramus_batch(phys, extraction="curves").columns["VTH0"]
+    np.testing.assert_array_equal(curves, run_paramus_batch(phys, extraction="curves").columns["VTH0"])
+    # 掃引は 0 .. Vth + VG_SPAN。Vth > 0 なら Vth の直後の格子点、Vth <= 0 なら掃引の先頭
+    vth = run_poisson_batch(phys).vth
+    step = (np.maximum(vth, 0.0) + VG_SPAN) / (VG_POINTS - 1)
+    above = vth > 0
+    assert np.all(curves[~above] == 0.0)
+    assert np.all(curves[above] > vth[above])
+    assert np.all(curves[above] - vth[above] <= 2 * step[above] + 1e-12)
+
+
+def test_gmmax_plateau_picks_first_point():
+    vg = np.linspace(0.0, 1.2, 81)[None, :]
+    id_ = 1e-4 * np.maximum(vg - 0.4, 0.0)
+    # 平坦部に丸め誤差程度の揺らぎを乗せても同じ点・同じ Vth
+    noisy = id_ * (1.0 + 1e-12 * np.random.default_rng(0).standard_normal(id_.shape))
+    for curve in (id_, noisy):
+        vth, gmmax, idx = gmmax_vth_rows(vg, curve)
+        assert idx[0] == int(np.searchsorted(vg[0], 0.4)) + 1
+        assert vth[0] == vg[0, idx[0]]
+        assert gmmax[0] == pytest.approx(1e-4)
+
+
+def test_gmmax_absolute_for_pmos_magnitude():
+    # |Id| は Vg を上げると減る（gm < 0）ので |gm| の最大点を使う
+    vg = np.linspace(-1.2, 0.0, 61)[None, :]
+    id_ = 2e-5 * np.maximum(-0.5 - vg, 0.0)
+    vth, gmmax, idx = gmmax_vth_rows(vg, id_, absolute=True)
+    assert vg[0, idx[0]] < -0.5
+    assert vth[0] == vg[0, idx[0]]
+    assert gmmax[0] == pytest.approx(2e-5)
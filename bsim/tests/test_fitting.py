@@ -0,0 +1,46 @@
+"""NgspiceEvaluator を スタブの ngspice（NgspiceScheduler 経由）で回すテスト。"""
+import numpy as np
+
+from modelcard.parse import ModelCard
+from physical.fitting import Measurement, NgspiceEvaluator
+from stubs import stub_calls
+
+
+def _stub_id(x):
+    return 1e-4 * np.maximum(np.abs(x) - 0.3, 0.0) ** 2 + 1e-12
+
+
+def _evaluator(stub, jobs=2, workdir=None):
+    card = ModelCard("nch", "nmos", {"level": 54.0, "vth0": 0.4, "u0": 0.03})
+    x = np.linspace(0.0, 1.2, 25)
+    meas = [
+        Measurement("idvg", x, _stub_id(x), bias=0.05, L=0.13e-6, W=1e-6),
+        Measurement("idvd", x, _stub_id(x), bias=1.2, L=0.13e-6, W=1e-6),
+    ]
+    return NgspiceEvaluator(card, meas, jobs=jobs, ngspice=str(stub), workdir=workdir, shared=False)
+
+
+def test_simulate_places_curves_and_marks_failures(stub_ngspice, monkeypatch):
+    monkeypatch.setenv("STUB_FAIL", "vth0 = -9")
+    ev = _evaluator(stub_ngspice, jobs=3)
+    values = np.array([[0.4], [-9.0], [0.5]])
+    curves = ev.simulate(["VTH0"], values)
+    workdir = ev.workdir
+    ev.close()
+
+    assert len(stub_calls(stub_ngspice)) == 6          # 3 候補 × 2 カーブ、再実行なし
+    for m, sim in zip(ev.measurements, curves):
+        assert sim.shape == (3, m.x.size)
+        np.testing.assert_allclose(sim[[0, 2]], np.tile(m.id, (2, 1)), rtol=1e-12)
+        assert np.isnan(sim[1]).all()
+    assert not workdir.exists()
+
+
+def test_cost_is_inf_for_failed_candidate(stub_ngspice, monkeypatch, tmp_path):
+    monkeypatch.setenv("STUB_FAIL", "vth0 = -9")
+    ev = _evaluator(stub_ngspice, jobs=1, workdir=tmp_path / "work")
+    cost = ev(["VTH0"], np.array([[0.4], [-9.0]]))
+    ev.close()
+
+    assert cost[0] < 1e-9 and np.isinf(cost[1])
+    assert list((tmp_path / "work").iterdir()) == []   # .cir / .dat は 1 本ずつ片付ける
@@ -0,0 +1,36 @@
+"""逆 Paramus（solve_targets）のテスト。"""
+import numpy as np
+import pytest
+
+from physical.inverse import VTH0_TOL, solve_targets
+from physical.presets import get_registry
+
+
+TARGETS = [("nmos", [0.2, 0.35, 0.5]), ("pmos", [-1.0, -1.2, -1.5])]
+
+
+@pytest.mark.parametrize("dev_type, vth", TARGETS)
+def test_card_vth0_matches_target(dev_type, vth):
+    base = dict(get_registry().get("130nm", dev_type), device_type=dev_type)
+    res = solve_targets(base, vth, 3e-4)
+    assert res.converged.all()
+    np.testing.assert_allclose(res.pois.vth, vth, atol=1e-9)
+    np.testing.assert_allclose(res.table.columns["VTH0"], vth, atol=VTH0_TOL)
+    np.testing.assert_allclose(res.idsat, 3e-4, rtol=1e-9)
+
+
+@pytest.mark.parametrize("dev_type, vth", TARGETS)
+def test_curves_card_off_target_is_not_converged(dev_type, vth):
+    # curves の VTH0 は gm 最大点の Vg（格子点）なので目標から外れ、converged=False になる
+    base = dict(get_registry().get("130nm", dev_type), device_type=dev_type)
+    res = solve_targets(base, vth, 3e-4, extraction="curves")
+    np.testing.assert_allclose(res.pois.vth, vth, atol=1e-9)
+    missed = np.abs(res.table.columns["VTH0"] - vth) > VTH0_TOL
+    assert missed.all()
+    assert not res.converged.any()
+
+
+def test_out_of_range_target_is_not_converged():
+    base = dict(get_registry().get("130nm", "nmos"), device_type="nmos")
+    res = solve_targets(base, [0.4, 50.0], [3e-4, 3e-4])
+    assert res.converged.tolist() == [True, False]
@@ -0,0 +1,34 @@
+"""ライブラリ書き出し（write_modelcards / write_library）のテスト。"""
+import builtins
+
+import numpy as np
+
+from modelcard.build import render_table
+from modelcard.library import write_library, write_modelcards
+from physical.batch import run_paramus_batch
+from physical.montecarlo import DEFAULT_MC_SPEC, sample_physical
+from physical.presets import get_registry
+
+
+def test_write_modelcards_is_one_write(tmp_path, monkeypatch):
+    base = get_registry().get("130nm", "nmos")
+    table = run_paramus_batch(sample_physical(base, DEFAULT_MC_SPEC, 2000, np.random.default_rng(0)))
+    texts = render_table(table, [f"m{i}" for i in range(2000)])
+
+    writes = []
+    real_open = builtins.open
+
+    def counting_open(*args, **kwargs):
+        f = real_open(*args, **kwargs)
+        write = f.write
+        f.write = lambda s: writes.append(len(s)) or write(s)
+        return f
+
+    monkeypatch.setattr(builtins, "open", counting_open)
+    assert write_modelcards(texts, tmp_path / "bulk.lib") == 2000
+    assert len(writes) == 1
+    monkeypatch.undo()
+
+    # ストリーム版と同じ内容になる
+    write_library(tmp_path / "stream.lib", iter(texts))
+    assert (tmp_path / "bulk.lib").read_bytes() == (tmp_path / "stream.lib").read_bytes()
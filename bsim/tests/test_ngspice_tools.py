@@ -0,0 +1,248 @@
+"""ngspice_tools（スケジューラ・結果キャッシュ・rawfile・コーナー分割）をスタブの ngspice で確かめる。"""
+import numpy as np
+import pytest
+
+from ngspice_tools import (
+    CORNER_TAG, NgspiceCache, NgspiceJob, NgspiceScheduler, corner_marker, load_raw, read_raw,
+    split_corner_log, split_corners,
+)
+from stubs import stub_calls, write_raw
+
+DECK = """* {title}
+.include "{model}"
+Vd d 0 0.05
+Vg g 0 0
+M1 d g 0 0 nch L=0.13u W=1u
+.dc Vg 0 1.2 0.1
+.control
+run
+wrdata {dat} vg id
+quit
+.endc
+.end
+"""
+
+
+def _job(tmp_path, name="a", title="deck", model="model.sp", **kwargs):
+    (tmp_path / model).touch(exist_ok=True)
+    cir, dat = tmp_path / f"{name}.cir", tmp_path / f"{name}.dat"
+    cir.write_text(DECK.format(title=title, model=model, dat=dat.as_posix()), encoding="utf-8")
+    return NgspiceJob(cir, cwd=tmp_path, log=tmp_path / f"{name}.log", outputs=[dat], label=name, **kwargs)
+
+
+# ---- スケジューラ ----
+def test_scheduler_runs_jobs_in_submission_order(stub_ngspice, tmp_path, monkeypatch):
+    monkeypatch.setenv("STUB_SLEEP", "0.05")
+    jobs = [_job(tmp_path, f"j{i}") for i in range(6)]
+    done = []
+    results = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=3, cache=None, on_done=done.append).run(jobs)
+    assert [r.job.label for r in results] == [f"j{i}" for i in range(6)]
+    assert all(r.ok and r.attempts == 1 and not r.cached for r in results)
+    assert len(done) == 6
+    data = np.loadtxt(jobs[0].outputs[0])
+    assert data.shape == (13, 4)
+    assert "stub ngspice ok j0.cir" in jobs[0].log.read_text()
+
+
+def test_scheduler_retries_then_reports_failure(stub_ngspice, tmp_path):
+    job = _job(tmp_path, title="FAIL")
+    res = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, retries=2, cache=None).run_one(job)
+    assert not res.ok and res.error == "exit code 1" and res.attempts == 3
+    assert len(stub_calls(stub_ngspice)) == 3
+    assert "error: FAIL" in job.log.read_text()
+    with pytest.raises(RuntimeError, match="a.cir"):
+        res.raise_for_status()
+
+
+def test_scheduler_retry_recovers_flaky_run(stub_ngspice, tmp_path, monkeypatch):
+    monkeypatch.setenv("STUB_FLAKY", "1")
+    res = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, retries=1, cache=None).run_one(_job(tmp_path))
+    assert res.ok and res.attempts == 2
+
+
+def test_scheduler_flags_missing_output_and_stale_files(stub_ngspice, tmp_path):
+    job = _job(tmp_path)
+    missing = tmp_path / "never.dat"
+    missing.write_text("stale from a previous run")       # 実行前に消すので成功と取り違えない
+    job.outputs = [job.outputs[0], missing]
+    res = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, retries=0, cache=None).run_one(job)
+    assert res.returncode == 0 and res.error == f"missing output {missing}"
+
+
+def test_scheduler_timeout_and_missing_executable(stub_ngspice, tmp_path, monkeypatch):
+    monkeypatch.setenv("STUB_SLEEP", "5")
+    res = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, timeout=0.5, retries=0, cache=None).run_one(
+        _job(tmp_path)
+    )
+    assert res.returncode is None and res.error.startswith("timeout")
+    with pytest.raises(FileNotFoundError, match="NGSPICE"):
+        NgspiceScheduler(ngspice=str(tmp_path / "no-ngspice"), jobs=1, cache=None).run_one(_job(tmp_path))
+
+
+# ---- 結果キャッシュ ----
+def test_cache_hit_restores_outputs_without_running(stub_ngspice, tmp_path):
+    cache = NgspiceCache(tmp_path / "cache")
+    sched = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, cache=cache)
+    job = _job(tmp_path)
+    first = sched.run_one(job)
+    data = job.outputs[0].read_bytes()
+    job.outputs[0].unlink()
+    job.log.unlink()
+
+    second = sched.run_one(job)
+    assert first.ok and not first.cached and second.cached
+    assert len(stub_calls(stub_ngspice)) == 1
+    assert job.outputs[0].read_bytes() == data
+    assert job.log.read_text() == first.stdout
+
+
+def test_cache_key_follows_included_model(stub_ngspice, tmp_path):
+    cache = NgspiceCache(tmp_path / "cache")
+    sched = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, cache=cache)
+    job = _job(tmp_path)
+    (tmp_path / "model.sp").write_text(".model nch nmos level=54 vth0=0.4\n")
+    key = cache.key(job, str(stub_ngspice))
+    sched.run_one(job)
+
+    (tmp_path / "model.sp").write_text(".model nch nmos level=54 vth0=0.5\n")
+    assert cache.key(job, str(stub_ngspice)) != key
+    assert not sched.run_one(job).cached
+    assert sched.run_one(job).cached
+    assert len(stub_calls(stub_ngspice)) == 2
+
+    (tmp_path / "model.sp").unlink()                     # .include 先が無ければキャッシュしない
+    assert cache.key(job, str(stub_ngspice)) is None
+
+
+def test_cache_resolves_nested_include_from_job_cwd(stub_ngspice, tmp_path, monkeypatch):
+    # model.sp の中の .include "params.sp" は、プロセスの cwd ではなくジョブの cwd で探す
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "params.sp").write_text("* vth0=0.4\n")
+    (tmp_path / "model.sp").write_text('.include "params.sp"\n')
+    monkeypatch.chdir(tmp_path)
+    cache = NgspiceCache(tmp_path / "cache")
+    job = _job(tmp_path, model=(tmp_path / "model.sp").as_posix())
+    job.cwd = work
+    key = cache.key(job, str(stub_ngspice))
+    assert key is not None
+    (work / "params.sp").write_text("* vth0=0.5\n")
+    assert cache.key(job, str(stub_ngspice)) != key
+
+
+def test_cache_hit_restores_workfiles(stub_ngspice, tmp_path, monkeypatch):
+    monkeypatch.setenv("STUB_BSIM4_OUT", "1")
+    cache = NgspiceCache(tmp_path / "cache")
+    sched = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, cache=cache)
+    job = _job(tmp_path, workfiles=("bsim4.out", "sim.log"))   # sim.log は出ない
+    job.cwd = tmp_path / "a.work"
+    assert not sched.run_one(job).cached
+    bsim4 = (job.cwd / "bsim4.out").read_text()
+    (job.cwd / "bsim4.out").unlink()
+    job.cwd.rmdir()
+
+    assert sched.run_one(job).cached
+    assert len(stub_calls(stub_ngspice)) == 1
+    assert (job.cwd / "bsim4.out").read_text() == bsim4
+    assert not (job.cwd / "sim.log").exists()
+    # workfiles が違うジョブは別キー（bsim4.out を持たないエントリを使い回さない）
+    assert cache.key(_job(tmp_path), str(stub_ngspice)) != cache.key(job, str(stub_ngspice))
+
+
+def test_cache_drops_corrupt_entry_and_evicts(stub_ngspice, tmp_path):
+    cache = NgspiceCache(tmp_path / "cache")
+    sched = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, cache=cache)
+    job = _job(tmp_path)
+    sched.run_one(job)
+    entry = next(cache.root.glob("??/*"))
+    next(entry.glob("*.dat")).write_text("corrupted")
+    assert not sched.run_one(job).cached                 # 壊れたエントリは捨てて実行し直す
+    assert len(stub_calls(stub_ngspice)) == 2
+
+    sched.run_one(_job(tmp_path, "b", title="other"))
+    assert len(list(cache.entries())) == 2
+    assert cache.evict(0) == 2 and list(cache.entries()) == []
+
+
+def test_failed_jobs_are_not_cached(stub_ngspice, tmp_path):
+    cache = NgspiceCache(tmp_path / "cache")
+    sched = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, retries=0, cache=cache)
+    job = _job(tmp_path, title="FAIL")
+    assert not sched.run_one(job).ok and not sched.run_one(job).cached
+    assert list(cache.entries()) == []
+
+
+# ---- rawfile ----
+@pytest.mark.parametrize("binary", [True, False])
+def test_read_raw_binary_and_ascii(tmp_path, binary):
+    x = np.linspace(0.0, 1.2, 241)
+    data = np.column_stack([x, 1e-4 * x ** 2, -x])
+    path = tmp_path / "out.raw"
+    write_raw(path, ["v-sweep", "i(vd)", "v(g)"], data, binary=binary, plotname="DC 1")
+    write_raw(path, ["v-sweep", "vd#branch"], data[:5, :2], binary=binary, plotname="DC 2", mode="ab")
+
+    plots = read_raw(path)
+    assert [p.plotname for p in plots] == ["DC 1", "DC 2"]
+    first = plots[0]
+    assert isinstance(first.data, np.memmap) == binary
+    np.testing.assert_array_equal(first.scale, x)
+    np.testing.assert_array_equal(first["I(VD)"], data[:, 1])     # 大文字小文字を区別しない
+    np.testing.assert_array_equal(first["g"], -x)                 # v(g) ↔ g
+    assert "vd#branch" in first and "v(nosuch)" not in first
+    last = load_raw(path)
+    assert last.npoints == 5
+    np.testing.assert_array_equal(last["i(vd)"], data[:5, 1])     # i(vd) ↔ vd#branch
+    del plots, first, last
+
+
+def test_read_raw_truncated_binary(tmp_path):
+    path = tmp_path / "cut.raw"
+    write_raw(path, ["v-sweep", "i(vd)"], np.arange(20.0).reshape(10, 2))
+    path.write_bytes(path.read_bytes()[:-40])            # 途中で止まったシミュレーション
+    assert load_raw(path, mmap=False).npoints == 7
+    with pytest.raises(ValueError):
+        (tmp_path / "empty.raw").write_text("")
+        read_raw(tmp_path / "empty.raw")
+
+
+def test_stub_rawfile_through_scheduler(stub_ngspice, tmp_path):
+    job = _job(tmp_path)
+    raw = tmp_path / "a.raw"
+    job.args = ["-r", str(raw)]
+    assert NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, cache=None).run_one(job).ok
+    np.testing.assert_allclose(load_raw(raw)["i(vd)"], np.loadtxt(job.outputs[0])[:, -1])
+
+
+# ---- コーナー分割 ----
+def test_split_corner_log():
+    text = f"Circuit: deck\n{CORNER_TAG} TT\nline tt\n  {CORNER_TAG} FF  \nline ff\nmore ff\n"
+    header, parts = split_corner_log(text)
+    assert header == "Circuit: deck\n"
+    assert parts == {"TT": "line tt\n", "FF": "line ff\nmore ff\n"}
+
+
+def test_split_corners_from_one_run(stub_ngspice, tmp_path):
+    labels = ["TT_LT", "TT_HT", "FF_RT"]
+    corner_jobs = [
+        NgspiceJob(tmp_path / f"{c}.cir", log=tmp_path / f"{c}.log", outputs=[tmp_path / f"{c}.dat"], label=c)
+        for c in labels
+    ]
+    control = []
+    for job in corner_jobs[:2]:                          # FF_RT は流さない
+        control += [corner_marker(job.label), f"option temp={job.label}", "dc Vg 0 1.2 0.1",
+                    f"wrdata {job.outputs[0].as_posix()} vg id"]
+    deck = tmp_path / "corners.cir"
+    deck.write_text("* corners\n.control\n" + "\n".join(control) + "\nquit\n.endc\n.end\n")
+    merged = NgspiceScheduler(ngspice=str(stub_ngspice), jobs=1, cache=None).run_one(
+        NgspiceJob(deck, outputs=[j.outputs[0] for j in corner_jobs[:2]])
+    )
+
+    results = split_corners(merged, corner_jobs)
+    assert [r.job.label for r in results] == labels
+    assert [r.ok for r in results] == [True, True, False]
+    assert results[2].error == "corner FF_RT not found in output"
+    for res in results[:2]:
+        text = res.job.log.read_text()
+        assert text.startswith("Circuit: corners.cir\n")
+        assert f"TEMP={res.job.label}" in text and CORNER_TAG not in text
+    assert "TT_LT" not in results[1].stdout
@@ -0,0 +1,39 @@
+"""数値 Poisson（poisson_fd.py）のプロファイルキャッシュのテスト。"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from physical.poisson_fd import SiProfileCache, si_charge
+
+
+def test_cache_reuses_and_evicts():
+    cache = SiProfileCache(max_entries=4)
+    na = np.array([1e23, 2e23, 1e23])
+    qs = si_charge(na, 300.0, cache)
+    assert qs[0] == qs[2]
+    assert cache.stats() == {"entries": 2, "hits": 0, "warm_starts": 0, "cold_starts": 2}
+
+    again = si_charge(na, 300.0, cache)
+    np.testing.assert_array_equal(again, qs)
+    assert cache.stats()["hits"] == 3
+
+    si_charge(np.geomspace(3e23, 9e23, 5), 300.0, cache)
+    stats = cache.stats()
+    assert stats["entries"] == 4 and stats["warm_starts"] == 5
+
+
+def test_cache_is_thread_safe():
+    cache = SiProfileCache(max_entries=16)
+    grid = np.geomspace(1e22, 1e24, 64)
+    expected = si_charge(grid, 300.0, SiProfileCache())
+
+    def work(seed):
+        rng = np.random.default_rng(seed)
+        na = rng.choice(grid, 32)
+        return na, si_charge(na, 300.0, cache)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(work, range(32)))
+    for na, qs in results:
+        np.testing.assert_allclose(qs, expected[np.searchsorted(grid, na)], rtol=1e-6)
+    assert len(cache) <= 16
@@ -0,0 +1,52 @@
+"""前進モード感度（run_sensitivity_batch）を中心差分と突き合わせるテスト。"""
+import numpy as np
+import pytest
+
+from physical.batch import run_paramus_batch
+from physical.poisson import PhysBatch
+from physical.presets import get_registry
+from physical.sensitivity import INPUTS, run_sensitivity_batch
+
+
+def _devices():
+    rows = []
+    for dev_type in ("nmos", "pmos"):
+        base = dict(get_registry().get("130nm", dev_type), device_type=dev_type)
+        rows += [base, dict(base, vfb=1.2 * base["vfb"], L_m=0.5e-6, W_m=2e-6)]
+    return PhysBatch.from_dicts(rows)
+
+
+@pytest.mark.parametrize("extraction", ["curves", "direct"])
+def test_jacobian_matches_finite_difference(extraction):
+    phys = _devices()
+    sens = run_sensitivity_batch(phys, extraction=extraction)
+    base = run_paramus_batch(phys, extraction=extraction).columns
+    for name in ("VTH0", "U0", "PCLM", "TOXM"):
+        np.testing.assert_allclose(sens.table.columns[name], base[name], rtol=1e-12)
+
+    for j, wrt in enumerate(INPUTS):
+        x = getattr(phys, wrt)
+        h = 1e-6 * np.abs(x)
+
+        def shifted(sign):
+            cols = {k: getattr(phys, k) for k in INPUTS}
+            cols[wrt] = x + sign * h
+            batch = PhysBatch(**cols, is_nmos=phys.is_nmos)
+            return run_paramus_batch(batch, extraction=extraction).columns
+
+        plus, minus = shifted(1.0), shifted(-1.0)
+        for out in ("VTH0", "U0", "PCLM"):
+            fd = (plus[out] - minus[out]) / (2.0 * h)
+            scale = np.abs(base[out]) / np.abs(x)   # 対数感度 1e-6 相当を許容誤差の下限に
+            np.testing.assert_allclose(
+                sens.column(out, wrt), fd, rtol=1e-4, atol=1e-6 * scale.max(), err_msg=f"d{out}/d{wrt}"
+            )
+
+
+def test_vth0_tracks_vfb_one_to_one():
+    phys = _devices()
+    # curves は Vth を Vg 格子点に丸めるので、閉形式（direct）で比べる
+    d = run_sensitivity_batch(phys, extraction="direct").column("VTH0", "vfb")
+    # nMOS: Vth = Vfb + ...、pMOS: |Vth| = |Vfb| + ...（Vth < 0）
+    expected = np.where(phys.is_nmos, 1.0, -np.sign(phys.vfb))
+    np.testing.assert_allclose(d, expected, rtol=1e-9)
@@ -0,0 +1,36 @@
+"""常駐サービス（service.py）の JSON-lines ループのテスト。"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from service import ParamusService, _serve_lines
+
+
+def _serve(lines):
+    service = ParamusService()
+    out = []
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        _serve_lines(service, iter(lines), out.append, pool)
+    return service, [json.loads(s) for s in out]
+
+
+def test_shutdown_stops_reading_after_reply():
+    lines = [
+        json.dumps({"id": 1, "op": "ping"}),
+        json.dumps({"id": 2, "node": "130nm", "type": "nmos"}),
+        json.dumps({"id": 3, "op": "shutdown"}),
+        json.dumps({"id": 4, "op": "ping"}),
+        json.dumps({"id": 5, "node": "130nm", "type": "pmos"}),
+    ]
+    service, replies = _serve(lines)
+    assert service.shutdown_requested.is_set()
+    by_id = {r["id"]: r for r in replies}
+    # shutdown より前の要求は最後まで処理し、後ろの要求は読まない
+    assert sorted(by_id) == [1, 2, 3]
+    assert all(r["ok"] for r in replies)
+    assert by_id[2]["params"]["DEVICE_TYPE"] == "nmos"
+
+
+def test_invalid_json_does_not_stop_service():
+    service, replies = _serve(["{oops", json.dumps({"id": 7, "op": "ping"})])
+    assert not service.shutdown_requested.is_set()
+    assert [r["ok"] for r in sorted(replies, key=lambda r: r["id"] or 0)] == [False, True]
@@ -0,0 +1,121 @@
+"""
+libngspice 経路（ngspice_tools.load_shared）のテスト。C コンパイラでビルドした代わりの
+libngspice を NGSPICE_LIBRARY で読ませ、アナライザの --shared 経路が ngspice -b
+（スタブ実行ファイル）経路と同じ CSV を出すことを確かめる。
+"""
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ngspice_tools import load_shared, strip_control
+from stubs import build_stub_libngspice, load_script, stub_calls
+
+BSIM = Path(__file__).resolve().parents[1]
+
+NETLIST = """* stand-in
+Vd d 0 0.05
+Vg g 0 0
+M1 d g 0 0 nch L=0.13u W=1u
+.dc Vg 0 1.2 0.05
+.control
+run
+wrdata out.dat v(g) i(Vd)
+quit
+.endc
+.end
+"""
+
+
+def _stub_id(x):
+    a = np.abs(x)
+    return 1e-4 * np.where(a > 0.3, (a - 0.3) ** 2, 0.0) + 1e-12
+
+
+@pytest.fixture(scope="session")
+def libngspice(tmp_path_factory):
+    lib = build_stub_libngspice(tmp_path_factory.mktemp("libngspice"))
+    if lib is None:
+        pytest.skip("no C compiler to build the stand-in libngspice")
+    return lib
+
+
+@pytest.fixture
+def shared_env(libngspice, monkeypatch):
+    monkeypatch.setenv("NGSPICE_LIBRARY", str(libngspice))
+    return libngspice
+
+
+def test_load_shared_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("NGSPICE_LIBRARY", "off")
+    assert load_shared() is None
+
+
+def test_strip_control_keeps_analysis_cards():
+    text = strip_control(NETLIST)
+    assert ".dc Vg 0 1.2 0.05" in text
+    assert "wrdata" not in text and "quit" not in text
+
+
+def test_run_returns_vectors_without_files(shared_env, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ng = load_shared()
+    assert ng is not None and load_shared() is ng    # 1 プロセスに 1 インスタンス
+
+    vec = ng.run(NETLIST, {"vx": "v(g)", "iy": "-i(Vd)"})
+    x = np.arange(0.0, 1.2 + 0.025, 0.05)
+    np.testing.assert_allclose(vec["vx"], x, atol=1e-12)
+    np.testing.assert_allclose(vec["iy"], _stub_id(x), rtol=1e-12)
+    assert list(tmp_path.iterdir()) == []            # wrdata の .dat は作られない
+
+    with pytest.raises(RuntimeError, match="stand-in failure"):
+        ng.run(NETLIST.replace("stand-in", "FAIL"), {"iy": "-i(Vd)"})
+    with pytest.raises(KeyError):
+        ng.run(NETLIST, ["nosuch"])
+
+
+def _read_csv(path):
+    return {row[0]: row[1] for row in (line.split(",") for line in path.read_text().splitlines())}
+
+
+def test_run_vg_dim_shared_matches_subprocess(stub_ngspice, shared_env, tmp_path):
+    mod = load_script(BSIM / "bsim4_analyzer_dim" / "run" / "run_vg_dim.py")
+    mod.NGSPICE_EXE = str(stub_ngspice)
+    template = BSIM / "bsim4_analyzer_dim" / "templates" / "template_vg_dim.cir"
+
+    def tasks(out_dir):
+        out_dir.mkdir()
+        rows = []
+        for device in ("nmos", "pmos"):
+            stem = f"130nm_{device}_L013_vg"
+            cir, dat, log, csv = (out_dir / f"{stem}{ext}" for ext in (".cir", ".dat", ".log", ".csv"))
+            text = mod.make_vg_cir(template, "model.sp", f"130nm_{device}_l013", 0.13e-6, 1e-6, device, dat)
+            cir.write_text(text, encoding="utf-8")
+            rows.append((mod.make_job(cir, log, dat, device, text), out_dir, dat, csv))
+        return rows
+
+    mod.run_tasks(tasks(tmp_path / "batch"))
+    mod.run_tasks(tasks(tmp_path / "shared"), shared=True)
+
+    assert len(stub_calls(stub_ngspice)) == 2
+    for device in ("nmos", "pmos"):
+        stem = f"130nm_{device}_L013_vg"
+        assert not (tmp_path / "shared" / f"{stem}.dat").exists()
+        assert "Doing analysis" in (tmp_path / "shared" / f"{stem}.log").read_text()
+        assert _read_csv(tmp_path / "shared" / f"{stem}.csv") == _read_csv(tmp_path / "batch" / f"{stem}.csv")
+
+
+def test_run_vgid_shared_matches_subprocess(stub_ngspice, shared_env, tmp_path, monkeypatch):
+    monkeypatch.chdir(BSIM / "bsim4_analyzer_dc")     # テンプレートは相対パスで読む
+    mod = load_script(BSIM / "bsim4_analyzer_dc" / "run" / "run_vgid.py")
+    mod.NGSPICE_EXE = str(stub_ngspice)
+
+    for device in ("nmos", "pmos"):
+        kwargs = dict(
+            model_include="model.sp", model_name=f"{device}130", tech="130nm", device=device,
+            temp_tag="RT", temp=25.0, Lch=0.13e-6, Wch=1e-6, vdd=1.2,
+        )
+        batch = mod.run_vgid(raw_dir=tmp_path / "batch", **kwargs)
+        shared = mod.run_vgid(raw_dir=tmp_path / "shared", shared=True, **kwargs)
+        assert shared["dat"] is None and batch["dat"].exists()
+        assert _read_csv(shared["csv"]) == _read_csv(batch["csv"])